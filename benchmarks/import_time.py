@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Measures the cold-start time of importing python-cybox.
+
+Each statement is timed in a fresh interpreter, so nothing is cached
+between runs (apart from the compiled .pyc files).  The "all bindings"
+case imports every object binding up front, which is what
+``import cybox.core`` used to do.
+
+Example usage:
+    python import_time.py [repeat]
+"""
+
+import subprocess
+import sys
+
+STATEMENTS = [
+    ("cybox.core", "import cybox.core"),
+    ("cybox.core + Address",
+     "import cybox.core; from cybox.objects.address_object import Address"),
+    ("cybox.core + all bindings",
+     "import cybox.core; import cybox.bindings.cybox_core as c; "
+     "[c._get_class(n) for n in c._OBJECT_BINDINGS]"),
+]
+
+TIMER = ("import time; start = time.time(); %s; "
+         "print(time.time() - start)")
+
+
+def time_statement(statement):
+    output = subprocess.check_output([sys.executable, "-c", TIMER % statement])
+    return float(output)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    # Make sure every module has been compiled before timing anything.
+    time_statement(STATEMENTS[-1][1])
+
+    for name, statement in STATEMENTS:
+        times = sorted(time_statement(statement) for _ in range(repeat))
+        print("%-28s median %7.1f ms   min %7.1f ms" %
+              (name, times[len(times) // 2] * 1000, times[0] * 1000))
+
+
+if __name__ == '__main__':
+    main()
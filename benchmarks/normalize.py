@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Compares file path normalization against the previous implementation.
+
+The previous implementation ran a search and a substitution for every
+entry of the mapping list.  The "single scan" run calls the compiled
+mapping's replace() directly, and the "perform" run goes through
+perform_replacement(), which also looks the value up in its memo of
+recent results.  The corpus is a random mix of Windows paths, built from
+common system, profile and program directories plus environment variable
+forms.  Every path is different, so the memo never hits and the timings
+show the cost of the scan itself.
+
+Example usage:
+    python normalize.py [number_of_paths]
+"""
+
+import random
+import sys
+import timeit
+
+from cybox.common import String
+from cybox.utils import normalize
+
+ROOTS = [
+    "C:\\Windows\\System32",
+    "C:\\WINDOWS\\system32\\drivers",
+    "C:\\Windows\\SysWOW64",
+    "C:\\Windows\\Temp",
+    "C:\\Documents and Settings\\All Users\\Application Data",
+    "C:\\Documents and Settings\\All Users\\Start Menu\\Programs",
+    "C:\\Documents and Settings\\jsmith\\Local Settings\\Temp",
+    "C:\\Documents and Settings\\jsmith\\Application Data",
+    "C:\\Users\\jsmith\\AppData\\Roaming",
+    "C:\\Users\\Public\\Downloads",
+    "C:\\ProgramData\\Microsoft",
+    "C:\\Program Files\\Common Files",
+    "C:\\Program Files (x86)\\Mozilla Firefox",
+    "D:\\builds\\release",
+    "E:\\",
+    "%APPDATA%\\Microsoft",
+    "%SystemRoot%\\system32",
+    "%TEMP%",
+    "%UserProfile%\\Desktop",
+    "%ProgramFiles%\\Internet Explorer",
+    "\\\\fileserver\\share\\tools",
+]
+
+NAMES = ["svchost.exe", "kernel32.dll", "update.exe", "readme.txt",
+         "ntoskrnl.exe", "a0b1c2.tmp", "config.ini", "setup.msi"]
+
+
+def legacy_perform_replacement(entity, mapping_list):
+    """The implementation of perform_replacement() before it was compiled."""
+    if not entity.value:
+        return
+    entity_value = entity.value
+    for mapping_dict in mapping_list:
+        if 'search_string' in mapping_dict.keys():
+            search_string = mapping_dict['search_string']
+            replacement = mapping_dict['replacement']
+            if search_string in entity_value:
+                entity.value = entity_value.replace(search_string, replacement)
+        if 'regex' in mapping_dict.keys():
+            compiled_regex = mapping_dict['regex']
+            replacement = mapping_dict['replacement']
+            if compiled_regex.search(entity_value):
+                entity.value = compiled_regex.sub(replacement, entity_value)
+
+
+def single_scan_replacement(compiled):
+    """Return a function which applies `compiled` without the memo."""
+    def perform(entity, mapping_list):
+        replaced = compiled.replace(entity.value)
+        if replaced is not None and replaced != entity.value:
+            entity.value = replaced
+    return perform
+
+
+def make_corpus(count, seed=0):
+    rnd = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        path = rnd.choice(ROOTS)
+        if path[-1] != "\\":
+            path += "\\"
+        corpus.append("%s%d-%s" % (path, i, rnd.choice(NAMES)))
+    return corpus
+
+
+def run(func, corpus):
+    mapping = normalize.file_path_normalization_mapping
+    for path in corpus:
+        func(String(path), mapping)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    corpus = make_corpus(count)
+
+    mapping = normalize.file_path_normalization_mapping
+    single_scan = single_scan_replacement(
+        normalize._get_compiled_mapping(mapping))
+    tests = [("legacy", legacy_perform_replacement),
+             ("single scan", single_scan),
+             ("perform", normalize.perform_replacement)]
+
+    # Check that they all give the same results before timing them.
+    for path in corpus:
+        expected = String(path)
+        legacy_perform_replacement(expected, mapping)
+        for name, func in tests[1:]:
+            actual = String(path)
+            func(actual, mapping)
+            assert expected.value == actual.value, (name, path, actual)
+
+    # Start each repetition with an empty memo.
+    memo = normalize._get_compiled_mapping(mapping).memo
+    for name, func in tests:
+        seconds = min(timeit.repeat(lambda: run(func, corpus),
+                                    setup=memo.clear, number=1, repeat=3))
+        print("%-12s %8.1f ms  (%.2f us/path)" %
+              (name, seconds * 1000, seconds * 1e6 / count))
+
+
+if __name__ == '__main__':
+    main()
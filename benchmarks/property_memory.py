@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Compares the memory used by properties against the previous layout.
+
+The previous layout set every BaseObjectProperty and PatternFieldGroup
+attribute in ``__init__``, so each property carried about 20 instance
+attributes, almost all of them None.  The corpus is a mix of String,
+Integer, HexBinary and UnsignedLong properties, as found in File objects
+with hashes; one in a hundred has a condition set.
+
+Memory is measured with :mod:`tracemalloc` where it is available, and
+estimated with :func:`cybox.utils.approximate_size` otherwise.
+
+Example usage:
+    python property_memory.py [number_of_properties]
+"""
+
+import gc
+import sys
+import time
+
+from cybox.common import (DEFAULT_DELIM, HexBinary, Integer, String,
+        UnsignedLong)
+from cybox.utils import approximate_size
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+VALUES = [
+    (String, "C:\\Windows\\System32\\kernel32.dll"),
+    (String, "svchost.exe"),
+    (Integer, 4096),
+    (UnsignedLong, 1048576),
+    (HexBinary, "4d5a9000"),
+]
+
+
+def legacy(klass):
+    """Return a subclass of `klass` with the previous attribute layout."""
+    class Legacy(klass):
+        def __init__(self, value=None):
+            super(Legacy, self).__init__(value)
+            self._force_datatype = False
+            self.id_ = None
+            self.idref = None
+            self.appears_random = None
+            self.is_obfuscated = None
+            self.obfuscation_algorithm_ref = None
+            self.is_defanged = None
+            self.defanging_algorithm_ref = None
+            self.refanging_transform_type = None
+            self.refanging_transform = None
+            self.observed_encoding = None
+            self.condition = None
+            self.apply_condition = None
+            self.bit_mask = None
+            self.pattern_type = None
+            self.regex_syntax = None
+            self.has_changed = None
+            self.trend = None
+            self.is_case_sensitive = True
+            self.delimiter = DEFAULT_DELIM
+    return Legacy
+
+
+def build(count, wrap):
+    classes = [(wrap(klass), value) for klass, value in VALUES]
+    props = []
+    for i in range(count):
+        klass, value = classes[i % len(classes)]
+        prop = klass(value)
+        if i % 100 == 0:
+            prop.condition = "Equals"
+        props.append(prop)
+    return props
+
+
+def measure(count, wrap):
+    gc.collect()
+    start = time.time()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        props = build(count, wrap)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    else:
+        props = build(count, wrap)
+        size = approximate_size(props)
+    seconds = time.time() - start
+    del props
+    return size, seconds
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    for name, wrap in [("legacy", legacy), ("compact", lambda x: x)]:
+        size, seconds = measure(count, wrap)
+        print("%-10s %8.1f MB  (%5.0f bytes/property, %.2f us/property)" %
+              (name, size / 1e6, float(size) / count, seconds * 1e6 / count))
+
+
+if __name__ == '__main__':
+    main()
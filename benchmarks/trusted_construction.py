@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Measures deserialization with and without the trusted construction path.
+
+``from_obj()``, ``from_dict()`` and the XML builder create Observables,
+Objects and properties with their ``_new()`` class methods, which skip the
+id generation (a uuid4 per Observable and Object) and argument parsing done
+by the constructors, and ObjectProperties subclasses look up their
+TypedFields once per class rather than once per instance.  The "legacy"
+run puts the constructors and the per-instance lookup back to show what
+that saves.  Each run is repeated and the best time is reported.
+
+The corpus is an Observables document of 10,000 File objects by default,
+each with a hash and a related File.  The time saved is scaled to 100,000
+Observables so runs of different sizes can be compared.
+
+Example usage:
+    python trusted_construction.py [number_of_observables]
+"""
+
+import contextlib
+import gc
+import io
+import sys
+import time
+
+from mixbox import entities
+
+from cybox.common import BaseProperty, Hash, ObjectProperties
+from cybox.core import Object, Observable, Observables, RelatedObject
+from cybox.core.builder import parse
+from cybox.objects.file_object import File
+
+REPEAT = 3
+
+
+def make_observables(count):
+    observables = Observables()
+    for i in range(count):
+        f = File()
+        f.file_name = "file%d.exe" % i
+        f.size_in_bytes = 1024 + i
+        f.add_hash(Hash("%032x" % i, Hash.TYPE_MD5))
+        dropped = File()
+        dropped.file_name = "dropped%d.dll" % i
+        f.add_related(dropped, "Dropped", inline=True)
+        observables.add(Observable(f))
+    return observables
+
+
+@contextlib.contextmanager
+def legacy():
+    """Make ``_new()`` call the constructors and TypedFields be looked up
+    for every instance, as before."""
+    classes = [BaseProperty, Object, RelatedObject, Observable]
+    saved = [klass.__dict__['_new'] for klass in classes]
+    saved_iter = ObjectProperties.__dict__['_iter_typed_fields']
+    for klass in classes:
+        klass._new = classmethod(lambda cls: cls())
+    ObjectProperties._iter_typed_fields = \
+        entities.Entity.__dict__['_iter_typed_fields']
+    try:
+        yield
+    finally:
+        for klass, new in zip(classes, saved):
+            klass._new = new
+        ObjectProperties._iter_typed_fields = saved_iter
+
+
+def timed(func, *args):
+    gc.collect()
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    observables = make_observables(count)
+    observables_dict = observables.to_dict()
+    document = observables.to_xml()
+
+    tests = [
+        ("from_dict", Observables.from_dict, observables_dict),
+        ("parse", lambda x: parse(io.BytesIO(x)), document),
+    ]
+    for name, func, data in tests:
+        legacy_times, trusted_times = [], []
+        for _ in range(REPEAT):
+            with legacy():
+                legacy_times.append(timed(func, data))
+            trusted_times.append(timed(func, data))
+        before, after = min(legacy_times), min(trusted_times)
+        print("%-10s legacy %7.2f s  trusted %7.2f s  "
+              "(%.2f s saved per 100k observables)" %
+              (name, before, after, (before - after) * 100000 / count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Measures parsing with and without interned vocabulary values.
+
+The corpus is an Observables document of File objects, each with MD5,
+SHA1 and SHA256 hashes and a related File, so every Observable holds four
+controlled vocabulary values (three ``HashName`` and one
+``ObjectRelationship``).
+
+Memory is measured with :mod:`tracemalloc` (Python 3 only), in a separate
+run from the timing.
+
+Example usage:
+    python vocab_interning.py [number_of_observables]
+"""
+
+import gc
+import io
+import sys
+import time
+import tracemalloc
+
+from cybox.common import Hash
+from cybox.common.vocabs import set_vocab_interning
+from cybox.core import Observable, Observables
+from cybox.core.builder import parse
+from cybox.objects.file_object import File
+
+
+def make_document(count):
+    observables = Observables()
+    for i in range(count):
+        f = File()
+        f.file_name = "file%d.exe" % i
+        f.add_hash(Hash("%032x" % i, Hash.TYPE_MD5))
+        f.add_hash(Hash("%040x" % i, Hash.TYPE_SHA1))
+        f.add_hash(Hash("%064x" % i, Hash.TYPE_SHA256))
+        dropped = File()
+        dropped.file_name = "dropped%d.dll" % i
+        f.add_related(dropped, "Dropped", inline=True)
+        observables.add(Observable(f))
+    return observables.to_xml()
+
+
+def measure(document, interning):
+    set_vocab_interning(interning)
+    try:
+        # Time the parse without tracemalloc, which slows allocation down.
+        gc.collect()
+        start = time.time()
+        parse(io.BytesIO(document))
+        seconds = time.time() - start
+
+        gc.collect()
+        tracemalloc.start()
+        observables = parse(io.BytesIO(document))
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del observables
+    finally:
+        set_vocab_interning(False)
+
+    return size, seconds
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    document = make_document(count)
+
+    for name, interning in [("plain", False), ("interned", True)]:
+        size, seconds = measure(document, interning)
+        print("%-10s %8.1f MB  %8.1f ms  (%.1f us/observable)" %
+              (name, size / 1e6, seconds * 1000, seconds * 1e6 / count))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,94 +6,135 @@ import sys
 from mixbox.binding_utils import *
 from . import cybox_common
 
-#Object Imports
-from cybox.bindings.account_object import AccountObjectType
-from cybox.bindings.address_object import AddressObjectType
-from cybox.bindings.api_object import APIObjectType
-from cybox.bindings.archive_file_object import ArchiveFileObjectType
-from cybox.bindings.arp_cache_object import ARPCacheObjectType
-from cybox.bindings.artifact_object import ArtifactObjectType
-from cybox.bindings.as_object import ASObjectType
-from cybox.bindings.code_object import CodeObjectType
-from cybox.bindings.custom_object import CustomObjectType
-from cybox.bindings.device_object import DeviceObjectType
-from cybox.bindings.disk_object import DiskObjectType
-from cybox.bindings.disk_partition_object import DiskPartitionObjectType
-from cybox.bindings.dns_cache_object import DNSCacheObjectType
-from cybox.bindings.dns_query_object import DNSQueryObjectType
-from cybox.bindings.dns_record_object import DNSRecordObjectType
-from cybox.bindings.domain_name_object import DomainNameObjectType
-from cybox.bindings.email_message_object import EmailMessageObjectType
-from cybox.bindings.file_object import FileObjectType
-from cybox.bindings.gui_dialogbox_object import GUIDialogboxObjectType
-from cybox.bindings.gui_object import GUIObjectType
-from cybox.bindings.gui_window_object import GUIWindowObjectType
-from cybox.bindings.hostname_object import HostnameObjectType
-from cybox.bindings.http_session_object import HTTPSessionObjectType
-from cybox.bindings.image_file_object import ImageFileObjectType
-from cybox.bindings.library_object import LibraryObjectType
-from cybox.bindings.link_object import LinkObjectType
-from cybox.bindings.linux_package_object import LinuxPackageObjectType
-from cybox.bindings.memory_object import MemoryObjectType
-from cybox.bindings.mutex_object import MutexObjectType
-from cybox.bindings.network_connection_object import NetworkConnectionObjectType
-from cybox.bindings.network_flow_object import NetworkFlowObjectType
-from cybox.bindings.network_packet_object import NetworkPacketObjectType
-from cybox.bindings.network_route_entry_object import NetworkRouteEntryObjectType
-from cybox.bindings.network_route_object import NetRouteObjectType
-from cybox.bindings.network_socket_object import NetworkSocketObjectType
-from cybox.bindings.network_subnet_object import NetworkSubnetObjectType
-from cybox.bindings.pdf_file_object import PDFFileObjectType
-from cybox.bindings.pipe_object import PipeObjectType
-from cybox.bindings.port_object import PortObjectType
-from cybox.bindings.product_object import ProductObjectType
-from cybox.bindings.process_object import ProcessObjectType
-from cybox.bindings.semaphore_object import SemaphoreObjectType
-from cybox.bindings.sms_message_object import SMSMessageObjectType
-from cybox.bindings.socket_address_object import SocketAddressObjectType
-from cybox.bindings.system_object import SystemObjectType
-from cybox.bindings.unix_file_object import UnixFileObjectType
-from cybox.bindings.unix_network_route_entry_object import UnixNetworkRouteEntryObjectType
-from cybox.bindings.unix_pipe_object import UnixPipeObjectType
-from cybox.bindings.unix_process_object import UnixProcessObjectType
-from cybox.bindings.unix_user_account_object import UnixUserAccountObjectType
-from cybox.bindings.unix_volume_object import UnixVolumeObjectType
-from cybox.bindings.uri_object import URIObjectType
-from cybox.bindings.url_history_object import URLHistoryObjectType
-from cybox.bindings.user_account_object import UserAccountObjectType
-from cybox.bindings.volume_object import VolumeObjectType
-from cybox.bindings.whois_object import WhoisObjectType
-from cybox.bindings.win_computer_account_object import WindowsComputerAccountObjectType
-from cybox.bindings.win_critical_section_object import WindowsCriticalSectionObjectType
-from cybox.bindings.win_driver_object import WindowsDriverObjectType
-from cybox.bindings.win_event_log_object import WindowsEventLogObjectType
-from cybox.bindings.win_event_object import WindowsEventObjectType
-from cybox.bindings.win_executable_file_object import WindowsExecutableFileObjectType
-from cybox.bindings.win_file_object import WindowsFileObjectType
-from cybox.bindings.win_filemapping_object import WindowsFilemappingObjectType
-from cybox.bindings.win_handle_object import WindowsHandleObjectType
-from cybox.bindings.win_hook_object import WindowsHookObjectType
-from cybox.bindings.win_kernel_hook_object import WindowsKernelHookObjectType
-from cybox.bindings.win_kernel_object import WindowsKernelObjectType
-from cybox.bindings.win_mailslot_object import WindowsMailslotObjectType
-from cybox.bindings.win_memory_page_region_object import WindowsMemoryPageRegionObjectType
-from cybox.bindings.win_mutex_object import WindowsMutexObjectType
-from cybox.bindings.win_network_route_entry_object import WindowsNetworkRouteEntryObjectType
-from cybox.bindings.win_network_share_object import WindowsNetworkShareObjectType
-from cybox.bindings.win_pipe_object import WindowsPipeObjectType
-from cybox.bindings.win_prefetch_object import WindowsPrefetchObjectType
-from cybox.bindings.win_process_object import WindowsProcessObjectType
-from cybox.bindings.win_registry_key_object import WindowsRegistryKeyObjectType
-from cybox.bindings.win_semaphore_object import WindowsSemaphoreObjectType
-from cybox.bindings.win_service_object import WindowsServiceObjectType
-from cybox.bindings.win_system_object import WindowsSystemObjectType
-from cybox.bindings.win_system_restore_object import WindowsSystemRestoreObjectType
-from cybox.bindings.win_task_object import WindowsTaskObjectType
-from cybox.bindings.win_thread_object import WindowsThreadObjectType
-from cybox.bindings.win_user_account_object import WindowsUserAccountObjectType
-from cybox.bindings.win_volume_object import WindowsVolumeObjectType
-from cybox.bindings.win_waitable_timer_object import WindowsWaitableTimerObjectType
-from cybox.bindings.x509_certificate_object import X509CertificateObjectType
+# Object bindings are only imported when one of their types is first
+# needed (see _get_class()), since importing all of them is slow.  Names
+# without a dot are modules in cybox.bindings.
+_OBJECT_BINDINGS = {
+    'AccountObjectType': 'account_object',
+    'AddressObjectType': 'address_object',
+    'APIObjectType': 'api_object',
+    'ArchiveFileObjectType': 'archive_file_object',
+    'ARPCacheObjectType': 'arp_cache_object',
+    'ArtifactObjectType': 'artifact_object',
+    'ASObjectType': 'as_object',
+    'CodeObjectType': 'code_object',
+    'CustomObjectType': 'custom_object',
+    'DeviceObjectType': 'device_object',
+    'DiskObjectType': 'disk_object',
+    'DiskPartitionObjectType': 'disk_partition_object',
+    'DNSCacheObjectType': 'dns_cache_object',
+    'DNSQueryObjectType': 'dns_query_object',
+    'DNSRecordObjectType': 'dns_record_object',
+    'DomainNameObjectType': 'domain_name_object',
+    'EmailMessageObjectType': 'email_message_object',
+    'FileObjectType': 'file_object',
+    'GUIDialogboxObjectType': 'gui_dialogbox_object',
+    'GUIObjectType': 'gui_object',
+    'GUIWindowObjectType': 'gui_window_object',
+    'HostnameObjectType': 'hostname_object',
+    'HTTPSessionObjectType': 'http_session_object',
+    'ImageFileObjectType': 'image_file_object',
+    'LibraryObjectType': 'library_object',
+    'LinkObjectType': 'link_object',
+    'LinuxPackageObjectType': 'linux_package_object',
+    'MemoryObjectType': 'memory_object',
+    'MutexObjectType': 'mutex_object',
+    'NetworkConnectionObjectType': 'network_connection_object',
+    'NetworkFlowObjectType': 'network_flow_object',
+    'NetworkPacketObjectType': 'network_packet_object',
+    'NetworkRouteEntryObjectType': 'network_route_entry_object',
+    'NetRouteObjectType': 'network_route_object',
+    'NetworkSocketObjectType': 'network_socket_object',
+    'NetworkSubnetObjectType': 'network_subnet_object',
+    'PDFFileObjectType': 'pdf_file_object',
+    'PipeObjectType': 'pipe_object',
+    'PortObjectType': 'port_object',
+    'ProductObjectType': 'product_object',
+    'ProcessObjectType': 'process_object',
+    'SemaphoreObjectType': 'semaphore_object',
+    'SMSMessageObjectType': 'sms_message_object',
+    'SocketAddressObjectType': 'socket_address_object',
+    'SystemObjectType': 'system_object',
+    'UnixFileObjectType': 'unix_file_object',
+    'UnixNetworkRouteEntryObjectType': 'unix_network_route_entry_object',
+    'UnixPipeObjectType': 'unix_pipe_object',
+    'UnixProcessObjectType': 'unix_process_object',
+    'UnixUserAccountObjectType': 'unix_user_account_object',
+    'UnixVolumeObjectType': 'unix_volume_object',
+    'URIObjectType': 'uri_object',
+    'URLHistoryObjectType': 'url_history_object',
+    'UserAccountObjectType': 'user_account_object',
+    'VolumeObjectType': 'volume_object',
+    'WhoisObjectType': 'whois_object',
+    'WindowsComputerAccountObjectType': 'win_computer_account_object',
+    'WindowsCriticalSectionObjectType': 'win_critical_section_object',
+    'WindowsDriverObjectType': 'win_driver_object',
+    'WindowsEventLogObjectType': 'win_event_log_object',
+    'WindowsEventObjectType': 'win_event_object',
+    'WindowsExecutableFileObjectType': 'win_executable_file_object',
+    'WindowsFileObjectType': 'win_file_object',
+    'WindowsFilemappingObjectType': 'win_filemapping_object',
+    'WindowsHandleObjectType': 'win_handle_object',
+    'WindowsHookObjectType': 'win_hook_object',
+    'WindowsKernelHookObjectType': 'win_kernel_hook_object',
+    'WindowsKernelObjectType': 'win_kernel_object',
+    'WindowsMailslotObjectType': 'win_mailslot_object',
+    'WindowsMemoryPageRegionObjectType': 'win_memory_page_region_object',
+    'WindowsMutexObjectType': 'win_mutex_object',
+    'WindowsNetworkRouteEntryObjectType': 'win_network_route_entry_object',
+    'WindowsNetworkShareObjectType': 'win_network_share_object',
+    'WindowsPipeObjectType': 'win_pipe_object',
+    'WindowsPrefetchObjectType': 'win_prefetch_object',
+    'WindowsProcessObjectType': 'win_process_object',
+    'WindowsRegistryKeyObjectType': 'win_registry_key_object',
+    'WindowsSemaphoreObjectType': 'win_semaphore_object',
+    'WindowsServiceObjectType': 'win_service_object',
+    'WindowsSystemObjectType': 'win_system_object',
+    'WindowsSystemRestoreObjectType': 'win_system_restore_object',
+    'WindowsTaskObjectType': 'win_task_object',
+    'WindowsThreadObjectType': 'win_thread_object',
+    'WindowsUserAccountObjectType': 'win_user_account_object',
+    'WindowsVolumeObjectType': 'win_volume_object',
+    'WindowsWaitableTimerObjectType': 'win_waitable_timer_object',
+    'X509CertificateObjectType': 'x509_certificate_object',
+}
+
+
+def _get_class(type_name):
+    """Return the binding class named `type_name`.
+
+    Object bindings are imported the first time one of their types is
+    requested.  Raises KeyError for unknown names.
+    """
+    try:
+        return globals()[type_name]
+    except KeyError:
+        pass
+
+    module_name = _OBJECT_BINDINGS[type_name]
+    if '.' not in module_name:
+        module_name = 'cybox.bindings.' + module_name
+    module = __import__(module_name, fromlist=[type_name])
+    klass = getattr(module, type_name)
+    globals()[type_name] = klass
+    return klass
+
+
+def _register_binding(type_name, module_name):
+    """Make _get_class() find `type_name` in the module `module_name`."""
+    _OBJECT_BINDINGS[type_name] = module_name
+    globals().pop(type_name, None)
+
+
+def __getattr__(name):
+    # Python 3.7+ calls this for names not (yet) in the module globals, so
+    # that e.g. ``cybox_core.AddressObjectType`` still works.  Older versions
+    # use _LazyModule (at the end of this module) instead.
+    try:
+        return _get_class(name)
+    except KeyError:
+        raise AttributeError("module %r has no attribute %r" %
+                             (__name__, name))
 
 
 class ObservablesType(GeneratedsSuper):
@@ -1789,7 +1830,7 @@ class ObjectType(GeneratedsSuper):
                     type_name_ = type_names_[0]
                 else:
                     type_name_ = type_names_[1]
-                class_ = globals()[type_name_]
+                class_ = _get_class(type_name_)
                 obj_ = class_.factory()
                 obj_.build(child_)
             else:
@@ -1807,7 +1848,7 @@ class ObjectType(GeneratedsSuper):
                     type_name_ = type_names_[0]
                 else:
                     type_name_ = type_names_[1]
-                class_ = globals()[type_name_]
+                class_ = _get_class(type_name_)
                 obj_ = class_.factory()
                 obj_.build(child_)
             else:
@@ -1848,7 +1889,7 @@ class ObjectType(GeneratedsSuper):
                     type_name_ = type_names_[0]
                 else:
                     type_name_ = type_names_[1]
-                class_ = globals()[type_name_]
+                class_ = _get_class(type_name_)
                 obj_ = class_.factory()
                 obj_.build(child_)
             else:
@@ -3898,7 +3939,10 @@ def get_root_tag(node):
     tag = Tag_pattern_.match(node.tag).groups()[-1]
     rootClass = GDSClassesMapping.get(tag)
     if rootClass is None:
-        rootClass = globals().get(tag)
+        try:
+            rootClass = _get_class(tag)
+        except KeyError:
+            pass
     return tag, rootClass
 
 def parse(inFileName):
@@ -4027,3 +4071,31 @@ def add_external_class(klass, name=None):
 
     module = sys.modules[__name__]
     setattr(module, name, klass)
+
+
+if sys.version_info < (3, 7):
+    import types
+
+    class _LazyModule(types.ModuleType):
+        """Stands in for this module where module ``__getattr__`` (PEP 562)
+        is not supported.
+
+        It holds a copy of the module globals, and looks up missing
+        attributes with _get_class().  Attributes set on it are also set in
+        the module globals, which the bindings use to find classes.
+        """
+
+        def __getattr__(self, name):
+            return _module_globals['__getattr__'](name)
+
+        def __setattr__(self, name, value):
+            _module_globals[name] = value
+            types.ModuleType.__setattr__(self, name, value)
+
+    _module_globals = globals()
+    _module = _LazyModule(__name__, __doc__)
+    _module.__dict__.update(_module_globals)
+    # Python 2 clears the globals of a module once it is garbage collected,
+    # so keep the original module alive.
+    _module.__dict__['_original_module'] = sys.modules[__name__]
+    sys.modules[__name__] = _module
@@ -3,20 +3,39 @@
 
 DEFAULT_DELIM = "##comma##"
 
+
+def _set_fields(obj, values):
+    """Set the attributes in `values` (name, value pairs) on `obj`.
+
+    A value which is the class default is not stored on the instance (and an
+    instance value set earlier is removed), so instances only hold the
+    attributes which were actually given.
+    """
+    attrs = obj.__dict__
+    klass = type(obj)
+    for name, value in values:
+        if value is getattr(klass, name):
+            attrs.pop(name, None)
+        else:
+            setattr(obj, name, value)
+
+
 class PatternFieldGroup(object):
-    """A mixin class for CybOX entities which are patternable."""
-
-    def __init__(self):
-        super(PatternFieldGroup, self).__init__()
-        self.condition = None
-        self.apply_condition = None
-        self.bit_mask = None
-        self.pattern_type = None
-        self.regex_syntax = None
-        self.has_changed = None
-        self.trend = None
-        self.is_case_sensitive = True
-        self.delimiter = DEFAULT_DELIM
+    """A mixin class for CybOX entities which are patternable.
+
+    The pattern fields are rarely used, so their defaults are class
+    attributes: an instance only stores the fields which are set.
+    """
+
+    condition = None
+    apply_condition = None
+    bit_mask = None
+    pattern_type = None
+    regex_syntax = None
+    has_changed = None
+    trend = None
+    is_case_sensitive = True
+    delimiter = DEFAULT_DELIM
 
     def is_plain(self):
         return (
@@ -105,27 +124,31 @@ class PatternFieldGroup(object):
         if not obj:
             return
 
-        partial.condition = obj.condition
-        partial.apply_condition = obj.apply_condition
-        partial.bit_mask = obj.bit_mask
-        partial.pattern_type = obj.pattern_type
-        partial.regex_syntax = obj.regex_syntax
-        partial.has_changed = obj.has_changed
-        partial.trend = obj.trend
-        partial.is_case_sensitive = obj.is_case_sensitive
-        partial.delimiter = obj.delimiter or DEFAULT_DELIM
+        _set_fields(partial, (
+            ('condition', obj.condition),
+            ('apply_condition', obj.apply_condition),
+            ('bit_mask', obj.bit_mask),
+            ('pattern_type', obj.pattern_type),
+            ('regex_syntax', obj.regex_syntax),
+            ('has_changed', obj.has_changed),
+            ('trend', obj.trend),
+            ('is_case_sensitive', obj.is_case_sensitive),
+            ('delimiter', obj.delimiter or DEFAULT_DELIM),
+        ))
 
     @staticmethod
     def from_dict(dict_, partial):
         if not dict_:
             return
 
-        partial.condition = dict_.get('condition')
-        partial.apply_condition = dict_.get('apply_condition')
-        partial.bit_mask = dict_.get('bit_mask')
-        partial.pattern_type = dict_.get('pattern_type')
-        partial.regex_syntax = dict_.get('regex_syntax')
-        partial.has_changed = dict_.get('has_changed')
-        partial.trend = dict_.get('trend')
-        partial.is_case_sensitive = dict_.get('is_case_sensitive', True)
-        partial.delimiter = dict_.get('delimiter', DEFAULT_DELIM)
+        _set_fields(partial, (
+            ('condition', dict_.get('condition')),
+            ('apply_condition', dict_.get('apply_condition')),
+            ('bit_mask', dict_.get('bit_mask')),
+            ('pattern_type', dict_.get('pattern_type')),
+            ('regex_syntax', dict_.get('regex_syntax')),
+            ('has_changed', dict_.get('has_changed')),
+            ('trend', dict_.get('trend')),
+            ('is_case_sensitive', dict_.get('is_case_sensitive', True)),
+            ('delimiter', dict_.get('delimiter', DEFAULT_DELIM)),
+        ))
@@ -0,0 +1,128 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Content fingerprints of CybOX entities.
+
+A fingerprint is the SHA-256 digest of a canonical JSON form of an entity,
+so two entities with the same content have the same fingerprint, whatever
+the order their fields were set in, and whether they were parsed or built
+in code.  Fingerprints make it possible to deduplicate entities with a
+dictionary or set rather than by comparing every pair.
+
+The canonical form follows the ``__eq__`` methods of the entities: fields
+created with ``comparable=False`` are left out, a VocabString is
+represented by its value, and a property ``delimiter`` (which only affects
+how list values are written) is ignored.
+"""
+
+import hashlib
+import json
+
+from mixbox import entities
+from mixbox.vendor import six
+
+from .properties import BaseProperty
+from .vocabs import VocabString
+
+_MISSING = object()
+
+
+def _property_form(prop):
+    form = prop.to_dict()
+    if not isinstance(form, dict):
+        return form
+
+    form.pop('delimiter', None)
+    if form.get('apply_condition') == "ANY":
+        del form['apply_condition']
+    return form
+
+
+def canonical_form(value):
+    """Return the canonical form of `value`, made of JSON types.
+
+    `value` is an Entity, a list of them, or a simple value.  Entities
+    with a ``fingerprint()`` method are represented by their fingerprint,
+    and other entities by :func:`entity_form`.
+    """
+    if isinstance(value, BaseProperty):
+        return _property_form(value)
+    if isinstance(value, VocabString):
+        return value.value
+    if isinstance(value, (list, tuple, entities.EntityList)):
+        return [canonical_form(x) for x in value]
+    if not isinstance(value, entities.Entity):
+        return value
+
+    fingerprint = getattr(value, 'fingerprint', None)
+    if fingerprint is not None:
+        return fingerprint()
+    return entity_form(value)
+
+
+def entity_form(entity, ignore=()):
+    """Return the canonical form of the fields of `entity`.
+
+    Fields whose key name is in `ignore` are left out.  Entities without
+    TypedFields are represented by their ``to_dict()``.
+    """
+    if not entity.typed_fields:
+        form = entity.to_dict()
+        for name in ignore:
+            form.pop(name, None)
+        return form
+
+    form = {}
+    xsi_type = getattr(entity, '_XSI_TYPE', None)
+    if xsi_type:
+        form['xsi:type'] = xsi_type
+    for field, value in six.iteritems(entity._fields):
+        if not field.comparable or field.key_name in ignore:
+            continue
+        if value is None or (isinstance(value, list) and not value):
+            continue
+        form[field.key_name] = canonical_form(value)
+    return form
+
+
+def content_digest(form):
+    """Return the SHA-256 hex digest of the canonical form `form`."""
+    data = json.dumps(form, sort_keys=True, separators=(',', ':'))
+    if isinstance(data, six.text_type):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def field_state(entity):
+    """Return the objects an entity's fingerprint depends on directly.
+
+    These are its TypedFields and their values, the values and attributes
+    (such as a pattern ``condition``) of the properties among them, and the
+    items of list values.  A memoized fingerprint is valid for as long as
+    :func:`same_state` is true of its state.
+    """
+    state = []
+    for field, value in six.iteritems(entity._fields):
+        state.append(field)
+        state.append(value)
+        if isinstance(value, (list, entities.EntityList)):
+            state.extend(value)
+        else:
+            inner = getattr(value, '_value', _MISSING)
+            if inner is not _MISSING:
+                state.append(inner)
+                for name, attr in six.iteritems(vars(value)):
+                    if not name.startswith('_'):
+                        state.append(name)
+                        state.append(attr)
+    return state
+
+
+def same_state(first, second):
+    """Whether two results of :func:`field_state` hold the same objects."""
+    if len(first) != len(second):
+        return False
+    for x, y in zip(first, second):
+        if x is not y:
+            return False
+    return True
@@ -7,6 +7,8 @@ from mixbox import fields
 import cybox.bindings.cybox_common as common_binding
 import cybox.objects
 
+from .fingerprint import (content_digest, entity_form, field_state,
+        same_state)
 from .properties import String
 
 
@@ -79,11 +81,47 @@ class ObjectProperties(entities.Entity):
     object_reference = fields.TypedField("object_reference")
     custom_properties = fields.TypedField("Custom_Properties", CustomProperties)
 
+    # The field state and result of the last fingerprint() call.
+    _fingerprint = None
+
     def __init__(self):
         super(ObjectProperties, self).__init__()
         self.parent = None
         self.custom_properties = None
 
+    @classmethod
+    def _iter_typed_fields(cls):
+        # Entity.typed_fields calls this for every instance, and inspecting
+        # the class each time is most of the cost of from_dict().
+        typed_fields = cls.__dict__.get('_typed_fields_list')
+        if typed_fields is None:
+            typed_fields = list(super(ObjectProperties, cls)._iter_typed_fields())
+            cls._typed_fields_list = typed_fields
+        return iter(typed_fields)
+
+    def fingerprint(self):
+        """Return a fingerprint of the content of these properties.
+
+        The fingerprint is a SHA-256 hex digest of a canonical form of the
+        fields (see :mod:`cybox.common.fingerprint`), so equal properties
+        have the same fingerprint.  The parent Object and its id are not
+        part of it.
+
+        The result is remembered until a field is set, the value or an
+        attribute (such as the pattern ``condition``) of a property field
+        changes, or an item is added to or removed from a list field.  Changes further down (such as setting the value of a
+        Hash in a HashList) are not noticed; set the field again after
+        making them.
+        """
+        state = field_state(self)
+        memo = self._fingerprint
+        if memo is not None and same_state(memo[0], state):
+            return memo[1]
+
+        digest = content_digest(entity_form(self))
+        self._fingerprint = (state, digest)
+        return digest
+
     @property
     def parent(self):
         import cybox.core
@@ -149,7 +187,7 @@ class ObjectProperties(entities.Entity):
         # example, Address), we can skip directly to the entities.Entity
         # implementation.
         if cls is not ObjectProperties:
-            return super(ObjectProperties, cls()).from_obj(defobj_obj)
+            return super(ObjectProperties, cls).from_obj(defobj_obj)
 
         if not defobj_obj:
             return None
@@ -173,7 +211,7 @@ class ObjectProperties(entities.Entity):
     def from_dict(cls, defobj_dict, defobj=None):
         # Also a hack. See comment on from_obj
         if cls is not ObjectProperties:
-            return super(ObjectProperties, cls()).from_dict(defobj_dict)
+            return super(ObjectProperties, cls).from_dict(defobj_dict)
 
         if not defobj_dict:
             return None
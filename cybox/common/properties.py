@@ -11,6 +11,7 @@ from mixbox.vendor import six
 from cybox.compat import long
 import cybox.bindings.cybox_common as common_binding
 from cybox.common import PatternFieldGroup
+from cybox.common.attribute_groups import _set_fields
 from cybox.utils import normalize_to_xml, denormalize_from_xml
 
 DATE_PRECISION_VALUES = ("year", "month", "day")
@@ -26,25 +27,55 @@ class BaseProperty(PatternFieldGroup, entities.Entity):
     _namespace = 'http://cybox.mitre.org/common-2'
     default_datatype = 'string'
 
+    # The value is kept in a slot.  The other fields are rarely set, so (like
+    # ``datatype``) their defaults are class-level variables, and only the
+    # fields which are set are stored in the instance __dict__.
+    __slots__ = ('_value',)
+
+    # If `True`, force the "datatype" attribute to be output. This is
+    # necessary in some cases
+    _force_datatype = False
+
+    # BaseObjectProperty Group
+    id_ = None
+    idref = None
+    appears_random = None
+    is_obfuscated = None
+    obfuscation_algorithm_ref = None
+    is_defanged = None
+    defanging_algorithm_ref = None
+    refanging_transform_type = None
+    refanging_transform = None
+    observed_encoding = None
+
     def __init__(self, value=None):
         super(BaseProperty, self).__init__()
         self.value = value
-        # If `True`, force the "datatype" attribute to be output. This is
-        # necessary in some cases
-        self._force_datatype = False
-
-        # BaseObjectProperty Group
-        self.id_ = None
-        self.idref = None
-        # ``datatype`` is a class-level variable
-        self.appears_random = None
-        self.is_obfuscated = None
-        self.obfuscation_algorithm_ref = None
-        self.is_defanged = None
-        self.defanging_algorithm_ref = None
-        self.refanging_transform_type = None
-        self.refanging_transform = None
-        self.observed_encoding = None
+
+    @classmethod
+    def _new(cls):
+        """Return an instance without a value for ``from_obj()`` and
+        ``from_dict()``, which set the value themselves.
+
+        This skips parsing the None value in ``__init__()``.  Subclasses
+        which define their own ``__init__()`` are created by calling it.
+        """
+        if six.get_unbound_function(cls.__init__) is not _BASE_INIT:
+            return cls()
+        attr = cls.__new__(cls)
+        entities.Entity.__init__(attr)
+        attr._value = None
+        return attr
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_value'] = self._value
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        self._value = state.pop('_value', None)
+        self.__dict__.update(state)
 
     def __str__(self):
         return six.text_type(self.serialized_value)
@@ -189,6 +220,11 @@ class BaseProperty(PatternFieldGroup, entities.Entity):
         self._collect_ns_info(ns_info)
 
         attr_obj = self._binding_class()
+        self._populate_obj(attr_obj, ns_info=ns_info)
+        return attr_obj
+
+    def _populate_obj(self, attr_obj, ns_info=None):
+        """Set the fields of the binding object `attr_obj` in place."""
         attr_obj.set_valueOf_(normalize_to_xml(self.serialized_value,
                                                self.delimiter))
         # For now, don't output the datatype, as it is not required and is
@@ -223,8 +259,6 @@ class BaseProperty(PatternFieldGroup, entities.Entity):
 
         PatternFieldGroup.to_obj(self, return_obj=attr_obj, ns_info=ns_info)
 
-        return attr_obj
-
     def to_dict(self):
         if self.is_plain():
             return self.serialized_value
@@ -271,23 +305,24 @@ class BaseProperty(PatternFieldGroup, entities.Entity):
         if not attr_obj:
             return None
 
-        attr = cls()
+        attr = cls._new()
         attr._populate_from_obj(attr_obj)
         return attr
 
     def _populate_from_obj(self, attr_obj):
-
-        self.id_ = attr_obj.id
-        self.idref = attr_obj.idref
-        self.datatype = attr_obj.datatype
-        self.appears_random = attr_obj.appears_random
-        self.is_obfuscated = attr_obj.is_obfuscated
-        self.obfuscation_algorithm_ref = attr_obj.obfuscation_algorithm_ref
-        self.is_defanged = attr_obj.is_defanged
-        self.defanging_algorithm_ref = attr_obj.defanging_algorithm_ref
-        self.refanging_transform_type = attr_obj.refanging_transform_type
-        self.refanging_transform = attr_obj.refanging_transform
-        self.observed_encoding = attr_obj.observed_encoding
+        _set_fields(self, (
+            ('id_', attr_obj.id),
+            ('idref', attr_obj.idref),
+            ('datatype', attr_obj.datatype),
+            ('appears_random', attr_obj.appears_random),
+            ('is_obfuscated', attr_obj.is_obfuscated),
+            ('obfuscation_algorithm_ref', attr_obj.obfuscation_algorithm_ref),
+            ('is_defanged', attr_obj.is_defanged),
+            ('defanging_algorithm_ref', attr_obj.defanging_algorithm_ref),
+            ('refanging_transform_type', attr_obj.refanging_transform_type),
+            ('refanging_transform', attr_obj.refanging_transform),
+            ('observed_encoding', attr_obj.observed_encoding),
+        ))
 
         PatternFieldGroup.from_obj(attr_obj, self)
 
@@ -305,7 +340,7 @@ class BaseProperty(PatternFieldGroup, entities.Entity):
             return None
 
         # Use the subclass this was called on to initialize the object.
-        attr = cls()
+        attr = cls._new()
         attr._populate_from_dict(attr_dict)
         return attr
 
@@ -319,25 +354,29 @@ class BaseProperty(PatternFieldGroup, entities.Entity):
             # This key should always be present
             self.value = attr_dict.get('value')
 
-            # This defaults to False if missing
-            self._force_datatype = attr_dict.get('force_datatype', False)
-
-            # 'None' is fine if these keys are missing
-            self.id_ = attr_dict.get('id')
-            self.idref = attr_dict.get('idref')
-            self.appears_random = attr_dict.get('appears_random')
-            self.datatype = attr_dict.get('datatype')
-            self.is_obfuscated = attr_dict.get('is_obfuscated')
-            self.obfuscation_algorithm_ref = attr_dict.get('obfuscation_algorithm_ref')
-            self.is_defanged = attr_dict.get('is_defanged')
-            self.defanging_algorithm_ref = attr_dict.get('defanging_algorithm_ref')
-            self.refanging_transform_type = attr_dict.get('refanging_transform_type')
-            self.refanging_transform = attr_dict.get('refanging_transform')
-            self.observed_encoding = attr_dict.get('observed_encoding')
+            # 'None' is fine if these keys are missing, and
+            # 'force_datatype' defaults to False.
+            _set_fields(self, (
+                ('_force_datatype', attr_dict.get('force_datatype', False)),
+                ('id_', attr_dict.get('id')),
+                ('idref', attr_dict.get('idref')),
+                ('appears_random', attr_dict.get('appears_random')),
+                ('datatype', attr_dict.get('datatype')),
+                ('is_obfuscated', attr_dict.get('is_obfuscated')),
+                ('obfuscation_algorithm_ref', attr_dict.get('obfuscation_algorithm_ref')),
+                ('is_defanged', attr_dict.get('is_defanged')),
+                ('defanging_algorithm_ref', attr_dict.get('defanging_algorithm_ref')),
+                ('refanging_transform_type', attr_dict.get('refanging_transform_type')),
+                ('refanging_transform', attr_dict.get('refanging_transform')),
+                ('observed_encoding', attr_dict.get('observed_encoding')),
+            ))
 
             PatternFieldGroup.from_dict(attr_dict, self)
 
 
+_BASE_INIT = six.get_unbound_function(BaseProperty.__init__)
+
+
 class String(BaseProperty):
     _binding_class = common_binding.StringObjectPropertyType
     datatype = "string"
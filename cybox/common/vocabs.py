@@ -8,7 +8,7 @@ from mixbox import fields
 from mixbox.vendor import six
 
 import cybox.bindings.cybox_common as common_binding
-from cybox.common import PatternFieldGroup
+from cybox.common import DEFAULT_DELIM, PatternFieldGroup
 from cybox.utils import normalize_to_xml, denormalize_from_xml
 
 
@@ -55,7 +55,7 @@ class VocabField(fields.TypedField):
         elif isinstance(value, VocabString):
             return value
         elif vocab._try_cast:  # noqa
-            return vocab(value)
+            return _new_vocab(vocab, value)
 
         error_fmt = "%s must be a %s, not a %s"
         error = error_fmt % (self.name, self.type_, type(value))
@@ -69,6 +69,8 @@ class VocabString(PatternFieldGroup, entities.Entity):
     _ALLOWED_VALUES = None
     _binding = common_binding
     _binding_class = common_binding.ControlledVocabularyStringType
+    # True on the instances shared by interning (see set_vocab_interning).
+    _shared = False
 
     def __init__(self, value=None):
         super(VocabString, self).__init__()
@@ -95,6 +97,14 @@ class VocabString(PatternFieldGroup, entities.Entity):
         else:
             self._value = v
 
+    def __setattr__(self, name, value):
+        if self._shared and name in _VOCAB_ATTRIBUTES:
+            error = ("Cannot change the shared %s '%s'; set the field to a "
+                     "new %s instead")
+            klass = type(self).__name__
+            raise AttributeError(error % (klass, self.value, klass))
+        super(VocabString, self).__setattr__(name, value)
+
     def __str__(self):
         return str(self.value)
 
@@ -121,13 +131,21 @@ class VocabString(PatternFieldGroup, entities.Entity):
         if not xsi_type:
             return VocabString
 
+        try:
+            return _lookup_cache[xsi_type]
+        except KeyError:
+            pass
+
+        klass = VocabString
         for (k, v) in six.iteritems(_VOCAB_MAP):
             # TODO: for now we ignore the prefix and just check for
             # a partial match
             if xsi_type in k:
-                return v
+                klass = v
+                break
 
-        return VocabString
+        _lookup_cache[xsi_type] = klass
+        return klass
 
     def to_obj(self, return_obj=None, ns_info=None):
         self._collect_ns_info(ns_info)
@@ -172,8 +190,14 @@ class VocabString(PatternFieldGroup, entities.Entity):
         if not vocab_obj:
             return None
 
+        key = None
         if not return_obj:
             klass = VocabString.lookup_class(vocab_obj.xsi_type)
+            if _interned is not None and _is_plain_binding(vocab_obj):
+                key = (klass, vocab_obj.xsi_type, vocab_obj.valueOf_)
+                shared = _interned.get(key)
+                if shared is not None:
+                    return shared
             return_obj = klass()
 
         # xsi_type should be set automatically by the class's constructor.
@@ -191,6 +215,9 @@ class VocabString(PatternFieldGroup, entities.Entity):
             delimiter=return_obj.delimiter
         )
 
+        if key is not None:
+            _share(return_obj, key)
+
         return return_obj
 
     @classmethod
@@ -198,9 +225,16 @@ class VocabString(PatternFieldGroup, entities.Entity):
         if not vocab_dict:
             return None
 
+        key = None
         if not return_obj:
             if isinstance(vocab_dict, dict):
                 klass = VocabString.lookup_class(vocab_dict.get('xsi:type'))
+                if _interned is not None and _is_plain_dict(vocab_dict):
+                    key = (klass, vocab_dict.get('xsi:type', cls._XSI_TYPE),
+                           vocab_dict.get('value'))
+                    shared = _interned.get(key)
+                    if shared is not None:
+                        return shared
                 return_obj = klass()
             else:
                 return_obj = cls()
@@ -216,11 +250,17 @@ class VocabString(PatternFieldGroup, entities.Entity):
 
             PatternFieldGroup.from_dict(vocab_dict, return_obj)
 
+        if key is not None:
+            _share(return_obj, key)
+
         return return_obj
 
 #: Mapping of Controlled Vocabulary xsi:type's to their class implementations.
 _VOCAB_MAP = {}
 
+# Memoized results of VocabString.lookup_class(), by xsi:type.
+_lookup_cache = {}
+
 def _get_terms(vocab_class):
     """Helper function used by register_vocab."""
     for k, v in vocab_class.__dict__.items():
@@ -236,11 +276,110 @@ def register_vocab(cls):
     beginning with ``TERM_``.
     """
     _VOCAB_MAP[cls._XSI_TYPE] = cls  # noqa
+    _lookup_cache.clear()
 
     cls._ALLOWED_VALUES = tuple(_get_terms(cls))
     return cls
 
 
+# The interned VocabString instances by (class, xsi:type, value), or None if
+# interning is turned off.
+_interned = None
+
+
+def set_vocab_interning(enabled):
+    """Turn the interning of plain controlled vocabulary values on or off.
+
+    With interning on, parsing a vocabulary value which has no attributes
+    other than its ``xsi:type`` (or setting a VocabField to a string) gives
+    an instance shared by every occurrence of that value, instead of a new
+    VocabString each time.  This saves memory and time when parsing large
+    documents, where values such as ``MD5`` occur many times.
+
+    Only the VocabString subclasses registered with :func:`register_vocab`
+    are interned.  Shared instances cannot be changed: setting an attribute
+    on one, such as a pattern ``condition``, raises an AttributeError.  Set
+    the field to a new instance instead::
+
+        hash_.type_ = HashName("MD5")
+        hash_.type_.condition = "Equals"
+
+    Turning interning off drops the table of shared instances.  Returns
+    whether interning was on.
+    """
+    global _interned
+    was_enabled = _interned is not None
+    if not enabled:
+        _interned = None
+    elif _interned is None:
+        _interned = {}
+    return was_enabled
+
+
+def _is_plain_binding(vocab_obj):
+    """Whether a ControlledVocabularyStringType has only a value and
+    xsi:type.
+    """
+    return (
+        isinstance(vocab_obj.valueOf_, six.string_types) and
+        vocab_obj.vocab_name is None and
+        vocab_obj.vocab_reference is None and
+        vocab_obj.condition is None and
+        vocab_obj.apply_condition in (None, "ANY") and
+        vocab_obj.bit_mask is None and
+        vocab_obj.pattern_type is None and
+        vocab_obj.regex_syntax is None and
+        vocab_obj.has_changed is None and
+        vocab_obj.trend is None and
+        vocab_obj.is_case_sensitive in (None, True) and
+        vocab_obj.delimiter in (None, DEFAULT_DELIM)
+    )
+
+
+_PLAIN_DICT_KEYS = frozenset(['value', 'xsi:type'])
+
+
+def _is_plain_dict(vocab_dict):
+    return (isinstance(vocab_dict.get('value'), six.string_types) and
+            _PLAIN_DICT_KEYS.issuperset(vocab_dict))
+
+
+def _share(vocab, key):
+    """Make `vocab` the shared instance for `key`, if it can be shared."""
+    table = _interned
+    if table is None or _VOCAB_MAP.get(vocab._XSI_TYPE) is not type(vocab):
+        return vocab
+    if vocab.value is None or isinstance(vocab.value, list) or \
+            vocab.vocab_name is not None or \
+            vocab.vocab_reference is not None or \
+            not PatternFieldGroup.is_plain(vocab):
+        return vocab
+
+    vocab._shared = True
+    return table.setdefault(key, vocab)
+
+
+def _new_vocab(klass, value):
+    """Return ``klass(value)``, or the interned instance for it."""
+    table = _interned
+    if table is None or not isinstance(value, six.string_types):
+        return klass(value)
+
+    key = (klass, klass._XSI_TYPE, value)
+    try:
+        return table[key]
+    except KeyError:
+        return _share(klass(value), key)
+
+
+# The VocabString attributes which cannot be set on a shared instance.
+_VOCAB_ATTRIBUTES = frozenset([
+    'value', 'xsi_type', 'vocab_name', 'vocab_reference', 'condition',
+    'apply_condition', 'bit_mask', 'pattern_type', 'regex_syntax',
+    'has_changed', 'trend', 'is_case_sensitive', 'delimiter',
+])
+
+
 @register_vocab
 class EventType(VocabString):
     _namespace = 'http://cybox.mitre.org/default_vocabularies-2'
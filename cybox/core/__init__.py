@@ -18,3 +18,5 @@ from .event import Event, EventType
 from .pattern_fidelity import (PatternFidelity, ObfuscationTechniques,
                                ObfuscationTechnique)
 from .observable import Observable, Observables, ObservableComposition
+from .stream import ObservablesReader, ObservablesWriter
+from .dedupe import ObservableDeduplicator
@@ -37,7 +37,7 @@ class AssociatedObject(Object):
     def from_obj(object_obj):
         if not object_obj:
             return None
-        obj = Object.from_obj(object_obj, AssociatedObject())
+        obj = Object.from_obj(object_obj, AssociatedObject._new())
         obj.association_type = VocabString.from_obj(object_obj.Association_Type)
         return obj
 
@@ -45,6 +45,6 @@ class AssociatedObject(Object):
     def from_dict(object_dict):
         if not object_dict:
             return None
-        obj = Object.from_dict(object_dict, AssociatedObject())
+        obj = Object.from_dict(object_dict, AssociatedObject._new())
         obj.association_type = VocabString.from_dict(object_dict.get('association_type', None))
         return obj
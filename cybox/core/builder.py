@@ -0,0 +1,521 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Build API entities directly from lxml elements.
+
+The default deserialization path builds a complete tree of generateDS binding
+objects and then converts it with ``from_obj()``.  The functions in this
+module walk the lxml tree instead and create the API entities as they go,
+using the :class:`mixbox.fields.TypedField` declarations on each Entity to
+decide how a child element should be built.
+
+Binding objects are still used where they are cheap or where an Entity has
+custom ``from_obj()`` logic:
+
+* Each element gets a *shallow* binding object, created without running the
+  binding's ``__init__``, which only holds the element's attributes and any
+  children that are not Entities (strings, integers, etc.).
+* Entities with a custom ``from_obj()`` are passed a shallow binding when
+  the element has no child elements, or a fully built binding otherwise.
+
+The binding class of a child element is learned from the parent binding's
+``buildChildren()`` the first time each (parent, element name, xsi:type)
+combination is seen, so the result is the same as going through
+``from_obj()``.
+"""
+
+from mixbox import entities
+from mixbox.binding_utils import GeneratedsSuper, find_attr_value_
+from mixbox.vendor import six
+from mixbox.xml import get_etree_root
+
+import cybox.bindings.cybox_core as core_binding
+import cybox.objects
+import cybox.utils
+from cybox.common import (MeasureSource, ObjectProperties, StructuredText,
+        VocabString)
+from cybox.core.event import Event
+from cybox.core.object import DomainSpecificObjectProperties, Object, RelatedObject
+from cybox.core.observable import (Keywords, Observable,
+        ObservableComposition, Observables)
+from cybox.core.pattern_fidelity import PatternFidelity
+
+_XSI_TYPE = '{http://www.w3.org/2001/XMLSchema-instance}type'
+
+# Marks a child that is not a binding object (for example an xs:string).
+_SIMPLE = object()
+
+# Memoized binding class of child elements, keyed by
+# (parent binding class, element name, xsi:type).
+_child_classes = {}
+
+# Memoized per-class data.
+_prototypes = {}
+_builders = {}
+_entity_specs = {}
+
+# (Entity class, binding class) pairs that need the binding path.
+_fallbacks = set()
+
+
+class _Unsupported(Exception):
+    """Raised when an element cannot be built directly."""
+
+
+def _localname(tag):
+    return tag[tag.rfind('}') + 1:]
+
+
+def _prototype(binding_class):
+    try:
+        return _prototypes[binding_class]
+    except KeyError:
+        pass
+
+    proto = binding_class()
+    attrs = dict(vars(proto))
+    lists = tuple(k for k, v in six.iteritems(attrs) if isinstance(v, list))
+    has_text = 'get_all_text_' in binding_class.build.__code__.co_names
+
+    _prototypes[binding_class] = result = (attrs, lists, has_text)
+    return result
+
+
+def _blank_binding(binding_class):
+    """Return the equivalent of ``binding_class()`` without calling __init__.
+    """
+    attrs, lists, has_text = _prototype(binding_class)
+
+    obj = binding_class.__new__(binding_class)
+    obj.__dict__.update(attrs)
+    for name in lists:
+        setattr(obj, name, [])
+
+    return obj
+
+
+def _new_binding(binding_class, elem):
+    """Return a binding object holding the attributes (and text) of `elem`.
+
+    Child elements are not built.
+    """
+    obj = _blank_binding(binding_class)
+
+    if elem.attrib:
+        obj.buildAttributes(elem, elem.attrib, set())
+    if _prototype(binding_class)[2]:
+        obj.valueOf_ = _get_all_text(elem)
+
+    return obj
+
+
+def _get_all_text(elem):
+    text = elem.text or ''
+    for child in elem:
+        if child.tail is not None:
+            text += child.tail
+    return text
+
+
+def _full_binding(binding_class, elem):
+    obj = binding_class.factory()
+    obj.build(elem)
+    return obj
+
+
+def _from_binding(binding, elem, name, attr, klass):
+    """Build `elem` with the parent binding and convert it with from_obj()."""
+    if not hasattr(binding, attr):
+        raise _Unsupported(name)
+
+    binding.buildChildren(elem, elem.getparent(), name)
+    value = getattr(binding, attr)
+    if isinstance(value, list):
+        value = value[-1] if value else None
+
+    return value, klass.from_obj(value)
+
+
+def _build_children(binding, elem, specs, children=None):
+    """Build the children of `elem`.
+
+    `specs` maps element names to ``(attribute, class, multiple)`` tuples,
+    where ``attribute`` is the name used by the binding class. Children
+    which are not in `specs` are added to `binding`.
+
+    Returns a dictionary mapping attribute names to built values.
+    """
+    built = {}
+    binding_class = type(binding)
+
+    if children is None:
+        children = elem
+
+    for child in children:
+        name = _localname(child.tag)
+        spec = specs.get(name)
+        if spec is None:
+            binding.buildChildren(child, elem, name)
+            continue
+
+        attr, klass, multiple = spec
+
+        xsi_type = None
+        if _XSI_TYPE in child.attrib:
+            xsi_type = find_attr_value_('xsi:type', child)
+        key = (binding_class, name, xsi_type)
+
+        child_class = _child_classes.get(key)
+        if child_class is None or child_class is _SIMPLE:
+            obj, value = _from_binding(binding, child, name, attr, klass)
+            if child_class is None:
+                if isinstance(obj, GeneratedsSuper):
+                    _child_classes[key] = type(obj)
+                else:
+                    _child_classes[key] = _SIMPLE
+        else:
+            value = build(child, klass, child_class)
+
+        if multiple:
+            built.setdefault(attr, []).append(value)
+        else:
+            built[attr] = value
+
+    return built
+
+
+def _get(built, binding, attr, klass):
+    """Return the built value for `attr`, or convert the binding's value."""
+    if attr in built:
+        return built[attr]
+    return klass.from_obj(getattr(binding, attr))
+
+
+def _default_from_obj(klass):
+    """Return True if `klass` uses the TypedField-based from_obj()."""
+    func = getattr(klass.from_obj, '__func__', klass.from_obj)
+
+    if func is _ENTITY_FROM_OBJ or func is _LIST_FROM_OBJ:
+        return True
+
+    # ObjectProperties.from_obj() defers to Entity.from_obj() on subclasses.
+    return (func is _OBJECT_PROPERTIES_FROM_OBJ and
+            klass is not ObjectProperties)
+
+
+_ENTITY_FROM_OBJ = entities.Entity.from_obj.__func__
+_LIST_FROM_OBJ = entities.EntityList.from_obj.__func__
+_OBJECT_PROPERTIES_FROM_OBJ = ObjectProperties.from_obj.__func__
+
+
+def _entity_specs_for(klass):
+    try:
+        return _entity_specs[klass]
+    except KeyError:
+        pass
+
+    if issubclass(klass, entities.EntityList):
+        typed_fields = []
+        specs = {
+            klass._binding_var: (klass._binding_var, klass._contained_type, True)
+        }
+    else:
+        typed_fields = list(klass._iter_typed_fields())
+        specs = {}
+        for field in typed_fields:
+            if field.type_ is not None:
+                specs[field.name] = (field.name, field.type_, field.multiple)
+
+    _entity_specs[klass] = result = (typed_fields, specs)
+    return result
+
+
+def _build_entity(klass, binding_class, elem):
+    """Equivalent of ``Entity.from_obj()``."""
+    typed_fields, specs = _entity_specs_for(klass)
+    entity = klass()
+    binding = _new_binding(binding_class, elem)
+    built = _build_children(binding, elem, specs)
+
+    # Entity.typed_fields is computed per instance, which is slow.
+    for field in typed_fields:
+        name = field.name
+        if name in built:
+            val = built[name]
+        else:
+            val = getattr(binding, name)
+            if field.type_ and val is not None:
+                if field.multiple:
+                    val = [field.type_.from_obj(x) for x in val]
+                else:
+                    val = field.type_.from_obj(val)
+
+        field.__set__(entity, val)
+
+    return entity
+
+
+def _build_entity_list(klass, binding_class, elem):
+    """Equivalent of ``EntityList.from_obj()``."""
+    typed_fields, specs = _entity_specs_for(klass)
+    list_ = klass()
+    binding = _new_binding(binding_class, elem)
+    built = _build_children(binding, elem, specs)
+
+    for item in built.get(klass._binding_var, []):
+        list_.append(item)
+
+    return list_
+
+
+def _build_custom(klass, binding_class, elem):
+    """Call a custom from_obj() with the smallest binding that will work."""
+    if len(elem):
+        binding = _full_binding(binding_class, elem)
+    else:
+        binding = _new_binding(binding_class, elem)
+
+    return klass.from_obj(binding)
+
+
+def _build_object_properties(klass, binding_class, elem):
+    """Equivalent of ``ObjectProperties.from_obj()``."""
+    xsi_type = find_attr_value_('xsi:type', elem)
+    if not xsi_type:
+        raise ValueError("Object has no xsi:type")
+    type_value = xsi_type.split(':')[1]
+
+    defobj_class = cybox.objects.get_class_for_object_type(type_value)
+
+    # The object_reference and custom_properties fields are built from the
+    # TypedFields on the subclass.
+    return build(elem, defobj_class, binding_class)
+
+
+class _RelatedObjects(object):
+    """Stands in for the Related_Objects container, which has no API class."""
+
+    @staticmethod
+    def from_obj(related_objects_obj):
+        return [RelatedObject.from_obj(x) for x in
+                related_objects_obj.Related_Object]
+
+
+_RELATED_OBJECTS_SPECS = {
+    'Related_Object': ('Related_Object', RelatedObject, True),
+}
+
+
+def _build_related_objects(klass, binding_class, elem):
+    binding = _new_binding(binding_class, elem)
+    built = _build_children(binding, elem, _RELATED_OBJECTS_SPECS)
+    return built.get('Related_Object', [])
+
+
+_OBJECT_SPECS = {
+    'Properties': ('Properties', ObjectProperties, False),
+    'Related_Objects': ('Related_Objects', _RelatedObjects, False),
+}
+
+_RELATED_OBJECT_SPECS = dict(_OBJECT_SPECS)
+_RELATED_OBJECT_SPECS['Relationship'] = ('Relationship', VocabString, False)
+
+
+def _populate_object(obj, binding_class, elem, specs):
+    """Equivalent of ``Object.from_obj()`` with an existing `obj`."""
+    binding = _new_binding(binding_class, elem)
+    built = _build_children(binding, elem, specs)
+
+    obj.id_ = binding.id
+    obj.idref = binding.idref
+    obj._properties = _get(built, binding, 'Properties', ObjectProperties)
+    obj._modify_childs_parent()
+    obj.domain_specific_object_properties = \
+        DomainSpecificObjectProperties.from_obj(
+            binding.Domain_Specific_Object_Properties)
+    if built.get('Related_Objects'):
+        obj.related_objects = built['Related_Objects']
+
+    if obj.id_:
+        cybox.utils.cache_put(obj)
+
+    return binding, built
+
+
+def _build_object(klass, binding_class, elem):
+    obj = Object._new()
+    _populate_object(obj, binding_class, elem, _OBJECT_SPECS)
+    return obj
+
+
+def _build_related_object(klass, binding_class, elem):
+    """Equivalent of ``RelatedObject.from_obj()``."""
+    relobj = RelatedObject._new()
+    binding, built = _populate_object(relobj, binding_class, elem,
+                                      _RELATED_OBJECT_SPECS)
+
+    relobj.relationship = _get(built, binding, 'Relationship', VocabString)
+
+    if relobj.idref:
+        relobj._inline = True
+
+    return relobj
+
+
+_OBSERVABLE_SPECS = {
+    'Description': ('Description', StructuredText, False),
+    'Object': ('Object', Object, False),
+    'Event': ('Event', Event, False),
+    'Observable_Composition': (
+        'Observable_Composition', ObservableComposition, False),
+    'Observable_Source': ('Observable_Source', MeasureSource, True),
+    'Keywords': ('Keywords', Keywords, False),
+    'Pattern_Fidelity': ('Pattern_Fidelity', PatternFidelity, False),
+}
+
+
+def _build_observable(klass, binding_class, elem):
+    """Equivalent of ``Observable.from_obj()``."""
+    obs = Observable._new()
+    binding = _new_binding(binding_class, elem)
+    built = _build_children(binding, elem, _OBSERVABLE_SPECS)
+
+    obs._set_id_and_idref(binding.id, binding.idref)
+    obs.title = binding.Title
+    obs._description = _get(built, binding, 'Description', StructuredText)
+    obs._object = _get(built, binding, 'Object', Object)
+    obs._event = _get(built, binding, 'Event', Event)
+    obs._observable_composition = _get(built, binding,
+                                       'Observable_Composition',
+                                       ObservableComposition)
+    obs.sighting_count = binding.sighting_count
+    if built.get('Observable_Source'):
+        obs.observable_source = built['Observable_Source']
+    obs.keywords = _get(built, binding, 'Keywords', Keywords)
+    obs.pattern_fidelity = _get(built, binding, 'Pattern_Fidelity',
+                                PatternFidelity)
+
+    return obs
+
+
+_COMPOSITION_SPECS = {
+    'Observable': ('Observable', Observable, True),
+}
+
+
+def _build_observable_composition(klass, binding_class, elem):
+    """Equivalent of ``ObservableComposition.from_obj()``."""
+    binding = _new_binding(binding_class, elem)
+    built = _build_children(binding, elem, _COMPOSITION_SPECS)
+
+    obs_comp = ObservableComposition()
+    obs_comp.operator = binding.operator
+    for o in built.get('Observable', []):
+        obs_comp.add(o)
+
+    return obs_comp
+
+
+_OBSERVABLES_SPECS = {
+    'Observable': ('Observable', Observable, True),
+    'Observable_Package_Source': (
+        'Observable_Package_Source', MeasureSource, False),
+}
+
+
+def _build_observables(klass, binding_class, elem):
+    """Equivalent of ``Observables.from_obj()``."""
+    binding = _new_binding(binding_class, elem)
+    # Pools are not supported by the API, so don't build them.
+    children = [c for c in elem if _localname(c.tag) != 'Pools']
+    built = _build_children(binding, elem, _OBSERVABLES_SPECS, children)
+
+    obs = Observables()
+    for o in built.get('Observable', []):
+        obs.add(o)
+    obs.observable_package_source = built.get('Observable_Package_Source')
+
+    return obs
+
+
+#: Builders for classes whose from_obj() is written by hand.
+_CUSTOM_BUILDERS = {
+    ObjectProperties: _build_object_properties,
+    Object: _build_object,
+    RelatedObject: _build_related_object,
+    _RelatedObjects: _build_related_objects,
+    Observable: _build_observable,
+    ObservableComposition: _build_observable_composition,
+    Observables: _build_observables,
+}
+
+#: Binding classes to use for root elements of the hand-written classes.
+_BINDING_CLASSES = {
+    Object: core_binding.ObjectType,
+    RelatedObject: core_binding.RelatedObjectType,
+    Observable: core_binding.ObservableType,
+    ObservableComposition: core_binding.ObservableCompositionType,
+    Observables: core_binding.ObservablesType,
+}
+
+
+def _builder_for(klass):
+    try:
+        return _builders[klass]
+    except KeyError:
+        pass
+
+    if klass in _CUSTOM_BUILDERS:
+        builder = _CUSTOM_BUILDERS[klass]
+    elif not (isinstance(klass, type) and
+              issubclass(klass, entities.Entity)):
+        builder = _build_custom
+    elif not _default_from_obj(klass):
+        builder = _build_custom
+    elif issubclass(klass, entities.EntityList):
+        builder = _build_entity_list
+    else:
+        builder = _build_entity
+
+    _builders[klass] = builder
+    return builder
+
+
+def build(elem, klass, binding_class=None):
+    """Build an instance of `klass` from the lxml element `elem`.
+
+    The result is the same as building `binding_class` from `elem` and
+    passing it to ``klass.from_obj()``.
+
+    Args:
+        elem: An lxml element.
+        klass: The API class to build, for example
+            :class:`cybox.core.Observable`.
+        binding_class: The binding class which corresponds to `elem`.
+            Defaults to ``klass._binding_class``.
+    """
+    if binding_class is None:
+        binding_class = _BINDING_CLASSES.get(klass) or klass._binding_class
+
+    if (klass, binding_class) not in _fallbacks:
+        try:
+            return _builder_for(klass)(klass, binding_class, elem)
+        except _Unsupported:
+            _fallbacks.add((klass, binding_class))
+
+    return klass.from_obj(_full_binding(binding_class, elem))
+
+
+def parse(xml_file, encoding=None):
+    """Parse a CybOX Observables document into an :class:`Observables`.
+
+    This is equivalent to parsing `xml_file` with
+    :func:`cybox.bindings.cybox_core.parse` and passing the result to
+    :meth:`Observables.from_obj`.
+
+    Args:
+        xml_file: A filename, file-like object or lxml element/tree.
+        encoding: Overrides the encoding declared in the document.
+    """
+    root = get_etree_root(xml_file, encoding=encoding)
+    return build(root, Observables)
@@ -0,0 +1,182 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Deduplication of Observables with the same content.
+
+Feeds often repeat an Observable many times, each time with a newly
+generated id.  An :class:`ObservableDeduplicator` keeps the first
+Observable seen for each content fingerprint (see
+:meth:`cybox.core.Observable.fingerprint`) and merges later copies into it.
+
+Observables can be added one at a time, so a document read with
+:meth:`cybox.core.Observables.iterparse` can be deduplicated without
+holding more than the distinct Observables in memory:
+
+.. code-block:: python
+
+    deduper = ObservableDeduplicator()
+    for obs in Observables.iterparse("feed.xml"):
+        deduper.add(obs)
+
+    with ObservablesWriter("unique.xml") as writer:
+        for obs in deduper:
+            writer.add(obs)
+"""
+
+from mixbox import entities
+from mixbox.vendor import six
+
+from cybox.common import BaseProperty, ObjectProperties
+from cybox.core.object import Object
+from cybox.core.observable import Observable
+
+
+def _children(entity):
+    """Return the entities directly below `entity` which may hold idrefs."""
+    if isinstance(entity, Observable):
+        children = [entity.object_, entity.event]
+        if entity.observable_composition:
+            children.extend(entity.observable_composition.observables)
+        return children
+    if isinstance(entity, Object):
+        return list(entity.related_objects)
+
+    children = []
+    for value in six.itervalues(entity._fields):
+        if isinstance(value, (list, entities.EntityList)):
+            children.extend(value)
+        else:
+            children.append(value)
+    return children
+
+
+def _walk(entity):
+    """Yield `entity` and the entities below it, except object properties."""
+    stack = [entity]
+    while stack:
+        current = stack.pop()
+        if not isinstance(current, entities.Entity) or \
+                isinstance(current, (BaseProperty, ObjectProperties)):
+            continue
+        yield current
+        stack.extend(_children(current))
+
+
+def _pair_ids(removed, kept):
+    """Yield (removed id, kept id) pairs for an Observable and its duplicate.
+
+    Observables with the same fingerprint have the same structure, so their
+    Objects, related Objects and composed Observables correspond one to
+    one.
+    """
+    stack = [(removed, kept)]
+    while stack:
+        old, new = stack.pop()
+        if old is None or new is None:
+            continue
+        if old.id_ and new.id_ and old.id_ != new.id_:
+            yield old.id_, new.id_
+
+        if isinstance(old, Observable):
+            stack.append((old.object_, new.object_))
+            if old.observable_composition and new.observable_composition:
+                stack.extend(zip(old.observable_composition.observables,
+                                 new.observable_composition.observables))
+        else:
+            stack.extend(zip(old.related_objects, new.related_objects))
+
+
+def _sightings(observable):
+    """The number of sightings an Observable stands for."""
+    if observable.sighting_count is None:
+        return 1
+    return observable.sighting_count
+
+
+class ObservableDeduplicator(object):
+    """Collapse Observables with the same content into one.
+
+    The first Observable added with a given fingerprint is kept.  When a
+    duplicate is added:
+
+    * its ``sighting_count`` is added to the kept Observable's (an
+      Observable without a ``sighting_count`` counts as one sighting, but
+      an explicit ``sighting_count`` of 0 counts as none);
+    * its ``observable_source`` entries which the kept Observable does not
+      already have are appended;
+    * its id, and the ids of its Objects, related Objects and composed
+      Observables, are recorded in :attr:`replaced` against the matching
+      ids in the kept Observable.
+
+    Idrefs to a replaced id are rewritten to the kept id, both in
+    Observables added later and in the kept Observables when they are
+    iterated over, so references that appear before their target are
+    rewritten too.
+
+    Attributes:
+        replaced: A dictionary mapping the ids of removed Observables and
+            Objects to the ids which replace them.
+        duplicates: The number of Observables merged into another one.
+    """
+
+    def __init__(self):
+        self.replaced = {}
+        self.duplicates = 0
+        self._kept = {}
+        self._order = []
+
+    def add(self, observable):
+        """Add `observable`.
+
+        Returns:
+            `observable` if it is the first with its content, otherwise the
+            previously added Observable it was merged into.
+        """
+        self._rewrite_idrefs(observable)
+
+        key = observable.fingerprint()
+        kept = self._kept.get(key)
+        if kept is None:
+            self._kept[key] = observable
+            self._order.append(observable)
+            return observable
+
+        self._merge(kept, observable)
+        self.duplicates += 1
+        return kept
+
+    def _merge(self, kept, duplicate):
+        kept.sighting_count = _sightings(kept) + _sightings(duplicate)
+
+        for source in duplicate.observable_source:
+            if source not in kept.observable_source:
+                kept.observable_source.append(source)
+
+        for old, new in _pair_ids(duplicate, kept):
+            self.replaced[old] = new
+
+    def _rewrite_idrefs(self, observable):
+        replaced = self.replaced
+        if not replaced:
+            return
+        for entity in _walk(observable):
+            idref = getattr(entity, 'idref', None)
+            if idref in replaced:
+                entity.idref = replaced[idref]
+
+    @property
+    def observables(self):
+        """The kept Observables, in the order they were first added.
+
+        Their idrefs are not rewritten; iterate over the deduplicator
+        instead to get rewritten Observables.
+        """
+        return list(self._order)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        for observable in self._order:
+            self._rewrite_idrefs(observable)
+            yield observable
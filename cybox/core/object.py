@@ -9,6 +9,7 @@ from mixbox import idgen
 import cybox
 import cybox.bindings.cybox_core as core_binding
 from cybox.common import ObjectProperties, VocabString
+from cybox.common.fingerprint import canonical_form, content_digest
 from cybox.common.vocabs import ObjectRelationship as Relationship
 
 
@@ -56,6 +57,22 @@ class Object(entities.Entity):
         self.related_objects = []
         self.domain_specific_object_properties = None
 
+    @classmethod
+    def _new(cls):
+        """Return an empty instance without generating an id.
+
+        ``from_obj()`` and ``from_dict()`` set the id (and every other
+        field) themselves, so they use this rather than the constructor.
+        """
+        obj = cls.__new__(cls)
+        entities.Entity.__init__(obj)
+        obj.id_ = None
+        obj.idref = None
+        obj._properties = None
+        obj.related_objects = []
+        obj.domain_specific_object_properties = None
+        return obj
+
     def __str__(self):
         return self.id_
 
@@ -81,6 +98,31 @@ class Object(entities.Entity):
         r = RelatedObject(related, relationship=relationship, inline=inline)
         self.related_objects.append(r)
 
+    def fingerprint(self):
+        """Return a fingerprint of the content of the Object.
+
+        This combines the fingerprints of the properties and related
+        objects (see :meth:`.ObjectProperties.fingerprint`).  The ids of
+        the Object and its related objects are not part of it, so two
+        Objects with the same content have the same fingerprint even though
+        they are not equal.
+        """
+        return content_digest(self._fingerprint_form())
+
+    def _fingerprint_form(self):
+        form = {}
+        if self.idref:
+            form['idref'] = self.idref
+        if self.properties:
+            form['properties'] = self.properties.fingerprint()
+        if self.related_objects:
+            form['related_objects'] = [x.fingerprint() for x in
+                                       self.related_objects]
+        if self.domain_specific_object_properties is not None:
+            form['domain_specific_object_properties'] = \
+                canonical_form(self.domain_specific_object_properties)
+        return form
+
     def to_obj(self, return_obj=None, ns_info=None):
         self._collect_ns_info(ns_info)
 
@@ -127,11 +169,12 @@ class Object(entities.Entity):
             return None
 
         if not obj:
-            obj = Object()
+            obj = Object._new()
 
         obj.id_ = object_obj.id
         obj.idref = object_obj.idref
-        obj.properties = ObjectProperties.from_obj(object_obj.Properties)
+        obj._properties = ObjectProperties.from_obj(object_obj.Properties)
+        obj._modify_childs_parent()
         obj.domain_specific_object_properties = DomainSpecificObjectProperties.from_obj(object_obj.Domain_Specific_Object_Properties)
         rel_objs = object_obj.Related_Objects
         if rel_objs:
@@ -149,7 +192,7 @@ class Object(entities.Entity):
             return None
 
         if not obj:
-            obj = Object()
+            obj = Object._new()
 
         obj.id_ = object_dict.get('id')
         obj.idref = object_dict.get('idref')
@@ -174,6 +217,13 @@ class RelatedObject(Object):
         if not self._inline and self.properties:
             self.idref = self.properties.parent.id_
 
+    @classmethod
+    def _new(cls):
+        relobj = super(RelatedObject, cls)._new()
+        relobj._relationship = None
+        relobj._inline = True
+        return relobj
+
     def __str__(self):
         return "Related: " + super(RelatedObject, self).__str__()
 
@@ -216,11 +266,22 @@ class RelatedObject(Object):
         else:
             relobj_obj.idref = self.idref
 
-        if self.relationship:
-            relobj_obj.Relationship = self.relationship.to_obj(ns_info=ns_info)
+        if self._relationship:
+            relobj_obj.Relationship = self._relationship.to_obj(ns_info=ns_info)
 
         return relobj_obj
 
+    def _fingerprint_form(self):
+        if self._inline:
+            form = super(RelatedObject, self)._fingerprint_form()
+        else:
+            form = {'idref': self.idref}
+
+        if self._relationship:
+            form['relationship'] = canonical_form(self._relationship)
+
+        return form
+
     def to_dict(self):
 
         if self._inline:
@@ -228,8 +289,8 @@ class RelatedObject(Object):
         else:
             relobj_dict = {'idref': self.idref}
 
-        if self.relationship:
-            relobj_dict['relationship'] = self.relationship.to_dict()
+        if self._relationship:
+            relobj_dict['relationship'] = self._relationship.to_dict()
 
         return relobj_dict
 
@@ -238,7 +299,7 @@ class RelatedObject(Object):
         if not relobj_obj:
             return None
 
-        relobj = RelatedObject()
+        relobj = RelatedObject._new()
         Object.from_obj(relobj_obj, relobj)
         relobj.relationship = VocabString.from_obj(relobj_obj.Relationship)
 
@@ -252,7 +313,7 @@ class RelatedObject(Object):
         if not relobj_dict:
             return None
 
-        relobj = RelatedObject()
+        relobj = RelatedObject._new()
         Object.from_dict(relobj_dict, relobj)
         relobj.relationship = VocabString.from_dict(relobj_dict.get('relationship'))
 
@@ -7,6 +7,8 @@ from mixbox import idgen
 from cybox import Unicode
 import cybox.bindings.cybox_core as core_binding
 from cybox.common import MeasureSource, ObjectProperties, StructuredText
+from cybox.common.fingerprint import (canonical_form, content_digest,
+        entity_form)
 from cybox.core import Object, Event
 
 
@@ -64,6 +66,33 @@ class Observable(entities.Entity):
                    "subclass of ObjectProperties. Received an %s" % type(item))
             raise TypeError(msg)
 
+    @classmethod
+    def _new(cls):
+        """Return an empty Observable without generating an id.
+
+        ``from_obj()`` and ``from_dict()`` set every field themselves, so
+        they use this rather than the constructor.
+        """
+        obs = cls.__new__(cls)
+        entities.Entity.__init__(obs)
+        obs._id = None
+        obs._idref = None
+        obs.title = None
+        obs._description = None
+        obs._object = None
+        obs._event = None
+        obs._observable_composition = None
+        obs.sighting_count = None
+        obs.observable_source = []
+        obs.keywords = None
+        obs.pattern_fidelity = None
+        return obs
+
+    def _set_id_and_idref(self, id_, idref):
+        # Same result as setting id_ and then idref: an idref unsets the id.
+        self._idref = idref or None
+        self._id = None if idref else (id_ or None)
+
     @property
     def id_(self):
         return self._id
@@ -153,6 +182,38 @@ class Observable(entities.Entity):
     def add_keyword(self, value):
         self.keywords.append(value)
 
+    def fingerprint(self):
+        """Return a fingerprint of the content of the Observable.
+
+        The id, ``sighting_count`` and ``observable_source`` are not part of
+        the fingerprint (nor is the id of the Event), so repeated sightings
+        of the same content, from any source, have the same fingerprint.
+        See :meth:`.ObjectProperties.fingerprint`.
+        """
+        form = {}
+        if self.title is not None:
+            form['title'] = self.title
+        if self.description is not None:
+            form['description'] = canonical_form(self.description)
+        if self.object_:
+            form['object'] = self.object_.fingerprint()
+        if self.event:
+            form['event'] = entity_form(self.event, ignore=('id',))
+        if self.observable_composition:
+            composition = self.observable_composition
+            form['observable_composition'] = {
+                'operator': composition.operator,
+                'observables': [x.fingerprint() for x in
+                                composition.observables],
+            }
+        if self.idref is not None:
+            form['idref'] = self.idref
+        if self.keywords:
+            form['keywords'] = canonical_form(self.keywords)
+        if self.pattern_fidelity:
+            form['pattern_fidelity'] = canonical_form(self.pattern_fidelity)
+        return content_digest(form)
+
     def to_obj(self, return_obj=None, ns_info=None):
         self._collect_ns_info(ns_info)
 
@@ -216,15 +277,17 @@ class Observable(entities.Entity):
             return None
 
         from cybox.core import PatternFidelity
-        obs = Observable()
+        # The binding follows the schema, which allows only one of Object,
+        # Event and Observable_Composition, so the setters' checks are not
+        # needed.
+        obs = Observable._new()
 
-        obs.id_ = observable_obj.id
+        obs._set_id_and_idref(observable_obj.id, observable_obj.idref)
         obs.title = observable_obj.Title
-        obs.description = StructuredText.from_obj(observable_obj.Description)
-        obs.object_ = Object.from_obj(observable_obj.Object)
-        obs.event = Event.from_obj(observable_obj.Event)
-        obs.observable_composition = ObservableComposition.from_obj(observable_obj.Observable_Composition)
-        obs.idref = observable_obj.idref
+        obs._description = StructuredText.from_obj(observable_obj.Description)
+        obs._object = Object.from_obj(observable_obj.Object)
+        obs._event = Event.from_obj(observable_obj.Event)
+        obs._observable_composition = ObservableComposition.from_obj(observable_obj.Observable_Composition)
         obs.sighting_count = observable_obj.sighting_count
         if observable_obj.Observable_Source:
             obs.observable_source = [MeasureSource.from_obj(x) for x in observable_obj.Observable_Source]
@@ -239,15 +302,15 @@ class Observable(entities.Entity):
             return None
 
         from cybox.core import PatternFidelity
-        obs = Observable()
+        obs = Observable._new()
 
-        obs.id_ = observable_dict.get('id')
+        obs._set_id_and_idref(observable_dict.get('id'),
+                              observable_dict.get('idref'))
         obs.title = observable_dict.get('title')
         obs.description = StructuredText.from_dict(observable_dict.get('description'))
         obs.object_ = Object.from_dict(observable_dict.get('object'))
         obs.event = Object.from_dict(observable_dict.get('event'))
         obs.observable_composition = ObservableComposition.from_dict(observable_dict.get('observable_composition'))
-        obs.idref = observable_dict.get('idref')
         obs.sighting_count = observable_dict.get('sighting_count')
         if observable_dict.get('observable_source'):
             obs.observable_source = [MeasureSource.from_dict(x) for x in observable_dict.get('observable_source')]
@@ -359,6 +422,35 @@ class Observables(entities.EntityList):
 
         return obs
 
+    def dedupe(self):
+        """Merge Observables with the same content.
+
+        Duplicates are removed, their sighting counts and sources are
+        merged into the Observable that is kept, and idrefs to them are
+        rewritten.  See :class:`cybox.core.dedupe.ObservableDeduplicator`.
+
+        Returns:
+            A dictionary mapping the ids of removed Observables and Objects
+            to the ids which replace them.
+        """
+        from cybox.core.dedupe import ObservableDeduplicator
+        deduper = ObservableDeduplicator()
+        for observable in self.observables:
+            deduper.add(observable)
+        self.observables = list(deduper)
+        return deduper.replaced
+
+    @staticmethod
+    def iterparse(xml_file, encoding=None):
+        """Incrementally parse a CybOX Observables document.
+
+        Returns an :class:`cybox.core.stream.ObservablesReader`, which yields
+        one :class:`Observable` per top-level ``<cybox:Observable>`` element
+        without holding the whole document in memory.
+        """
+        from cybox.core.stream import ObservablesReader
+        return ObservablesReader(xml_file, encoding=encoding)
+
 
 class ObservableComposition(entities.Entity):
     '''The ObservableCompositionType entity defines a logical compositions of
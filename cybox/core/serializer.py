@@ -0,0 +1,363 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Write API entities as XML without building a binding object tree.
+
+``Entity.to_xml()`` calls ``to_obj()``, which converts the whole entity tree
+into generateDS binding objects before a single byte is written.  The
+functions in this module produce the same output, but each complex child is
+represented by a small deferred object whose ``export()`` method converts the
+entity only when the parent binding writes it.  Only the bindings along the
+path currently being written are alive at any time.
+
+Simple values (properties and controlled vocabulary strings) are written
+through binding objects created from a prototype, without running the
+binding's ``__init__``.  Entities with a custom ``to_obj()`` are still
+converted with ``to_obj()``.
+"""
+
+from mixbox import entities, idgen
+from mixbox.binding_utils import save_encoding
+from mixbox.namespaces import (Namespace, get_schemaloc_string,
+        get_xmlns_string, lookup_name, lookup_prefix)
+from mixbox.vendor import six
+
+import cybox.bindings.cybox_core as core_binding
+from cybox.common import BaseProperty, ObjectProperties, VocabString
+from cybox.core.builder import _blank_binding
+from cybox.core.object import Object, RelatedObject
+from cybox.core.observable import (Observable, ObservableComposition,
+        Observables)
+
+# Memoized serialization function for each Entity class.
+_converters = {}
+
+
+class _Deferred(object):
+    """Stands in for the binding object of `entity` in a parent binding."""
+
+    __slots__ = ('entity', 'convert')
+
+    def __init__(self, entity, convert):
+        self.entity = entity
+        self.convert = convert
+
+    def export(self, lwrite, level, namespace_, name_, namespacedef_='',
+               pretty_print=True):
+        binding = self.convert(self.entity)
+        binding.export(lwrite, level, namespace_, name_=name_,
+                       namespacedef_=namespacedef_, pretty_print=pretty_print)
+
+
+def _child(value):
+    """Return what ``to_obj()`` would put in a parent binding for `value`."""
+    if not isinstance(value, entities.Entity):
+        return value
+
+    convert = _converter_for(type(value))
+    if convert in _DEFERRED:
+        return _Deferred(value, convert)
+    return convert(value)
+
+
+def _entity_obj(entity):
+    """Equivalent of ``Entity.to_obj()``."""
+    entity_obj = _blank_binding(entity._binding_class)
+
+    for field, val in six.iteritems(entity._fields):
+        if field.multiple:
+            if val:
+                val = [_child(x) for x in val]
+            else:
+                val = []
+        else:
+            val = _child(val)
+
+        setattr(entity_obj, field.name, val)
+
+    entity._finalize_obj(entity_obj)
+    return entity_obj
+
+
+def _entity_list_obj(entity_list):
+    """Equivalent of ``EntityList.to_obj()``."""
+    list_obj = _blank_binding(entity_list._binding_class)
+    setattr(list_obj, entity_list._binding_var,
+            [_child(x) for x in entity_list])
+    return list_obj
+
+
+def _property_obj(prop):
+    """Equivalent of ``BaseProperty.to_obj()``."""
+    attr_obj = _blank_binding(prop._binding_class)
+    prop._populate_obj(attr_obj)
+    return attr_obj
+
+
+def _vocab_obj(vocab):
+    """Equivalent of ``VocabString.to_obj()``."""
+    return vocab.to_obj(return_obj=_blank_binding(vocab._binding_class))
+
+
+def _custom_obj(entity):
+    return entity.to_obj()
+
+
+def _populate_object_obj(obj, object_obj):
+    """Equivalent of ``Object.to_obj()`` with a `return_obj`."""
+    if obj.id_:
+        object_obj.id = obj.id_
+    if obj.idref:
+        object_obj.idref = obj.idref
+    if obj.properties:
+        object_obj.Properties = _child(obj.properties)
+    if obj.related_objects:
+        relobj_obj = _blank_binding(core_binding.RelatedObjectsType)
+        relobj_obj.Related_Object = [_child(x) for x in obj.related_objects]
+        object_obj.Related_Objects = relobj_obj
+    if obj.domain_specific_object_properties is not None:
+        object_obj.Domain_Specific_Object_Properties = \
+            _child(obj.domain_specific_object_properties)
+
+    return object_obj
+
+
+def _object_obj(obj):
+    return _populate_object_obj(obj, _blank_binding(core_binding.ObjectType))
+
+
+def _related_object_obj(relobj):
+    """Equivalent of ``RelatedObject.to_obj()``."""
+    relobj_obj = _blank_binding(core_binding.RelatedObjectType)
+
+    if relobj._inline:
+        _populate_object_obj(relobj, relobj_obj)
+    else:
+        relobj_obj.idref = relobj.idref
+
+    if relobj._relationship:
+        relobj_obj.Relationship = _child(relobj._relationship)
+
+    return relobj_obj
+
+
+def _observable_obj(obs):
+    """Equivalent of ``Observable.to_obj()``."""
+    obs_obj = _blank_binding(core_binding.ObservableType)
+
+    obs_obj.id = obs.id_
+    if obs.title is not None:
+        obs_obj.Title = obs.title
+    if obs.description is not None:
+        obs_obj.Description = _child(obs.description)
+    if obs.object_:
+        obs_obj.Object = _child(obs.object_)
+    if obs.event:
+        obs_obj.Event = _child(obs.event)
+    if obs.observable_composition:
+        obs_obj.Observable_Composition = _child(obs.observable_composition)
+    if obs.idref is not None:
+        obs_obj.idref = obs.idref
+    if obs.sighting_count is not None:
+        obs_obj.sighting_count = obs.sighting_count
+    if obs.observable_source:
+        obs_obj.Observable_Source = [_child(x) for x in obs.observable_source]
+    if obs.keywords:
+        obs_obj.Keywords = _child(obs.keywords)
+    if obs.pattern_fidelity:
+        obs_obj.Pattern_Fidelity = _child(obs.pattern_fidelity)
+
+    return obs_obj
+
+
+def _observable_composition_obj(obs_comp):
+    """Equivalent of ``ObservableComposition.to_obj()``."""
+    comp_obj = _blank_binding(core_binding.ObservableCompositionType)
+    comp_obj.operator = obs_comp.operator
+    comp_obj.Observable = [_child(x) for x in obs_comp.observables]
+    return comp_obj
+
+
+def _observables_obj(observables):
+    """Equivalent of ``Observables.to_obj()``."""
+    observables_obj = _blank_binding(core_binding.ObservablesType)
+    observables_obj.cybox_major_version = observables._major_version
+    observables_obj.cybox_minor_version = observables._minor_version
+    observables_obj.cybox_update_version = observables._update_version
+
+    observables_obj.Observable = [_child(x) for x in observables.observables]
+
+    if observables.observable_package_source:
+        observables_obj.Observable_Package_Source = \
+            _child(observables.observable_package_source)
+
+    return observables_obj
+
+
+#: Serialization functions for classes whose to_obj() is written by hand.
+_CUSTOM_CONVERTERS = {
+    Object: _object_obj,
+    RelatedObject: _related_object_obj,
+    Observable: _observable_obj,
+    ObservableComposition: _observable_composition_obj,
+    Observables: _observables_obj,
+}
+
+#: Converters which are only run when the parent binding exports the child.
+_DEFERRED = frozenset([
+    _entity_obj,
+    _entity_list_obj,
+    _object_obj,
+    _related_object_obj,
+    _observable_obj,
+    _observable_composition_obj,
+    _observables_obj,
+])
+
+def _function(klass, name):
+    func = getattr(klass, name)
+    return getattr(func, '__func__', func)
+
+
+def _converter_for(klass):
+    try:
+        return _converters[klass]
+    except KeyError:
+        pass
+
+    to_obj = _function(klass, 'to_obj')
+
+    if klass in _CUSTOM_CONVERTERS:
+        convert = _CUSTOM_CONVERTERS[klass]
+    elif to_obj is _function(entities.Entity, 'to_obj'):
+        convert = _entity_obj
+    elif (to_obj is _function(ObjectProperties, 'to_obj') and
+          klass is not ObjectProperties):
+        # ObjectProperties.to_obj() defers to Entity.to_obj() when called
+        # without a return_obj.
+        convert = _entity_obj
+    elif to_obj is _function(entities.EntityList, 'to_obj'):
+        convert = _entity_list_obj
+    elif to_obj is _function(BaseProperty, 'to_obj'):
+        convert = _property_obj
+    elif to_obj is _function(VocabString, 'to_obj'):
+        convert = _vocab_obj
+    else:
+        convert = _custom_obj
+
+    _converters[klass] = convert
+    return convert
+
+
+def export(entity, lwrite, level=0, namespace_=None, name_=None,
+           namespacedef_='', pretty_print=True):
+    """Write `entity` as XML, like ``entity.to_obj().export(...)``.
+
+    Args:
+        entity: The :class:`mixbox.entities.Entity` to write.
+        lwrite: A callable which accepts strings, such as the ``write``
+            method of a text file.
+        level: The indentation level of the element.
+        namespace_: The namespace prefix (including the colon) of the
+            element. Defaults to the binding class's default.
+        name_: The element name. Defaults to the binding class's default.
+        namespacedef_: Namespace declarations to put on the element.
+        pretty_print: Whether to indent the output.
+    """
+    binding = _converter_for(type(entity))(entity)
+
+    kwargs = {'namespacedef_': namespacedef_, 'pretty_print': pretty_print}
+    if namespace_ is not None:
+        kwargs['namespace_'] = namespace_
+    if name_ is not None:
+        kwargs['name_'] = name_
+
+    binding.export(lwrite, level, **kwargs)
+
+
+def _class_namespaces(klass):
+    try:
+        return _class_namespace_cache[klass]
+    except KeyError:
+        pass
+
+    namespaces = frozenset(lookup_name(x._namespace) for x in klass.__mro__
+                           if hasattr(x, '_namespace'))
+    _class_namespace_cache[klass] = namespaces
+    return namespaces
+
+_class_namespace_cache = {}
+
+
+def get_namespaces(entity):
+    """Return the Namespaces used by `entity` and the entities it contains.
+
+    This returns the same set as ``entity._get_namespaces()``, without the
+    recursion.
+    """
+    namespaces = set()
+    seen = set()
+    stack = [entity]
+
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+
+        namespaces.update(_class_namespaces(type(current)))
+
+        for members in (vars(current), current._fields):
+            for v in six.itervalues(members):
+                if isinstance(v, entities.Entity):
+                    stack.append(v)
+                elif isinstance(v, list):
+                    stack.extend(x for x in v
+                                 if isinstance(x, entities.Entity))
+
+    return namespaces
+
+
+def get_namespace_def(entity, namespace_dict=None):
+    """Return the xmlns and xsi:schemaLocation attributes for `entity`."""
+    namespaces = get_namespaces(entity)
+
+    if namespace_dict:
+        for ns, prefix in six.iteritems(namespace_dict):
+            namespaces.add(Namespace(ns, prefix))
+
+    namespaces.add(idgen._get_generator().namespace)
+    namespaces.add(lookup_prefix('xsi'))
+    namespaces = sorted(namespaces, key=six.text_type)
+
+    return ('\n\t' + get_xmlns_string(namespaces) +
+            '\n\txsi:schemaLocation="' + get_schemaloc_string(namespaces) +
+            '"')
+
+
+def to_xml(entity, include_namespaces=True, namespace_dict=None, pretty=True,
+           encoding='utf-8'):
+    """Serialize `entity` to an XML string.
+
+    The arguments and result are the same as for
+    :meth:`mixbox.entities.Entity.to_xml`.
+    """
+    namespace_def = ""
+
+    if include_namespaces:
+        namespace_def = get_namespace_def(entity, namespace_dict)
+
+    if not pretty:
+        namespace_def = namespace_def.replace('\n\t', ' ')
+
+    with save_encoding(encoding):
+        sio = six.StringIO()
+        export(entity, sio.write, 0, namespacedef_=namespace_def,
+               pretty_print=pretty)
+
+    s = six.text_type(sio.getvalue()).strip()
+
+    if encoding:
+        return s.encode(encoding)
+
+    return s
@@ -0,0 +1,301 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Incremental reading and writing of large CybOX Observables documents."""
+
+from lxml import etree
+from mixbox import idgen
+from mixbox.binding_utils import Tag_pattern_, save_encoding
+from mixbox.namespaces import (get_schemaloc_string, get_xmlns_string,
+        lookup_name, lookup_prefix)
+from mixbox.vendor import six
+
+import cybox.bindings.cybox_common as common_binding
+import cybox.bindings.cybox_core as core_binding
+from cybox.common import MeasureSource
+from cybox.core import builder, serializer
+from cybox.core.observable import Observable, Observables
+from cybox.utils import LRUCache, cache_scope
+from cybox.utils.nsparser import CYBOX_NAMESPACES
+
+# The number of Objects an ObservablesReader keeps in its cache by default.
+DEFAULT_READER_CACHE_SIZE = 10000
+
+# Mirror the options used by mixbox.xml.get_xml_parser() so that streamed
+# elements look the same to the bindings as elements from a full parse.
+_ITERPARSE_OPTIONS = dict(
+    huge_tree=True,
+    remove_comments=True,
+    remove_pis=True,
+    remove_blank_text=True,
+    strip_cdata=False,
+    resolve_entities=False,
+)
+
+
+def _localname(tag):
+    return Tag_pattern_.match(tag).groups()[-1]
+
+
+class ObservablesReader(object):
+    """Iterate over the top-level Observables of a CybOX document.
+
+    Each ``<cybox:Observable>`` child of the root element is turned into an
+    :class:`cybox.core.Observable` as soon as its end tag is read, and the
+    underlying element is then discarded, so memory use does not grow with
+    the size of the document.
+
+    The document-level ``Observable_Package_Source`` is available on the
+    :attr:`observable_package_source` attribute once it has been read.  The
+    schema places it before any Observable, so it is set by the time the
+    first Observable is yielded.
+
+    Objects with an ``id`` are put in the reader's own object cache
+    (:attr:`cache`) rather than the global one (see
+    :func:`cybox.utils.cache_put`).  By default this is an
+    :class:`cybox.utils.LRUCache` holding the last
+    :data:`DEFAULT_READER_CACHE_SIZE` Objects, so that memory use stays
+    flat.  To resolve idrefs with ``RelatedObject.get_properties()``, call
+    it inside ``cybox.utils.cache_scope(reader.cache)``.
+
+    Args:
+        xml_file: A filename, URL, or file-like object containing the XML.
+        encoding: Overrides the encoding declared in the document.
+        cache: The :class:`cybox.utils.Cache` to put Objects in.
+    """
+
+    def __init__(self, xml_file, encoding=None, cache=None):
+        self.xml_file = xml_file
+        self.encoding = encoding
+        if cache is None:
+            cache = LRUCache(max_items=DEFAULT_READER_CACHE_SIZE)
+        self.cache = cache
+        self.observable_package_source = None
+        self.major_version = None
+        self.minor_version = None
+        self.update_version = None
+
+    def __iter__(self):
+        context = etree.iterparse(
+            self.xml_file,
+            events=('start', 'end'),
+            encoding=self.encoding,
+            **_ITERPARSE_OPTIONS
+        )
+
+        root = None
+        depth = 0
+
+        for event, elem in context:
+            if event == 'start':
+                if root is None:
+                    root = elem
+                    self._read_root(root)
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth != 1:
+                # Either a descendant of a top-level element (it is built
+                # along with its ancestor) or the root itself.
+                continue
+
+            tag = _localname(elem.tag)
+            if tag == 'Observable':
+                yield self._build_observable(elem)
+            elif tag == 'Observable_Package_Source':
+                self._read_package_source(elem)
+
+            # Drop the processed element and anything left before it.
+            elem.clear()
+            while elem.getprevious() is not None:
+                del root[0]
+
+        del context
+
+    def _read_root(self, root):
+        self.major_version = root.get('cybox_major_version')
+        self.minor_version = root.get('cybox_minor_version')
+        self.update_version = root.get('cybox_update_version')
+
+    def _read_package_source(self, elem):
+        with cache_scope(self.cache):
+            self.observable_package_source = builder.build(
+                elem, MeasureSource, common_binding.MeasureSourceType)
+
+    def _build_observable(self, elem):
+        with cache_scope(self.cache):
+            return builder.build(elem, Observable,
+                                 core_binding.ObservableType)
+
+
+class ObservablesWriter(object):
+    """Write a CybOX Observables document one Observable at a time.
+
+    The ``<cybox:Observables>`` start tag (with all namespace declarations)
+    is written when the writer is opened, each Observable is serialized as
+    soon as it is added, and the end tag is written when the writer is
+    closed.  Only one Observable is held in memory at a time.
+
+    Because the namespaces used by later Observables are not known when the
+    root element is written, they have to be declared up front.  By default
+    every namespace in :data:`cybox.utils.nsparser.CYBOX_NAMESPACES` is
+    declared.  :meth:`add` raises a ValueError for an Observable which uses
+    a namespace that was not declared.
+
+    If the ``with`` block raises an exception, the end tag is not written,
+    so an incomplete document is not mistaken for a complete one.
+
+    .. code-block:: python
+
+        with ObservablesWriter("out.xml") as writer:
+            for obs in produce_observables():
+                writer.add(obs)
+
+    Args:
+        xml_file: A filename or a binary file-like object.  A file opened
+            by the writer is closed by :meth:`close`.
+        namespaces: An iterable of :class:`mixbox.namespaces.Namespace`
+            objects or namespace URIs to declare on the root element.
+            Defaults to all CybOX namespaces.
+        observable_package_source: An optional
+            :class:`cybox.common.MeasureSource` written before the first
+            Observable.
+        pretty: Whether to produce readable (``True``) or compact
+            (``False``) output.
+        encoding: The output character encoding.
+    """
+
+    def __init__(self, xml_file, namespaces=None,
+                 observable_package_source=None, pretty=True,
+                 encoding='utf-8'):
+        self.xml_file = xml_file
+        self.namespaces = namespaces
+        self.observable_package_source = observable_package_source
+        self.pretty = pretty
+        self.encoding = encoding
+        self.count = 0
+
+        self._outfile = None
+        self._owns_file = False
+        self._declared = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._release()
+
+    def _write(self, fragments):
+        self._outfile.write(u"".join(fragments).encode(self.encoding))
+
+    def _get_namespace_def(self):
+        if self.namespaces is None:
+            namespaces = set(CYBOX_NAMESPACES)
+        else:
+            namespaces = set()
+            for ns in self.namespaces:
+                if isinstance(ns, six.string_types):
+                    ns = lookup_name(ns)
+                namespaces.add(ns)
+
+        namespaces.add(lookup_name(Observables._namespace))
+        if self.observable_package_source:
+            namespaces.update(
+                serializer.get_namespaces(self.observable_package_source))
+        namespaces.add(idgen._get_generator().namespace)
+        namespaces.add(lookup_prefix('xsi'))
+
+        self._declared = namespaces
+        namespaces = sorted(namespaces, key=six.text_type)
+        namespace_def = ('\n\t' + get_xmlns_string(namespaces) +
+                         '\n\txsi:schemaLocation="' +
+                         get_schemaloc_string(namespaces) + '"')
+
+        if not self.pretty:
+            namespace_def = namespace_def.replace('\n\t', ' ')
+
+        return namespace_def
+
+    def open(self):
+        """Open the output and write the start of the document."""
+        if self._outfile is not None:
+            return
+
+        if isinstance(self.xml_file, six.string_types):
+            self._outfile = open(self.xml_file, 'wb')
+            self._owns_file = True
+        else:
+            self._outfile = self.xml_file
+
+        eol = '\n' if self.pretty else ''
+        root = Observables()
+        observables_obj = core_binding.ObservablesType(
+                                cybox_major_version=root._major_version,
+                                cybox_minor_version=root._minor_version,
+                                cybox_update_version=root._update_version)
+
+        fragments = ['<cybox:Observables', ' ', self._get_namespace_def()]
+        with save_encoding(self.encoding):
+            observables_obj.exportAttributes(fragments.append, 0, set())
+            fragments.append('>%s' % eol)
+            if self.observable_package_source:
+                serializer.export(self.observable_package_source,
+                                  fragments.append, 1, "cybox:",
+                                  name_='Observable_Package_Source',
+                                  pretty_print=self.pretty)
+        self._write(fragments)
+
+    def add(self, observable):
+        """Serialize `observable` and write it to the output.
+
+        Anything accepted by :class:`cybox.core.Observable` (for instance an
+        :class:`cybox.core.Object` or :class:`cybox.common.ObjectProperties`
+        instance) is wrapped in an Observable first.
+        """
+        if self._outfile is None:
+            raise ValueError("ObservablesWriter is not open")
+        if not observable:
+            return
+        if not isinstance(observable, Observable):
+            observable = Observable(observable)
+
+        missing = serializer.get_namespaces(observable) - self._declared
+        if missing:
+            raise ValueError(
+                "Observable %s uses namespaces which were not declared: %s" %
+                (observable.id_ or observable.idref,
+                 ", ".join(sorted(x.name for x in missing))))
+
+        fragments = []
+        with save_encoding(self.encoding):
+            serializer.export(observable, fragments.append, 1, "cybox:",
+                              name_='Observable', pretty_print=self.pretty)
+        self._write(fragments)
+        self.count += 1
+
+    def close(self):
+        """Write the end of the document and release the output."""
+        if self._outfile is None:
+            return
+
+        eol = '\n' if self.pretty else ''
+        self._write(['</cybox:Observables>%s' % eol])
+        self._release()
+
+    def _release(self):
+        """Release the output without writing the end of the document."""
+        if self._outfile is None:
+            return
+
+        if self._owns_file:
+            self._outfile.close()
+        else:
+            self._outfile.flush()
+
+        self._outfile = None
+        self._owns_file = False
@@ -0,0 +1,16 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Evaluation of CybOX patterns against instance Observables."""
+
+from __future__ import absolute_import
+
+from .bloom import BloomFilter
+from .cidr import CIDRIndex
+from .conditions import CONDITIONS, compile_condition, condition_cost
+from .domains import DomainIndex, split_url
+from .matcher import (PatternMatcher, compile_pattern, compile_patterns,
+        match_patterns)
+from .pattern_index import PatternIndex
+from .regex import RegexSet, UnsupportedRegex, compile_regex
+from .substrings import SubstringIndex
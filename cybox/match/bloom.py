@@ -0,0 +1,260 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""A Bloom filter for exact-match indicator values.
+
+For feeds with tens of millions of hashes, addresses, URIs or domains, a
+:class:`BloomFilter` answers "is this value possibly an indicator?" with a
+few bit probes and about 10 bits per value (at a 1% false positive rate).
+Only values which pass the filter need to be looked up in an exact (and
+larger, or slower) store.
+
+The filter is kept in a ``bytearray`` and can be saved to a file.  A saved
+filter is loaded with :meth:`BloomFilter.load`, which maps the file into
+memory instead of reading it.
+
+Values are taken from ``Equals`` patterns (or patterns without a condition)
+only, and are lower-cased.  Patterns with other conditions, or without a
+hash, address, URI or domain value, are not represented in the filter and
+must be checked separately.
+"""
+
+import hashlib
+import math
+import mmap
+import struct
+
+from mixbox import entities
+from mixbox.vendor import six
+
+from cybox.common import BaseProperty, Hash
+from cybox.core.object import Object
+from cybox.core.observable import Observable
+from cybox.match.conditions import APPLY_ANY, EQUALS
+from cybox.objects.address_object import Address
+from cybox.objects.domain_name_object import DomainName
+from cybox.objects.hostname_object import Hostname
+from cybox.objects.uri_object import URI
+
+_MAGIC = b'CYBF'
+_VERSION = 1
+# magic, version, number of bits, number of hash functions, item count
+_HEADER = struct.Struct('<4sIQII')
+
+
+def _hash_pair(key):
+    digest = hashlib.md5(key.encode('utf-8')).digest()
+    return struct.unpack('<QQ', digest)
+
+
+def _exact_values(prop):
+    """Return the values of `prop` if it is an exact-match property."""
+    if prop is None or prop.value is None:
+        return []
+    if prop.condition not in (None, EQUALS) or \
+            prop.apply_condition not in (None, APPLY_ANY):
+        return []
+    return [six.text_type(x) for x in prop.values]
+
+
+def _hashes(entity):
+    """Yield the Hash entities anywhere in `entity`."""
+    stack = [entity]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, Hash):
+            yield current
+            continue
+        for value in six.itervalues(current._fields):
+            if isinstance(value, (list, entities.EntityList)):
+                stack.extend(x for x in value
+                             if isinstance(x, entities.Entity))
+            elif isinstance(value, entities.Entity) and \
+                    not isinstance(value, BaseProperty):
+                stack.append(value)
+
+
+def _properties_keys(properties):
+    if isinstance(properties, Address):
+        for value in _exact_values(properties.address_value):
+            yield u"address:" + value.strip().lower()
+    elif isinstance(properties, URI):
+        for value in _exact_values(properties.value):
+            yield u"uri:" + value.strip().lower()
+    elif isinstance(properties, DomainName):
+        for value in _exact_values(properties.value):
+            yield u"domain:" + value.strip().lower().rstrip('.')
+    elif isinstance(properties, Hostname):
+        for value in _exact_values(properties.hostname_value):
+            yield u"domain:" + value.strip().lower().rstrip('.')
+
+    for hash_ in _hashes(properties):
+        for value in _exact_values(hash_.simple_hash_value):
+            yield u"hash:" + value.strip().lower()
+
+
+def indicator_keys(item):
+    """Yield the filter keys for the values in `item`.
+
+    `item` is an Observable (compositions are searched), an Object, or an
+    ObjectProperties.  Keys are made from hash values (in any ``HashList``),
+    and the values of ``Address``, ``URI``, ``DomainName`` and ``Hostname``
+    objects, normalized so that patterns and instances produce the same
+    keys.
+    """
+    stack = [item]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, Observable):
+            if current.observable_composition is not None:
+                stack.extend(current.observable_composition.observables)
+            elif current.object_ is not None:
+                stack.append(current.object_)
+            continue
+        if isinstance(current, Object):
+            current = current.properties
+        if current is None:
+            continue
+        for key in _properties_keys(current):
+            yield key
+
+
+class BloomFilter(object):
+    """A Bloom filter over text keys.
+
+    Args:
+        capacity: The number of keys the filter is sized for.
+        error_rate: The false positive rate expected once `capacity` keys
+            have been added.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        bits = int(math.ceil(-capacity * math.log(error_rate) /
+                             (math.log(2) ** 2)))
+        self._init(bits, max(1, int(round(float(bits) / capacity *
+                                          math.log(2)))),
+                   bytearray((bits + 7) // 8), 0)
+
+    def _init(self, bits, hashes, data, count, offset=0, owner=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.count = count
+        self._data = data
+        self._offset = offset
+        self._owner = owner
+        if six.PY2 and not isinstance(data, bytearray):
+            self._byte = lambda i: ord(data[i])
+        else:
+            self._byte = data.__getitem__
+
+    @classmethod
+    def from_patterns(cls, patterns, error_rate=0.01):
+        """Build a filter from the indicator values of `patterns`.
+
+        See :func:`indicator_keys` for the values used.
+        """
+        keys = set()
+        for pattern in patterns:
+            keys.update(indicator_keys(pattern))
+
+        bloom = cls(max(1, len(keys)), error_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def _positions(self, key):
+        h1, h2 = _hash_pair(key)
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def add(self, key):
+        """Add the text `key` to the filter."""
+        if self._owner is not None:
+            raise TypeError("A mapped filter is read-only")
+        data = self._data
+        for position in self._positions(key):
+            data[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        byte = self._byte
+        offset = self._offset
+        for position in self._positions(key):
+            if not byte(offset + (position >> 3)) & (1 << (position & 7)):
+                return False
+        return True
+
+    def might_match(self, instance):
+        """Return whether any indicator value of `instance` may be in the
+        filter.
+
+        A False result means that none of the patterns represented in the
+        filter can match `instance`.
+        """
+        for key in indicator_keys(instance):
+            if key in self:
+                return True
+        return False
+
+    def write(self, outfile):
+        """Write the filter to the binary file-like object `outfile`."""
+        outfile.write(_HEADER.pack(_MAGIC, _VERSION, self.bits, self.hashes,
+                                   self.count))
+        size = (self.bits + 7) // 8
+        outfile.write(bytes(self._data[self._offset:self._offset + size]))
+
+    def save(self, path):
+        """Write the filter to the file at `path`."""
+        with open(path, 'wb') as outfile:
+            self.write(outfile)
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        """Load a filter saved with :meth:`save`.
+
+        With `use_mmap`, the file is mapped into memory (read-only) rather
+        than read, so the filter only uses the memory of the pages the
+        operating system keeps loaded.  Call :meth:`close` to unmap it.
+
+        Raises:
+            ValueError: if the file does not contain a saved filter.
+        """
+        with open(path, 'rb') as infile:
+            header = infile.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError("Not a saved Bloom filter: %s" % path)
+            magic, version, bits, hashes, count = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("Not a saved Bloom filter: %s" % path)
+
+            bloom = cls.__new__(cls)
+            if use_mmap:
+                data = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+                if len(data) < _HEADER.size + (bits + 7) // 8:
+                    data.close()
+                    raise ValueError("Truncated Bloom filter: %s" % path)
+                bloom._init(bits, hashes, data, count, _HEADER.size, data)
+            else:
+                data = bytearray(infile.read())
+                if len(data) < (bits + 7) // 8:
+                    raise ValueError("Truncated Bloom filter: %s" % path)
+                bloom._init(bits, hashes, data, count)
+
+        return bloom
+
+    def close(self):
+        """Unmap a filter loaded with ``use_mmap``."""
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
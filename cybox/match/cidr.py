@@ -0,0 +1,385 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""A prefix trie for matching IP addresses against Address patterns.
+
+:class:`CIDRIndex` stores the networks of ``Address`` patterns (single
+addresses, CIDR blocks and ``InclusiveBetween`` ranges) in one binary trie
+per IP version, keyed on the integer value of the address.  A query walks
+at most 32 (IPv4) or 128 (IPv6) nodes, however many patterns are stored.
+"""
+
+import re
+
+from mixbox.vendor import six
+
+from cybox.core.observable import Observable
+from cybox.match.conditions import (APPLY_ANY, EQUALS, INCLUSIVE_BETWEEN)
+from cybox.objects.address_object import Address
+
+_BITS = {4: 32, 6: 128}
+
+_ipv4_pattern = re.compile(r'^([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})$')
+_ipv6_group_pattern = re.compile(r'^[0-9A-Fa-f]{1,4}$')
+
+#: Address categories which can be stored in a CIDRIndex.
+IP_CATEGORIES = frozenset([
+    None,
+    Address.CAT_CIDR,
+    Address.CAT_IPV4,
+    Address.CAT_IPV4_NET,
+    Address.CAT_IPV6,
+    Address.CAT_IPV6_NET,
+])
+
+
+def _parse_ipv4(value):
+    match = _ipv4_pattern.match(value)
+    if not match:
+        return None
+    number = 0
+    for part in match.groups():
+        part = int(part)
+        if part > 255:
+            return None
+        number = (number << 8) | part
+    return number
+
+
+def _parse_ipv6(value):
+    # Parsed here rather than with socket.inet_pton(), which Python 2 does
+    # not provide on Windows.
+    head, sep, tail = value.partition('::')
+    head = head.split(':') if head else []
+    tail = tail.split(':') if tail else []
+
+    groups = tail if sep else head
+    if groups and '.' in groups[-1]:
+        # An IPv4 address in the last 32 bits.
+        ipv4 = _parse_ipv4(groups[-1])
+        if ipv4 is None:
+            return None
+        groups[-1:] = ['%x' % (ipv4 >> 16), '%x' % (ipv4 & 0xFFFF)]
+
+    missing = 8 - len(head) - len(tail)
+    if (sep and missing < 1) or (not sep and missing):
+        return None
+
+    number = 0
+    for group in head + ['0'] * missing + tail:
+        if not _ipv6_group_pattern.match(group):
+            return None
+        number = (number << 16) | int(group, 16)
+    return number
+
+
+def parse_address(value):
+    """Parse a single IP address.
+
+    Returns:
+        A ``(version, number)`` tuple, where `number` is the integer value
+        of the address.
+
+    Raises:
+        ValueError: if `value` is not an IPv4 or IPv6 address.
+    """
+    address = six.text_type(value).strip()
+
+    number = _parse_ipv4(address)
+    if number is not None:
+        return 4, number
+    number = _parse_ipv6(address)
+    if number is not None:
+        return 6, number
+    raise ValueError("Not an IP address: %s" % value)
+
+
+def parse_network(value):
+    """Parse an IP address or CIDR block.
+
+    Returns:
+        A ``(version, network, prefix_length)`` tuple, where `network` is the
+        integer value of the address with the host bits cleared.  A single
+        address has the full prefix length (32 or 128).
+
+    Raises:
+        ValueError: if `value` is not an IPv4 or IPv6 address or block.
+    """
+    address, sep, prefix_length = six.text_type(value).strip().partition('/')
+    version, number = parse_address(address)
+
+    bits = _BITS[version]
+    if sep:
+        if not prefix_length.isdigit() or int(prefix_length) > bits:
+            raise ValueError("Invalid prefix length: %s" % value)
+        length = int(prefix_length)
+    else:
+        length = bits
+
+    host_bits = bits - length
+    return version, (number >> host_bits) << host_bits, length
+
+
+def _bit_length(number):
+    """``number.bit_length()``, which Python 2.6 does not have."""
+    return len(bin(number)) - 2 if number else 0
+
+
+def _range_networks(start, end, bits):
+    """Yield the (network, prefix_length) blocks covering start..end."""
+    while start <= end:
+        if start:
+            host_bits = _bit_length(start & -start) - 1
+        else:
+            host_bits = bits
+        host_bits = min(host_bits, _bit_length(end - start + 1) - 1)
+        yield start, bits - host_bits
+        start += 1 << host_bits
+
+
+def _address_value(pattern):
+    if isinstance(pattern, Observable):
+        if pattern.object_ is None:
+            return None
+        pattern = pattern.object_.properties
+    elif not isinstance(pattern, Address) and \
+            getattr(pattern, 'properties', None) is not None:
+        pattern = pattern.properties
+
+    if not isinstance(pattern, Address):
+        return None
+    if pattern.category not in IP_CATEGORIES:
+        return None
+    return pattern.address_value
+
+
+def _pattern_id(pattern):
+    """Return the id of a pattern Observable or Object, or of the Object
+    holding a pattern Address, or None.
+    """
+    if isinstance(pattern, Address):
+        # Not pattern.parent, which makes up a new Object.
+        pattern = pattern._parent
+        if pattern is None:
+            return None
+    return pattern.id_ or pattern.idref
+
+
+def pattern_networks(pattern):
+    """Return the networks an Address pattern matches.
+
+    `pattern` is an :class:`cybox.objects.address_object.Address`, or an
+    Object or Observable containing one.  ``Equals`` (or no condition)
+    with one or more addresses or CIDR blocks, and ``InclusiveBetween``
+    with the first and last address of a range, are supported.
+
+    Returns:
+        A list of ``(version, network, prefix_length)`` tuples.
+
+    Raises:
+        ValueError: if the pattern cannot be expressed as IP networks.
+    """
+    prop = _address_value(pattern)
+    if prop is None or prop.value is None:
+        raise ValueError("Not an IP Address pattern")
+
+    condition = prop.condition or EQUALS
+    values = prop.values
+
+    if condition == EQUALS and prop.apply_condition in (None, APPLY_ANY):
+        return [parse_network(x) for x in values]
+
+    if condition == INCLUSIVE_BETWEEN and len(values) == 2:
+        low, high = sorted(parse_network(x) for x in values)
+        if low[0] != high[0] or low[2] != _BITS[low[0]] or \
+                high[2] != _BITS[high[0]]:
+            raise ValueError("InclusiveBetween requires two addresses of "
+                             "the same IP version")
+        version = low[0]
+        return [(version, network, length) for network, length in
+                _range_networks(low[1], high[1], _BITS[version])]
+
+    raise ValueError("Condition %s cannot be indexed by IP network" %
+                     condition)
+
+
+class CIDRIndex(object):
+    """Finds the Address patterns whose networks contain an address.
+
+    .. code-block:: python
+
+        index = CIDRIndex()
+        for pattern in address_patterns:
+            index.add(pattern)
+
+        index.longest_match("10.1.2.3")   # ids of the most specific block
+        index.matches("10.1.2.3")         # ids of every containing block
+    """
+
+    def __init__(self):
+        # One trie per IP version.  Each node is a list of
+        # [zero child, one child, list of pattern ids].
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+        self._networks = {}
+
+    def __len__(self):
+        return len(self._networks)
+
+    def __contains__(self, id_):
+        return id_ in self._networks
+
+    def add(self, pattern, id_=None):
+        """Add an Address pattern and return its id.
+
+        Args:
+            pattern: An Address pattern, or an Object or Observable
+                containing one (see :func:`pattern_networks`).
+            id_: The id to report for the pattern. Defaults to the id of the
+                pattern Observable or Object, or of the Object an Address
+                belongs to.
+
+        Raises:
+            ValueError: if the pattern cannot be indexed, has no id, or a
+                pattern with the same id has already been added.
+        """
+        networks = pattern_networks(pattern)
+
+        if id_ is None:
+            id_ = _pattern_id(pattern)
+            if id_ is None:
+                raise ValueError("An Address pattern which is not in an "
+                                 "Object or Observable needs an id_")
+        if id_ in self._networks:
+            raise ValueError("Pattern %s is already in the index" % id_)
+
+        for version, network, length in networks:
+            node = self._roots[version]
+            bits = _BITS[version]
+            for i in range(length):
+                bit = (network >> (bits - 1 - i)) & 1
+                child = node[bit]
+                if child is None:
+                    child = node[bit] = [None, None, None]
+                node = child
+            if node[2] is None:
+                node[2] = []
+            node[2].append(id_)
+
+        self._networks[id_] = networks
+        return id_
+
+    def remove(self, id_):
+        """Remove the pattern `id_`.
+
+        Raises:
+            KeyError: if there is no such pattern.
+        """
+        for version, network, length in self._networks.pop(id_):
+            node = self._roots[version]
+            bits = _BITS[version]
+            path = []
+            for i in range(length):
+                bit = (network >> (bits - 1 - i)) & 1
+                path.append((node, bit))
+                node = node[bit]
+
+            node[2].remove(id_)
+            if not node[2]:
+                node[2] = None
+
+            # Drop nodes which no longer lead to any pattern.
+            while path and node == [None, None, None]:
+                parent, bit = path.pop()
+                parent[bit] = None
+                node = parent
+
+    def _walk(self, version, address, length):
+        """Return the id lists on the path to `address`, shortest first."""
+        node = self._roots[version]
+        bits = _BITS[version]
+        found = []
+
+        if node[2]:
+            found.append(node[2])
+        for i in range(length):
+            node = node[(address >> (bits - 1 - i)) & 1]
+            if node is None:
+                break
+            if node[2]:
+                found.append(node[2])
+
+        return found
+
+    def _query(self, value, longest):
+        if isinstance(value, Address):
+            value = value.address_value.value
+        version, address, length = parse_network(value)
+        found = self._walk(version, address, length)
+
+        if longest:
+            return list(found[-1]) if found else []
+        return [x for ids in found for x in ids]
+
+    def matches(self, address):
+        """Return the ids of every pattern whose networks contain `address`.
+
+        `address` is an address or CIDR block string, or an Address object.
+        For a CIDR block, only the patterns whose networks contain the whole
+        block are returned.  The ids of the least specific networks come
+        first.
+
+        Raises:
+            ValueError: if `address` cannot be parsed.
+        """
+        return self._query(address, longest=False)
+
+    def longest_match(self, address):
+        """Return the ids of the patterns with the most specific network
+        containing `address`, or an empty list.
+        """
+        return self._query(address, longest=True)
+
+    def lookup_many(self, addresses, longest=False, version=4):
+        """Look up a batch of addresses.
+
+        `addresses` may hold strings, Address objects or integers; integers
+        are taken as addresses of the given IP `version`, which allows
+        passing an ``array.array`` of packed IPv4 addresses straight from a
+        flow record.  The addresses are looked up one after the other, but
+        repeated addresses are only parsed and looked up once.  Values
+        which cannot be parsed give an empty list.
+
+        Returns:
+            A list with, for each address, a new list as :meth:`longest_match`
+            (if `longest` is True) or :meth:`matches` would return.
+        """
+        results = []
+        seen = {}
+        bits = _BITS[version]
+
+        for value in addresses:
+            key = value
+            if isinstance(value, Address):
+                key = value.address_value.value
+            try:
+                results.append(list(seen[key]))
+                continue
+            except KeyError:
+                pass
+
+            if isinstance(key, six.integer_types):
+                found = self._walk(version, key, bits)
+                if longest:
+                    result = list(found[-1]) if found else []
+                else:
+                    result = [x for ids in found for x in ids]
+            else:
+                try:
+                    result = self._query(key, longest)
+                except ValueError:
+                    result = []
+
+            seen[key] = result
+            results.append(result)
+
+        return results
@@ -0,0 +1,451 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Predicates for the CybOX pattern condition vocabulary.
+
+:func:`compile_condition` turns a patterned :class:`cybox.common.BaseProperty`
+or :class:`cybox.common.VocabString` into a function of one instance value.
+All the work that depends only on the pattern (case folding, number
+conversion, regex compilation, building sets for ``Equals`` lists) is done
+once, when the function is created.
+"""
+
+import numbers
+import operator
+
+from mixbox.vendor import six
+
+from cybox.compat import long
+from cybox.match.regex import compile_regex
+
+EQUALS = "Equals"
+DOES_NOT_EQUAL = "DoesNotEqual"
+CONTAINS = "Contains"
+DOES_NOT_CONTAIN = "DoesNotContain"
+STARTS_WITH = "StartsWith"
+ENDS_WITH = "EndsWith"
+GREATER_THAN = "GreaterThan"
+GREATER_THAN_OR_EQUAL = "GreaterThanOrEqual"
+LESS_THAN = "LessThan"
+LESS_THAN_OR_EQUAL = "LessThanOrEqual"
+INCLUSIVE_BETWEEN = "InclusiveBetween"
+EXCLUSIVE_BETWEEN = "ExclusiveBetween"
+FITS_PATTERN = "FitsPattern"
+BITWISE_AND = "BitwiseAnd"
+BITWISE_OR = "BitwiseOr"
+
+APPLY_ANY = "ANY"
+APPLY_ALL = "ALL"
+APPLY_NONE = "NONE"
+
+
+def _contains(value, pattern):
+    return pattern in value
+
+
+def _does_not_contain(value, pattern):
+    return pattern not in value
+
+
+def _starts_with(value, pattern):
+    return value.startswith(pattern)
+
+
+def _ends_with(value, pattern):
+    return value.endswith(pattern)
+
+
+# Conditions which compare an instance value with a single pattern value.
+# Each function is called as function(instance_value, pattern_value).
+_COMPARISONS = {
+    EQUALS: operator.eq,
+    DOES_NOT_EQUAL: operator.ne,
+    CONTAINS: _contains,
+    DOES_NOT_CONTAIN: _does_not_contain,
+    STARTS_WITH: _starts_with,
+    ENDS_WITH: _ends_with,
+    GREATER_THAN: operator.gt,
+    GREATER_THAN_OR_EQUAL: operator.ge,
+    LESS_THAN: operator.lt,
+    LESS_THAN_OR_EQUAL: operator.le,
+}
+
+# Conditions which only make sense between strings.
+_STRING_CONDITIONS = frozenset([
+    CONTAINS, DOES_NOT_CONTAIN, STARTS_WITH, ENDS_WITH, FITS_PATTERN,
+])
+
+_RANGE_CONDITIONS = frozenset([INCLUSIVE_BETWEEN, EXCLUSIVE_BETWEEN])
+
+# Conditions which order values, and so compare IP addresses as numbers.
+_ORDERED_CONDITIONS = frozenset([
+    GREATER_THAN, GREATER_THAN_OR_EQUAL, LESS_THAN, LESS_THAN_OR_EQUAL,
+]) | _RANGE_CONDITIONS
+
+# Datatypes whose values are compared without regard to case.
+_CASE_INSENSITIVE_DATATYPES = frozenset(["hexBinary"])
+_BITWISE_CONDITIONS = frozenset([BITWISE_AND, BITWISE_OR])
+
+#: Every condition understood by :func:`compile_condition`.
+CONDITIONS = frozenset(_COMPARISONS) | _RANGE_CONDITIONS | \
+    _BITWISE_CONDITIONS | frozenset([FITS_PATTERN])
+
+
+# Relative cost of evaluating each condition.  Conditions which are rarely
+# false (the negative ones) also cost more, since they seldom allow an AND
+# to stop early.
+_CONDITION_COSTS = {
+    EQUALS: 1,
+    INCLUSIVE_BETWEEN: 2,
+    EXCLUSIVE_BETWEEN: 2,
+    GREATER_THAN: 2,
+    GREATER_THAN_OR_EQUAL: 2,
+    LESS_THAN: 2,
+    LESS_THAN_OR_EQUAL: 2,
+    BITWISE_AND: 2,
+    BITWISE_OR: 2,
+    STARTS_WITH: 3,
+    ENDS_WITH: 3,
+    CONTAINS: 4,
+    FITS_PATTERN: 8,
+    DOES_NOT_EQUAL: 5,
+    DOES_NOT_CONTAIN: 8,
+}
+
+# Added to the cost of a condition with an apply_condition of NONE.
+_NEGATION_COST = 4
+
+
+def condition_cost(prop):
+    """Estimate the relative cost of testing a value against `prop`.
+
+    Exact matches are cheapest, followed by ranges and bitwise tests,
+    ``StartsWith`` and ``EndsWith``, ``Contains``, and regular expressions.
+    Each additional value adds to the cost, except for ``Equals``, which is
+    a set lookup.
+    """
+    condition = prop.condition or EQUALS
+    cost = _CONDITION_COSTS.get(condition, 1)
+
+    value = prop.value
+    if isinstance(value, list) and condition != EQUALS and \
+            condition not in _RANGE_CONDITIONS:
+        cost *= max(1, len(value))
+    if prop.apply_condition == APPLY_NONE:
+        cost += _NEGATION_COST
+
+    return cost
+
+
+def _is_number(value):
+    return (isinstance(value, numbers.Number) and
+            not isinstance(value, bool))
+
+
+def _to_number(value):
+    """Convert `value` to a number, or return None if that is not possible."""
+    if _is_number(value):
+        return value
+    if not isinstance(value, six.string_types):
+        return None
+    for convert in (int, long, float):
+        try:
+            return convert(value)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def _to_int(value):
+    """Convert a number or a (decimal or hex) string to an integer."""
+    if isinstance(value, six.integer_types) and not isinstance(value, bool):
+        return value
+    if not isinstance(value, six.string_types):
+        return None
+    for base in (0, 16):
+        try:
+            return int(value, base)
+        except ValueError:
+            pass
+    return None
+
+
+def _to_text(value):
+    if isinstance(value, six.string_types):
+        return value
+    return six.text_type(value)
+
+
+def _fold(value):
+    if isinstance(value, six.string_types):
+        return value.lower()
+    return value
+
+
+def _address_values(pattern_values):
+    """Parse pattern values which are all IP addresses.
+
+    Returns:
+        None if any pattern value is not an IP address, otherwise a
+        ``(numbers, convert)`` tuple, where `numbers` are the integer values
+        of the pattern addresses and `convert` turns an instance value into
+        an integer (or None if it is not an address of the same version).
+
+    Raises:
+        ValueError: if the pattern mixes IPv4 and IPv6 addresses.
+    """
+    from cybox.match.cidr import parse_address
+
+    if not all(isinstance(p, six.string_types) for p in pattern_values):
+        return None
+    try:
+        addresses = [parse_address(p) for p in pattern_values]
+    except ValueError:
+        return None
+
+    versions = set(version for version, _ in addresses)
+    if len(versions) != 1:
+        raise ValueError("Cannot order IPv4 and IPv6 addresses together")
+    version = versions.pop()
+
+    def convert(value):
+        try:
+            value_version, number = parse_address(value)
+        except ValueError:
+            return None
+        if value_version != version:
+            return None
+        return number
+
+    return [number for _, number in addresses], convert
+
+
+def _value_converter(pattern_values, condition, case_sensitive):
+    """Return a function which prepares instance values for comparison."""
+    if condition == FITS_PATTERN:
+        # Case is handled by the regex flags.
+        return _to_text
+
+    if condition in _STRING_CONDITIONS:
+        if case_sensitive:
+            return _to_text
+        return lambda v: _to_text(v).lower()
+
+    if pattern_values and all(_is_number(p) for p in pattern_values):
+        return _to_number
+
+    if not case_sensitive:
+        return _fold
+
+    return None
+
+
+def _comparison_tests(condition, pattern_values, convert):
+    compare = _COMPARISONS[condition]
+    tests = []
+
+    for pattern in pattern_values:
+        def test(value, pattern=pattern):
+            if convert is not None:
+                value = convert(value)
+                if value is None:
+                    return False
+            try:
+                return compare(value, pattern)
+            except TypeError:
+                # e.g. a timezone-aware and a naive datetime, or a string
+                # and a number.
+                return False
+        tests.append(test)
+
+    return tests
+
+
+def _regex_tests(pattern_values, regex_syntax, case_sensitive, convert):
+    tests = []
+
+    for pattern in pattern_values:
+        search = compile_regex(pattern, regex_syntax, case_sensitive).search
+
+        def test(value, search=search):
+            return search(convert(value)) is not None
+        tests.append(test)
+
+    return tests
+
+
+def _bitwise_tests(condition, pattern_values, bit_mask):
+    mask = _to_int(bit_mask) if bit_mask is not None else None
+    tests = []
+
+    for pattern in pattern_values:
+        pattern = _to_int(pattern)
+        if pattern is None:
+            raise ValueError("%s requires integer values" % condition)
+
+        if condition == BITWISE_AND:
+            if mask is None:
+                def test(value, pattern=pattern):
+                    return (value & pattern) != 0
+            else:
+                def test(value, pattern=pattern):
+                    return (value & mask) == pattern
+        else:
+            if mask is None:
+                def test(value, pattern=pattern):
+                    return (value | pattern) != 0
+            else:
+                def test(value, pattern=pattern):
+                    return (value | mask) == pattern
+
+        def checked(value, test=test):
+            value = _to_int(value)
+            return value is not None and test(value)
+        tests.append(checked)
+
+    return tests
+
+
+def _range_test(condition, pattern_values, convert):
+    if len(pattern_values) != 2:
+        raise ValueError("%s requires exactly two values" % condition)
+
+    low, high = sorted(pattern_values)
+    if condition == INCLUSIVE_BETWEEN:
+        def in_range(value):
+            return low <= value <= high
+    else:
+        def in_range(value):
+            return low < value < high
+
+    def test(value):
+        if convert is not None:
+            value = convert(value)
+            if value is None:
+                return False
+        try:
+            return in_range(value)
+        except TypeError:
+            return False
+
+    return test
+
+
+def _membership_test(pattern_values, convert, negate):
+    try:
+        members = frozenset(pattern_values)
+    except TypeError:
+        return None
+
+    def test(value):
+        if convert is not None:
+            value = convert(value)
+        try:
+            return (value in members) is not negate
+        except TypeError:
+            return negate
+
+    return test
+
+
+def _combine(tests, apply_condition):
+    if len(tests) == 1 and apply_condition != APPLY_NONE:
+        return tests[0]
+
+    if apply_condition == APPLY_ALL:
+        def test(value):
+            for t in tests:
+                if not t(value):
+                    return False
+            return True
+    elif apply_condition == APPLY_NONE:
+        def test(value):
+            for t in tests:
+                if t(value):
+                    return False
+            return True
+    else:
+        def test(value):
+            for t in tests:
+                if t(value):
+                    return True
+            return False
+
+    return test
+
+
+def compile_condition(prop):
+    """Return a function which tests one instance value against `prop`.
+
+    `prop` is a :class:`cybox.common.BaseProperty` or
+    :class:`cybox.common.VocabString` used as a pattern.  A property without
+    a `condition` is treated as ``Equals``.
+
+    When the property has several values, `apply_condition` decides whether
+    the instance value must satisfy the condition for any (the default), all
+    or none of them.  ``InclusiveBetween`` and ``ExclusiveBetween`` always
+    take two values, the bounds of the range.  When the values of an ordered
+    or range condition are all IP addresses, instance values are compared
+    as addresses, by their integer values, rather than as strings.
+
+    Values of a ``hexBinary`` property, such as a hash digest, are compared
+    without regard to case, whatever its `is_case_sensitive`.
+
+    ``FitsPattern`` searches the instance value with the pattern value, a
+    regular expression in the property's `regex_syntax` (see
+    :func:`cybox.match.regex.translate`).  ``BitwiseAnd`` and ``BitwiseOr``
+    combine the instance value with `bit_mask` and compare the result to the
+    pattern value; without a `bit_mask`, they test whether combining the
+    instance value with the pattern value gives a non-zero result.
+
+    Raises:
+        ValueError: if the condition is unknown, or the values do not suit
+            the condition.
+    """
+    condition = prop.condition or EQUALS
+    if condition not in CONDITIONS:
+        raise ValueError("Unsupported condition: %s" % condition)
+
+    apply_condition = prop.apply_condition or APPLY_ANY
+    case_sensitive = (prop.is_case_sensitive is not False and
+                      getattr(prop, 'datatype', None) not in
+                      _CASE_INSENSITIVE_DATATYPES)
+
+    value = prop.value
+    if value is None:
+        pattern_values = []
+    elif isinstance(value, list):
+        pattern_values = list(value)
+    else:
+        pattern_values = [value]
+
+    if not pattern_values:
+        raise ValueError("A pattern property needs a value")
+
+    addresses = None
+    if condition in _ORDERED_CONDITIONS:
+        addresses = _address_values(pattern_values)
+    if addresses is not None:
+        pattern_values, convert = addresses
+    else:
+        convert = _value_converter(pattern_values, condition, case_sensitive)
+        if not case_sensitive and condition != FITS_PATTERN:
+            pattern_values = [_fold(p) for p in pattern_values]
+
+    if condition in _RANGE_CONDITIONS:
+        return _range_test(condition, pattern_values, convert)
+
+    if condition in _BITWISE_CONDITIONS:
+        tests = _bitwise_tests(condition, pattern_values, prop.bit_mask)
+    elif condition == FITS_PATTERN:
+        tests = _regex_tests(pattern_values, prop.regex_syntax,
+                             case_sensitive, convert)
+    else:
+        if condition == EQUALS and apply_condition != APPLY_ALL:
+            test = _membership_test(pattern_values, convert,
+                                    negate=(apply_condition == APPLY_NONE))
+            if test is not None:
+                return test
+        tests = _comparison_tests(condition, pattern_values, convert)
+
+    return _combine(tests, apply_condition)
@@ -0,0 +1,326 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""A reversed-label trie for matching host names against domain patterns.
+
+:class:`DomainIndex` stores the domains of ``DomainName``, ``Hostname`` and
+``URI`` (``TYPE_DOMAIN``) patterns in a trie whose first level holds
+top-level domains, the second level the labels below them, and so on.  A
+query walks one node per label of the host name, whatever the size of the
+block list.
+
+``EndsWith`` patterns are matched on whole labels: ``example.com`` matches
+``example.com`` and ``www.example.com`` but not ``badexample.com``.  A value
+with a leading dot or ``*.`` (``.example.com``) only matches subdomains.
+
+:func:`split_url` splits URLs into their parts and remembers the result, so
+a URL seen many times is only parsed once.
+"""
+
+import collections
+
+from mixbox.vendor import six
+from mixbox.vendor.six.moves.urllib.parse import urlsplit
+
+from cybox.core.observable import Observable
+from cybox.match.conditions import APPLY_ANY, ENDS_WITH, EQUALS
+from cybox.objects.domain_name_object import DomainName
+from cybox.objects.hostname_object import Hostname
+from cybox.objects.uri_object import URI
+from cybox.utils.caches import CacheMiss, LRUCache
+
+#: The maximum number of URLs remembered by :func:`split_url`.
+URL_CACHE_SIZE = 10000
+
+_url_cache = LRUCache(max_items=URL_CACHE_SIZE)
+
+#: The parts of a URL returned by :func:`split_url`.
+URLParts = collections.namedtuple(
+    'URLParts', ['scheme', 'host', 'port', 'path', 'query', 'fragment'])
+
+# Positions in a trie node.
+_CHILDREN, _EXACT, _SUFFIX, _SUBDOMAINS = range(4)
+
+
+def _split_url(url):
+    if '://' not in url and not url.startswith('//'):
+        # "example.com/path" has no scheme, so urlsplit() would read the
+        # host as part of the path.
+        url = '//' + url
+    parts = urlsplit(url)
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+
+    return URLParts(parts.scheme.lower(), normalize_host(parts.hostname or ''),
+                    port, parts.path, parts.query, parts.fragment)
+
+
+def split_url(url):
+    """Return the :data:`URLParts` of `url`.
+
+    The host is normalized with :func:`normalize_host`.  URLs without a
+    scheme (``example.com/index.html``) are read as starting with a host.
+    Results are cached, up to :data:`URL_CACHE_SIZE` URLs.
+    """
+    try:
+        return _url_cache.get(url)
+    except CacheMiss:
+        pass
+
+    parts = _split_url(url)
+    _url_cache.put(parts, url)
+    return parts
+
+
+def normalize_host(host):
+    """Lower-case `host` and remove surrounding whitespace and a final dot."""
+    return host.strip().lower().rstrip('.')
+
+
+def _labels(host):
+    """Return the labels of `host`, top-level domain first."""
+    host = normalize_host(host)
+    if not host:
+        return []
+    labels = host.split('.')
+    labels.reverse()
+    return labels
+
+
+def _pattern_property(pattern):
+    if isinstance(pattern, Observable):
+        if pattern.object_ is None:
+            return None
+        pattern = pattern.object_.properties
+    elif getattr(pattern, 'properties', None) is not None:
+        pattern = pattern.properties
+
+    if isinstance(pattern, DomainName):
+        return pattern.value
+    if isinstance(pattern, Hostname):
+        return pattern.hostname_value
+    if isinstance(pattern, URI) and pattern.type_ == URI.TYPE_DOMAIN:
+        return pattern.value
+    return None
+
+
+def pattern_domains(pattern):
+    """Return the domains a domain pattern matches.
+
+    `pattern` is a ``DomainName``, ``Hostname`` or ``URI`` with type
+    ``TYPE_DOMAIN``, or an Object or Observable containing one.  ``Equals``
+    (or no condition) and ``EndsWith`` are supported.
+
+    Returns:
+        A list of ``(labels, kind)`` tuples, where `labels` is the list of
+        labels (top-level domain first) and `kind` is ``"exact"``,
+        ``"suffix"`` (the domain and its subdomains) or ``"subdomains"``.
+
+    Raises:
+        ValueError: if the pattern cannot be indexed.
+    """
+    prop = _pattern_property(pattern)
+    if prop is None or prop.value is None:
+        raise ValueError("Not a domain pattern")
+
+    condition = prop.condition or EQUALS
+    if condition not in (EQUALS, ENDS_WITH) or \
+            prop.apply_condition not in (None, APPLY_ANY):
+        raise ValueError("Condition %s cannot be indexed by domain" %
+                         condition)
+
+    domains = []
+    for value in prop.values:
+        value = normalize_host(value)
+        kind = "exact" if condition == EQUALS else "suffix"
+        if value.startswith('*.'):
+            value, kind = value[2:], "subdomains"
+        elif value.startswith('.') and condition == ENDS_WITH:
+            value, kind = value[1:], "subdomains"
+
+        labels = _labels(value)
+        if not labels:
+            raise ValueError("Empty domain in pattern")
+        domains.append((labels, kind))
+
+    return domains
+
+
+_KIND_SLOTS = {"exact": _EXACT, "suffix": _SUFFIX, "subdomains": _SUBDOMAINS}
+
+
+def instance_host(instance):
+    """Return the host name of a DomainName, Hostname, URI or string.
+
+    URLs (in strings or in ``URI`` objects with another type than
+    ``TYPE_DOMAIN``) are split with :func:`split_url`.  Returns None if
+    there is no host name.
+    """
+    if isinstance(instance, Observable):
+        instance = instance.object_.properties if instance.object_ else None
+    elif getattr(instance, 'properties', None) is not None:
+        instance = instance.properties
+
+    if isinstance(instance, DomainName):
+        value = instance.value
+    elif isinstance(instance, Hostname):
+        value = instance.hostname_value
+    elif isinstance(instance, URI):
+        value = instance.value
+        if value is not None and instance.type_ != URI.TYPE_DOMAIN:
+            return split_url(six.text_type(value.value)).host or None
+    elif isinstance(instance, six.string_types):
+        if '/' in instance:
+            return split_url(instance).host or None
+        return normalize_host(instance) or None
+    else:
+        return None
+
+    if value is None or value.value is None:
+        return None
+    return normalize_host(six.text_type(value.value)) or None
+
+
+class DomainIndex(object):
+    """Finds the domain patterns which match a host name.
+
+    .. code-block:: python
+
+        index = DomainIndex()
+        for pattern in domain_patterns:
+            index.add(pattern)
+
+        index.matches("www.example.com")
+        index.matches(uri_object)
+    """
+
+    def __init__(self):
+        # Each node is a list of [children by label, exact ids, suffix ids,
+        # subdomain ids].  The id lists are None until needed.
+        self._root = [{}, None, None, None]
+        self._domains = {}
+
+    def __len__(self):
+        return len(self._domains)
+
+    def __contains__(self, id_):
+        return id_ in self._domains
+
+    def add(self, pattern, id_=None):
+        """Add a domain pattern and return its id.
+
+        Args:
+            pattern: A domain pattern, or an Object or Observable containing
+                one (see :func:`pattern_domains`).
+            id_: The id to report for the pattern. Defaults to the id of the
+                pattern Observable.
+
+        Raises:
+            ValueError: if the pattern cannot be indexed, or a pattern with
+                the same id has already been added.
+        """
+        domains = pattern_domains(pattern)
+
+        if id_ is None:
+            if not isinstance(pattern, Observable):
+                pattern = Observable(pattern)
+            id_ = pattern.id_ or pattern.idref
+        if id_ in self._domains:
+            raise ValueError("Pattern %s is already in the index" % id_)
+
+        for labels, kind in domains:
+            node = self._root
+            for label in labels:
+                child = node[_CHILDREN].get(label)
+                if child is None:
+                    child = node[_CHILDREN][label] = [{}, None, None, None]
+                node = child
+
+            slot = _KIND_SLOTS[kind]
+            if node[slot] is None:
+                node[slot] = []
+            node[slot].append(id_)
+
+        self._domains[id_] = domains
+        return id_
+
+    def remove(self, id_):
+        """Remove the pattern `id_`.
+
+        Raises:
+            KeyError: if there is no such pattern.
+        """
+        for labels, kind in self._domains.pop(id_):
+            node = self._root
+            path = []
+            for label in labels:
+                path.append((node, label))
+                node = node[_CHILDREN][label]
+
+            slot = _KIND_SLOTS[kind]
+            node[slot].remove(id_)
+            if not node[slot]:
+                node[slot] = None
+
+            # Drop nodes which no longer lead to any pattern.
+            while path and node == [{}, None, None, None]:
+                parent, label = path.pop()
+                del parent[_CHILDREN][label]
+                node = parent
+
+    def _match_labels(self, labels):
+        found = []
+        node = self._root
+        last = len(labels) - 1
+
+        for i, label in enumerate(labels):
+            node = node[_CHILDREN].get(label)
+            if node is None:
+                break
+            if node[_SUFFIX]:
+                found.extend(node[_SUFFIX])
+            if i < last:
+                if node[_SUBDOMAINS]:
+                    found.extend(node[_SUBDOMAINS])
+            elif node[_EXACT]:
+                found.extend(node[_EXACT])
+
+        return found
+
+    def matches(self, instance):
+        """Return the ids of the patterns which match `instance`.
+
+        `instance` is a host name or URL string, or a ``DomainName``,
+        ``Hostname`` or ``URI`` (see :func:`instance_host`).  Patterns on
+        parent domains come before patterns on their subdomains.
+        """
+        host = instance_host(instance)
+        if host is None:
+            return []
+        return self._match_labels(_labels(host))
+
+    def lookup_many(self, instances):
+        """Return :meth:`matches` for each item of `instances`.
+
+        Each distinct host name is only looked up once, but every item gets
+        its own list.
+        """
+        results = []
+        seen = {}
+
+        for instance in instances:
+            host = instance_host(instance)
+            try:
+                results.append(list(seen[host]))
+                continue
+            except KeyError:
+                pass
+
+            result = self._match_labels(_labels(host)) if host else []
+            seen[host] = result
+            results.append(result)
+
+        return results
@@ -0,0 +1,511 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Compile pattern Observables into reusable matchers.
+
+:func:`compile_pattern` walks a pattern once and builds a tree of small
+matcher objects.  Matching an instance only runs the tests in that tree: the
+pattern's fields, conditions and values are not looked at again.
+
+A pattern Object matches an instance Object when the instance properties
+are of the same class as (or a subclass of) the pattern properties, and
+every field set in the pattern matches the same field of the instance.
+Fields which hold several values (such as the hashes in a ``HashList``)
+match when each pattern item matches at least one instance item.  Related
+objects in a pattern must each match a related object of the instance.
+
+An ``ObservableComposition`` is evaluated against the set of Observables
+being matched: with the ``AND`` operator each child must match one of them,
+with ``OR`` at least one child must.
+
+Every matcher has an estimated `cost` (see
+:func:`cybox.match.conditions.condition_cost`).  The fields of an entity and
+the children of a composition are tested cheapest first, and evaluation
+stops as soon as the result is known, so exact-match checks run before
+substring and regex checks.
+
+Observables which several patterns share, either by id or through an idref,
+are compiled once by :func:`compile_patterns`, and their result is computed
+once per instance by :func:`match_patterns`.
+"""
+
+from mixbox import entities
+
+import cybox.utils
+from cybox.common import BaseProperty, ObjectProperties, VocabString
+from cybox.common.object_properties import Property
+from cybox.core.event import Event
+from cybox.core.object import Object
+from cybox.core.observable import (Observable, ObservableComposition,
+        Observables)
+from cybox.match.conditions import compile_condition, condition_cost
+
+# Fields which identify an entity instead of describing it.
+_IGNORED_FIELDS = frozenset(["id", "idref", "object_reference"])
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, (BaseProperty, VocabString)):
+        return value.value is None
+    if isinstance(value, (list, entities.EntityList)):
+        return len(value) == 0
+    return False
+
+
+class _PropertyMatcher(object):
+    """Tests a BaseProperty or VocabString against a pattern property."""
+
+    __slots__ = ('test', 'name', 'cost')
+
+    def __init__(self, prop):
+        self.test = compile_condition(prop)
+        self.cost = condition_cost(prop)
+        # Custom Properties are only comparable when their names match.
+        self.name = prop.name if isinstance(prop, Property) else None
+
+    def match(self, prop):
+        if prop is None:
+            return False
+        if self.name is not None and getattr(prop, 'name', None) != self.name:
+            return False
+
+        value = getattr(prop, 'value', prop)
+        if value is None:
+            return False
+
+        test = self.test
+        if isinstance(value, list):
+            for v in value:
+                if test(v):
+                    return True
+            return False
+
+        return test(value)
+
+
+class _ValueMatcher(object):
+    """Tests a plain (non-Entity) field value for equality."""
+
+    __slots__ = ('value',)
+
+    cost = 1
+
+    def __init__(self, value):
+        self.value = value
+
+    def match(self, value):
+        return value == self.value
+
+
+class _ListMatcher(object):
+    """Requires each pattern item to match some item of the instance list."""
+
+    __slots__ = ('matchers', 'cost')
+
+    def __init__(self, items):
+        self.matchers = _by_cost(_compile_value(x) for x in items
+                                 if not _is_empty(x))
+        # Each pattern item may be tested against every instance item.
+        self.cost = 2 * sum(x.cost for x in self.matchers)
+
+    def match(self, values):
+        if not values:
+            return False
+
+        for matcher in self.matchers:
+            for value in values:
+                if matcher.match(value):
+                    break
+            else:
+                return False
+
+        return True
+
+
+class _EntityMatcher(object):
+    """Tests the TypedFields of an Entity."""
+
+    __slots__ = ('klass', 'fields', 'cost')
+
+    def __init__(self, entity):
+        self.klass = type(entity)
+        fields = []
+
+        for field, value in entity._fields.items():
+            if field.name in _IGNORED_FIELDS or _is_empty(value):
+                continue
+            fields.append((field, _compile_value(value)))
+
+        fields.sort(key=lambda x: x[1].cost)
+        self.fields = fields
+        self.cost = 1 + sum(x[1].cost for x in fields)
+
+    def match(self, entity):
+        if not isinstance(entity, self.klass):
+            return False
+
+        values = entity._fields
+        for field, matcher in self.fields:
+            value = values.get(field)
+            if value is None or not matcher.match(value):
+                return False
+
+        return True
+
+
+class _ObjectMatcher(object):
+    """Tests the properties and related objects of an Object."""
+
+    __slots__ = ('properties', 'related', 'cost')
+
+    def __init__(self, obj):
+        properties = _object_properties(obj)
+        if properties is None:
+            raise ValueError("Pattern Object %s has no properties" %
+                             (obj.id_ or obj.idref))
+
+        self.properties = _EntityMatcher(properties)
+        self.related = []
+
+        for related in obj.related_objects:
+            relationship = related.relationship
+            if relationship is not None and relationship.value is not None:
+                relationship = _PropertyMatcher(relationship)
+            else:
+                relationship = None
+            self.related.append((relationship, _ObjectMatcher(related)))
+
+        self.related.sort(key=lambda x: x[1].cost)
+        self.cost = self.properties.cost + \
+            2 * sum(x[1].cost for x in self.related)
+
+    def match(self, obj):
+        try:
+            properties = _object_properties(obj)
+        except cybox.utils.CacheMiss:
+            return False
+
+        if not self.properties.match(properties):
+            return False
+
+        for relationship, matcher in self.related:
+            for related in obj.related_objects:
+                if relationship is not None and \
+                        not relationship.match(related._relationship):
+                    continue
+                if matcher.match(related):
+                    break
+            else:
+                return False
+
+        return True
+
+
+def _object_properties(obj):
+    """Return the properties of `obj`, looking up idrefs in the cache."""
+    if obj.properties is not None:
+        return obj.properties
+    if obj.idref:
+        return cybox.utils.cache_get(obj.idref).properties
+    return None
+
+
+def _by_cost(matchers):
+    """Return `matchers` as a list, cheapest first."""
+    return sorted(matchers, key=lambda x: x.cost)
+
+
+def _compile_value(value):
+    """Return a matcher for a field value of a pattern entity."""
+    if isinstance(value, (BaseProperty, VocabString)):
+        return _PropertyMatcher(value)
+    if isinstance(value, Object):
+        return _ObjectMatcher(value)
+    if isinstance(value, (list, entities.EntityList)):
+        return _ListMatcher(value)
+    if isinstance(value, entities.Entity) and value._fields:
+        return _EntityMatcher(value)
+    return _ValueMatcher(value)
+
+
+class _ObjectNode(object):
+    """Matches Observables which contain a matching Object."""
+
+    __slots__ = ('matcher', 'cost')
+
+    def __init__(self, obj):
+        self.matcher = _ObjectMatcher(obj)
+        self.cost = self.matcher.cost
+
+    def match(self, observables, memo):
+        matcher = self.matcher
+        for obs in observables:
+            obj = obs.object_
+            if obj is not None and matcher.match(obj):
+                return True
+        return False
+
+
+class _EventNode(object):
+    """Matches Observables which contain a matching Event."""
+
+    __slots__ = ('matcher', 'cost')
+
+    def __init__(self, event):
+        self.matcher = _EntityMatcher(event)
+        self.cost = self.matcher.cost
+
+    def match(self, observables, memo):
+        matcher = self.matcher
+        for obs in observables:
+            event = obs.event
+            if event is not None and matcher.match(event):
+                return True
+        return False
+
+
+class _CompositionNode(object):
+    """Combines child nodes with the AND or OR operator."""
+
+    __slots__ = ('operator', 'children', 'cost')
+
+    def __init__(self, operator, children):
+        self.operator = operator
+        self.children = _by_cost(children)
+        self.cost = sum(x.cost for x in self.children)
+
+    def match(self, observables, memo):
+        if self.operator == ObservableComposition.OPERATOR_OR:
+            for child in self.children:
+                if child.match(observables, memo):
+                    return True
+            return False
+
+        for child in self.children:
+            if not child.match(observables, memo):
+                return False
+        return True
+
+
+class _SharedNode(object):
+    """A node used by several patterns.
+
+    Its result is kept in the `memo` dictionary of the current match, so it
+    is only evaluated once per instance however many patterns use it.  The
+    node itself holds no state, so it can be used by several threads.
+    """
+
+    __slots__ = ('node', 'cost')
+
+    def __init__(self, node):
+        self.node = node
+        self.cost = node.cost
+
+    def match(self, observables, memo):
+        try:
+            return memo[self]
+        except KeyError:
+            result = memo[self] = self.node.match(observables, memo)
+            return result
+
+
+def _compile_observable(observable, resolve, shared=None, active=None):
+    # `active` holds the ids and idrefs of the Observables being compiled
+    # further up, so an idref cycle is reported instead of recursing.
+    if active is None:
+        active = set()
+
+    idref = None
+    if observable.idref and not (observable.object_ or observable.event or
+                                 observable.observable_composition):
+        idref = observable.idref
+        if shared is not None and idref in shared:
+            return shared[idref]
+        if idref in active:
+            raise ValueError("Observable idref %s refers to an Observable "
+                             "which contains it" % idref)
+        resolved = resolve(idref) if resolve else None
+        if resolved is None:
+            raise ValueError("Cannot resolve Observable idref %s" % idref)
+        observable = resolved
+
+    id_ = observable.id_
+    if id_ is not None and id_ in active:
+        raise ValueError("Observable %s contains itself" % id_)
+
+    keys = set(x for x in (idref, id_) if x is not None)
+    active.update(keys)
+    try:
+        if shared is not None and id_ is not None:
+            node = shared.get(id_)
+            if node is None:
+                node = shared[id_] = _SharedNode(
+                    _compile_observable_node(observable, resolve, shared,
+                                             active))
+            return node
+
+        return _compile_observable_node(observable, resolve, shared, active)
+    finally:
+        active.difference_update(keys)
+
+
+def _compile_observable_node(observable, resolve, shared, active):
+    if observable.object_ is not None:
+        return _ObjectNode(observable.object_)
+    if observable.event is not None:
+        return _EventNode(observable.event)
+
+    composition = observable.observable_composition
+    if composition is not None:
+        children = [_compile_observable(x, resolve, shared, active)
+                    for x in composition.observables]
+        return _CompositionNode(composition.operator, children)
+
+    raise ValueError("Pattern Observable %s has no Object, Event or "
+                     "ObservableComposition" % observable.id_)
+
+
+class _Instance(object):
+    """Stands in for an Observable around a bare Object or Event."""
+
+    __slots__ = ('object_', 'event')
+
+    def __init__(self, object_=None, event=None):
+        self.object_ = object_
+        self.event = event
+
+
+def _candidate(item):
+    if isinstance(item, Observable):
+        return item
+    if isinstance(item, ObjectProperties):
+        return _Instance(object_=item.parent)
+    if isinstance(item, Object):
+        return _Instance(object_=item)
+    if isinstance(item, Event):
+        return _Instance(event=item)
+    raise TypeError("Cannot match a %s" % type(item))
+
+
+def _candidates(instance):
+    """Return the list of Observables an instance stands for."""
+    if isinstance(instance, (Observable, ObjectProperties, Object, Event)):
+        stack = [instance]
+    else:
+        stack = list(instance)
+
+    candidates = []
+    while stack:
+        obs = _candidate(stack.pop())
+        composition = getattr(obs, 'observable_composition', None)
+        if composition is not None:
+            stack.extend(composition.observables)
+        else:
+            candidates.append(obs)
+
+    return candidates
+
+
+class PatternMatcher(object):
+    """A compiled pattern Observable.
+
+    Use :func:`compile_pattern` to create one.
+
+    Attributes:
+        id_: The id of the pattern Observable (if any).
+        cost: The estimated cost of matching an instance.
+    """
+
+    def __init__(self, id_, root):
+        self.id_ = id_
+        self.cost = root.cost
+        self._root = root
+
+    def match(self, instance):
+        """Return whether `instance` matches the pattern.
+
+        `instance` may be an :class:`cybox.core.Observable` (an
+        ``ObservableComposition`` in it is flattened into its
+        Observables), an :class:`cybox.core.Object`, an
+        :class:`cybox.common.ObjectProperties`, or an iterable of
+        Observables such as :class:`cybox.core.Observables`, which is
+        treated as a single set of Observables.
+        """
+        return self._root.match(_candidates(instance), {})
+
+    def filter(self, observables):
+        """Yield each Observable in `observables` which matches on its own."""
+        root = self._root
+        for obs in observables:
+            if root.match(_candidates(obs), {}):
+                yield obs
+
+
+def compile_pattern(pattern, resolve=None, shared=None):
+    """Compile `pattern` into a :class:`PatternMatcher`.
+
+    Args:
+        pattern: An :class:`cybox.core.Observable`, or anything accepted by
+            the Observable constructor (an ``Object``, ``Event``,
+            ``ObservableComposition`` or ``ObjectProperties``).
+        resolve: An optional function which returns the Observable for an
+            idref, used for Observables in the pattern which only refer to
+            another Observable (for example ``dict.get`` on a dictionary of
+            Observables by id).
+        shared: An optional dictionary of compiled Observables by id, shared
+            between calls.  Observables whose id is already in it are not
+            compiled again.  See :func:`compile_patterns`.
+
+    Raises:
+        ValueError: if the pattern is empty, uses an unsupported condition,
+            refers to an Observable which cannot be resolved, or contains
+            itself through idrefs.
+    """
+    if isinstance(pattern, Observables):
+        raise TypeError("compile each Observable in an Observables separately")
+    if not isinstance(pattern, Observable):
+        pattern = Observable(pattern)
+
+    return PatternMatcher(pattern.id_ or pattern.idref,
+                          _compile_observable(pattern, resolve, shared))
+
+
+def compile_patterns(patterns, resolve=None):
+    """Compile each pattern in `patterns` into a :class:`PatternMatcher`.
+
+    Observables which appear in several patterns (with the same id, or
+    through an idref) are compiled once and shared by the matchers, so
+    :func:`match_patterns` evaluates them once per instance.  If `resolve`
+    is not given, idrefs are resolved among `patterns` and the Observables
+    they contain.
+    """
+    patterns = [x if isinstance(x, Observable) else Observable(x)
+                for x in patterns]
+
+    if resolve is None:
+        by_id = {}
+        stack = list(patterns)
+        while stack:
+            obs = stack.pop()
+            if obs.id_:
+                by_id[obs.id_] = obs
+            if obs.observable_composition is not None:
+                stack.extend(obs.observable_composition.observables)
+        resolve = by_id.get
+
+    shared = {}
+    return [compile_pattern(x, resolve, shared) for x in patterns]
+
+
+def match_patterns(matchers, instance):
+    """Return the matchers in `matchers` which `instance` matches.
+
+    This is the same as testing each matcher's :meth:`~PatternMatcher.match`
+    method, but `instance` is only prepared once, and shared Observables
+    (see :func:`compile_patterns`) are only evaluated once.
+    """
+    candidates = _candidates(instance)
+    memo = {}
+    return [x for x in matchers if x._root.match(candidates, memo)]
@@ -0,0 +1,359 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""An inverted index for finding the patterns an instance may match.
+
+:class:`PatternIndex` stores each pattern under the values of one of its
+exact-match (``Equals``) fields, keyed by ``(xsi:type, field path, value)``.
+Looking up an instance only reads the instance fields which appear in some
+indexed pattern, probes the index with their values, and then runs the full
+matcher of each pattern found.  Patterns without a usable exact-match field
+are kept aside and always matched in full.
+
+String values are lower-cased in the keys, so the index finds candidates for
+case-insensitive patterns too; the matcher makes the final decision.
+"""
+
+from mixbox import entities
+from mixbox.vendor import six
+
+from cybox.common import BaseProperty, ObjectProperties, VocabString
+from cybox.core.observable import Observable
+from cybox.match.conditions import APPLY_ANY, EQUALS
+from cybox.match.matcher import (_IGNORED_FIELDS, _candidates,
+        compile_pattern)
+from cybox.utils.caches import approximate_size
+
+# The xsi:types of each ObjectProperties class and its base classes.
+_xsi_types = {}
+
+
+def _class_xsi_types(klass):
+    try:
+        return _xsi_types[klass]
+    except KeyError:
+        pass
+
+    types = tuple(x.__dict__['_XSI_TYPE'] for x in klass.__mro__
+                  if issubclass(x, ObjectProperties) and
+                  x.__dict__.get('_XSI_TYPE'))
+    _xsi_types[klass] = types
+    return types
+
+
+def _normalize(value):
+    if isinstance(value, six.string_types):
+        return value.lower()
+    return value
+
+
+def _property_values(prop):
+    value = prop.value
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _is_indexable(prop):
+    return (prop.condition in (None, EQUALS) and
+            prop.apply_condition in (None, APPLY_ANY))
+
+
+def _exact_fields(entity, path=()):
+    """Yield (path, property) for each exact-match property of `entity`."""
+    for field, value in six.iteritems(entity._fields):
+        if field.name in _IGNORED_FIELDS or value is None:
+            continue
+
+        field_path = path + (field,)
+        if isinstance(value, (list, entities.EntityList)):
+            items = value
+        else:
+            items = [value]
+
+        for item in items:
+            if isinstance(item, (BaseProperty, VocabString)):
+                if item.value is not None and _is_indexable(item):
+                    yield field_path, item
+            elif isinstance(item, entities.Entity) and item._fields:
+                for x in _exact_fields(item, field_path):
+                    yield x
+
+
+def _values_at(entity, path):
+    """Return the values of the properties found along `path`."""
+    current = [entity]
+
+    for field in path:
+        following = []
+        for item in current:
+            fields = getattr(item, '_fields', None)
+            if not fields:
+                continue
+            value = fields.get(field)
+            if value is None:
+                continue
+            if isinstance(value, (list, entities.EntityList)):
+                following.extend(value)
+            else:
+                following.append(value)
+        current = following
+
+    values = []
+    for prop in current:
+        if isinstance(prop, (BaseProperty, VocabString)):
+            values.extend(_property_values(prop))
+    return values
+
+
+def _object_keys(properties):
+    """Return the most selective set of index keys for a pattern Object."""
+    best = None
+    best_rank = None
+
+    for xsi_type in _class_xsi_types(type(properties))[:1]:
+        for path, prop in _exact_fields(properties):
+            try:
+                keys = set((xsi_type, path, _normalize(v))
+                           for v in _property_values(prop))
+            except TypeError:
+                # Unhashable values.
+                continue
+
+            # Vocabulary values (such as a hash type) are shared by many
+            # patterns, so only use them when nothing else is available.
+            rank = (isinstance(prop, VocabString), len(keys))
+            if best_rank is None or rank < best_rank:
+                best, best_rank = keys, rank
+
+    return best
+
+
+def _pattern_keys(observable, resolve):
+    """Return the keys of which an instance must hit at least one, or None.
+
+    None means the pattern cannot be found through the index.
+    """
+    if observable.idref and not (observable.object_ or observable.event or
+                                 observable.observable_composition):
+        observable = resolve(observable.idref)
+
+    if observable.object_ is not None:
+        properties = observable.object_.properties
+        if properties is None:
+            return None
+        return _object_keys(properties)
+
+    composition = observable.observable_composition
+    if composition is None:
+        return None
+
+    children = [_pattern_keys(x, resolve) for x in composition.observables]
+    if composition.operator == composition.OPERATOR_OR:
+        if any(x is None for x in children):
+            return None
+        return set().union(*children)
+
+    # AND: every child has to match, so any one child is enough.
+    children = [x for x in children if x is not None]
+    if not children:
+        return None
+    return min(children, key=len)
+
+
+def _observable_ids(observable):
+    """Return the ids of `observable` and the Observables composed in it."""
+    ids = set()
+    stack = [observable]
+    while stack:
+        obs = stack.pop()
+        if obs.id_:
+            ids.add(obs.id_)
+        if obs.observable_composition is not None:
+            stack.extend(obs.observable_composition.observables)
+    return ids
+
+
+class PatternIndex(object):
+    """Finds the patterns matched by an instance without scanning them all.
+
+    .. code-block:: python
+
+        index = PatternIndex()
+        for pattern in indicator_observables:
+            index.add(pattern)
+
+        for obs in incoming:
+            for pattern_id in index.lookup(obs):
+                report(pattern_id, obs)
+    """
+
+    def __init__(self):
+        self._matchers = {}
+        self._order = {}
+        self._next = 0
+        # id -> index keys of the pattern (None when not indexed)
+        self._pattern_keys = {}
+        # (xsi:type, path, value) -> list of pattern ids
+        self._index = {}
+        # xsi:type -> {path: number of keys using it}
+        self._paths = {}
+        # ids of patterns which are always matched in full
+        self._unindexed = set()
+        # Observables compiled for one pattern and reused by others
+        self._shared = {}
+        # id -> the keys of _shared to drop when the pattern is removed
+        self._shared_ids = {}
+
+    def __len__(self):
+        return len(self._matchers)
+
+    def __contains__(self, id_):
+        return id_ in self._matchers
+
+    @property
+    def key_count(self):
+        """The number of distinct keys in the index."""
+        return len(self._index)
+
+    def add(self, pattern, id_=None, resolve=None):
+        """Add `pattern` to the index and return its id.
+
+        Args:
+            pattern: A pattern, as accepted by
+                :func:`cybox.match.compile_pattern`.
+            id_: The id to report for the pattern. Defaults to the id of the
+                pattern Observable.
+            resolve: Resolves Observable idrefs in the pattern (see
+                :func:`cybox.match.compile_pattern`).
+
+        Observables with an id are compiled once for the whole index, and
+        are assumed not to change while a pattern containing them is in
+        the index.
+
+        Raises:
+            ValueError: if the pattern cannot be compiled, has no id, or an
+                pattern with the same id is already in the index.
+        """
+        if not isinstance(pattern, Observable):
+            pattern = Observable(pattern)
+
+        if id_ is None:
+            id_ = pattern.id_ or pattern.idref
+        if id_ is None:
+            raise ValueError("The pattern needs an id")
+        if id_ in self._matchers:
+            raise ValueError("Pattern %s is already in the index" % id_)
+
+        shared = self._shared
+        before = set(shared)
+        matcher = compile_pattern(pattern, resolve, shared)
+        keys = _pattern_keys(pattern, resolve)
+
+        self._shared_ids[id_] = (set(shared) - before) | _observable_ids(pattern)
+        self._matchers[id_] = matcher
+        self._order[id_] = self._next
+        self._next += 1
+        self._pattern_keys[id_] = keys
+
+        if keys is None:
+            self._unindexed.add(id_)
+            return id_
+
+        for key in keys:
+            self._index.setdefault(key, []).append(id_)
+            paths = self._paths.setdefault(key[0], {})
+            paths[key[1]] = paths.get(key[1], 0) + 1
+
+        return id_
+
+    def remove(self, id_):
+        """Remove the pattern `id_` from the index.
+
+        Raises:
+            KeyError: if there is no such pattern.
+        """
+        del self._matchers[id_]
+        del self._order[id_]
+        keys = self._pattern_keys.pop(id_)
+
+        # Other patterns keep the nodes they were compiled with, but a
+        # pattern added later under one of these ids is compiled afresh.
+        for shared_id in self._shared_ids.pop(id_):
+            self._shared.pop(shared_id, None)
+
+        if keys is None:
+            self._unindexed.discard(id_)
+            return
+
+        for key in keys:
+            ids = self._index[key]
+            ids.remove(id_)
+            if not ids:
+                del self._index[key]
+
+            paths = self._paths[key[0]]
+            paths[key[1]] -= 1
+            if not paths[key[1]]:
+                del paths[key[1]]
+                if not paths:
+                    del self._paths[key[0]]
+
+    def _probe(self, candidates):
+        found = set(self._unindexed)
+        index = self._index
+
+        for obs in candidates:
+            obj = obs.object_
+            properties = obj.properties if obj is not None else None
+            if properties is None:
+                continue
+
+            for xsi_type in _class_xsi_types(type(properties)):
+                paths = self._paths.get(xsi_type)
+                if not paths:
+                    continue
+                for path in paths:
+                    for value in _values_at(properties, path):
+                        try:
+                            ids = index.get((xsi_type, path, _normalize(value)))
+                        except TypeError:
+                            continue
+                        if ids:
+                            found.update(ids)
+
+        return found
+
+    def candidates(self, instance):
+        """Return the ids of the patterns `instance` might match.
+
+        This only probes the index; see :meth:`lookup` for the patterns
+        which actually match.  `instance` is anything accepted by
+        :meth:`cybox.match.PatternMatcher.match`.
+        """
+        return self._probe(_candidates(instance))
+
+    def lookup(self, instance):
+        """Return the ids of the patterns matched by `instance`.
+
+        The ids are returned in the order the patterns were added.
+        """
+        candidates = _candidates(instance)
+        found = self._probe(candidates)
+
+        memo = {}
+        matched = [x for x in found
+                   if self._matchers[x]._root.match(candidates, memo)]
+        matched.sort(key=self._order.__getitem__)
+        return matched
+
+    def memory_usage(self):
+        """Return the approximate size of the index structures, in bytes.
+
+        The compiled matchers of the patterns are not included.
+        """
+        return approximate_size([self._index, self._paths,
+                                 self._pattern_keys, self._unindexed,
+                                 self._order])
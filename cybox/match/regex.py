@@ -0,0 +1,394 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Compilation and caching of ``FitsPattern`` regular expressions.
+
+The ``regex_syntax`` of a patterned property names the dialect its value is
+written in.  :func:`translate` rewrites PCRE, POSIX and XML Schema regular
+expressions into Python :mod:`re` syntax, and raises
+:class:`UnsupportedRegex` for constructs Python cannot express.
+:func:`compile_regex` caches the compiled result, and :class:`RegexSet`
+tests one value against many regular expressions at once.
+"""
+
+import re
+
+from mixbox.vendor import six
+
+from cybox.utils.caches import CacheMiss, LRUCache
+
+#: The maximum number of compiled regular expressions kept by
+#: :func:`compile_regex`.
+REGEX_CACHE_SIZE = 1000
+
+_regex_cache = LRUCache(max_items=REGEX_CACHE_SIZE)
+
+PYTHON = "python"
+PCRE = "pcre"
+POSIX = "posix"
+XSD = "xsd"
+
+# Lower-cased regex_syntax values and the dialect they name.
+_SYNTAXES = {
+    "": PYTHON,
+    "python": PYTHON,
+    "re": PYTHON,
+    "pcre": PCRE,
+    "pcre2": PCRE,
+    "perl": PCRE,
+    "perl5": PCRE,
+    "posix": POSIX,
+    "posix ere": POSIX,
+    "posix-ere": POSIX,
+    "ere": POSIX,
+    "xsd": XSD,
+    "xml": XSD,
+    "xml schema": XSD,
+    "xml-schema": XSD,
+    "xmlschema": XSD,
+}
+
+_POSIX_CLASSES = {
+    "alnum": "a-zA-Z0-9",
+    "alpha": "a-zA-Z",
+    "blank": " \\t",
+    "cntrl": "\\x00-\\x1f\\x7f",
+    "digit": "0-9",
+    "graph": "\\x21-\\x7e",
+    "lower": "a-z",
+    "print": "\\x20-\\x7e",
+    "punct": "!-/:-@\\[-`{-~",
+    "space": " \\t\\n\\r\\f\\v",
+    "upper": "A-Z",
+    "word": "a-zA-Z0-9_",
+    "xdigit": "0-9A-Fa-f",
+}
+
+# Escapes with no Python equivalent, by dialect.
+_UNSUPPORTED_ESCAPES = {
+    PCRE: "GKRXpPCEe",
+    POSIX: "",
+    XSD: "iIcCpP",
+}
+
+_inline_flags_pattern = re.compile(r'\(\?[aiLmsux]+\)')
+
+
+class UnsupportedRegex(ValueError):
+    """A regular expression cannot be translated to Python syntax."""
+    pass
+
+
+def regex_dialect(regex_syntax):
+    """Return the dialect named by a ``regex_syntax`` value.
+
+    Raises:
+        UnsupportedRegex: if the syntax is not known.
+    """
+    key = (regex_syntax or "").strip().lower()
+    try:
+        return _SYNTAXES[key]
+    except KeyError:
+        raise UnsupportedRegex("Unsupported regex syntax: %s" % regex_syntax)
+
+
+def _unsupported(pattern, construct):
+    return UnsupportedRegex("Unsupported construct %s in %r" %
+                            (construct, pattern))
+
+
+def _translate_class(pattern, i, dialect, out):
+    """Copy the character class starting at pattern[i]; return its end."""
+    out.append('[')
+    i += 1
+    if pattern.startswith('^', i):
+        out.append('^')
+        i += 1
+    if pattern.startswith(']', i):
+        out.append('\\]')
+        i += 1
+
+    while i < len(pattern):
+        char = pattern[i]
+        if char == ']':
+            out.append(']')
+            return i + 1
+        if char == '[' and pattern.startswith('[:', i):
+            end = pattern.find(':]', i + 2)
+            name = pattern[i + 2:end] if end != -1 else None
+            if name not in _POSIX_CLASSES:
+                raise _unsupported(pattern, "[:%s:]" % name)
+            out.append(_POSIX_CLASSES[name])
+            i = end + 2
+            continue
+        if char == '[' and dialect == XSD and pattern.startswith('-', i - 1):
+            raise _unsupported(pattern, "character class subtraction")
+        if char == '\\' and dialect != POSIX:
+            escape = pattern[i + 1:i + 2]
+            if escape in _UNSUPPORTED_ESCAPES[dialect]:
+                raise _unsupported(pattern, '\\' + escape)
+            out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if char == '\\' or char == '[':
+            # A literal backslash (POSIX) or opening bracket.
+            out.append('\\' + char)
+        else:
+            out.append(char)
+        i += 1
+
+    raise UnsupportedRegex("Unterminated character class in %r" % pattern)
+
+
+def _translate(pattern, dialect):
+    out = []
+    i = 0
+    length = len(pattern)
+
+    while i < length:
+        char = pattern[i]
+
+        if char == '[':
+            i = _translate_class(pattern, i, dialect, out)
+            continue
+
+        if char == '\\':
+            escape = pattern[i + 1:i + 2]
+            if dialect == PCRE and escape == 'Q':
+                end = pattern.find('\\E', i + 2)
+                if end == -1:
+                    end = length
+                out.append(re.escape(pattern[i + 2:end]))
+                i = end + 2
+                continue
+            if escape in _UNSUPPORTED_ESCAPES[dialect]:
+                raise _unsupported(pattern, '\\' + escape)
+            if dialect == PCRE and escape == 'z':
+                out.append('\\Z')
+            elif dialect == PCRE and escape == 'Z':
+                out.append('(?=\\n?\\Z)')
+            elif dialect == PCRE and escape == 'h':
+                out.append('[ \\t]')
+            elif dialect == PCRE and escape == 'k' and \
+                    pattern.startswith('<', i + 2):
+                end = pattern.index('>', i + 3)
+                out.append('(?P=%s)' % pattern[i + 3:end])
+                i = end + 1
+                continue
+            else:
+                out.append(pattern[i:i + 2])
+            i += 2
+            continue
+
+        if char == '(' and pattern.startswith('?', i + 1):
+            rest = pattern[i + 2:i + 4]
+            if rest.startswith('<') and rest not in ('<=', '<!'):
+                # PCRE named group: (?<name>...)
+                out.append('(?P<')
+                i += 3
+                continue
+            if rest[:1] in ('>', '|', '&', 'R') or rest[:1].isdigit() or \
+                    rest == 'P>' or rest[:1] in ('+', '-') and \
+                    pattern[i + 3:i + 4].isdigit():
+                raise _unsupported(pattern, pattern[i:i + 4])
+
+        if char in '*+?}' and pattern.startswith('+', i + 1) and \
+                dialect == PCRE:
+            raise _unsupported(pattern, "possessive quantifier")
+
+        if dialect == XSD and char in '^$':
+            # Not anchors in XML Schema.
+            out.append('\\' + char)
+        else:
+            out.append(char)
+        i += 1
+
+    result = ''.join(out)
+    if dialect == XSD:
+        # XML Schema patterns always match the whole value.
+        result = '^(?:%s)\\Z' % result
+    return result
+
+
+def translate(pattern, regex_syntax=None):
+    """Return `pattern`, written in `regex_syntax`, in Python syntax.
+
+    `regex_syntax` is the ``regex_syntax`` of a patterned property, such as
+    ``"PCRE"``, ``"POSIX"`` or ``"XML Schema"``.  None means Python syntax.
+    The translated pattern is meant to be used with ``search()``; XML
+    Schema patterns, which always match the whole value, are anchored.
+
+    Raises:
+        UnsupportedRegex: if the syntax is unknown, or the pattern uses a
+            construct Python does not support (such as possessive
+            quantifiers, atomic groups or Unicode property escapes).
+    """
+    dialect = regex_dialect(regex_syntax)
+    if dialect == PYTHON:
+        return pattern
+    try:
+        return _translate(pattern, dialect)
+    except (IndexError, ValueError) as ex:
+        if isinstance(ex, UnsupportedRegex):
+            raise
+        raise UnsupportedRegex("Cannot translate %r: %s" % (pattern, ex))
+
+
+def compile_regex(pattern, regex_syntax=None, case_sensitive=True):
+    """Translate and compile `pattern`, reusing earlier results.
+
+    Up to :data:`REGEX_CACHE_SIZE` compiled patterns are kept; the least
+    recently used ones are dropped first.
+
+    Raises:
+        UnsupportedRegex: if the pattern cannot be translated or compiled.
+    """
+    key = (pattern, regex_syntax, case_sensitive)
+    try:
+        return _regex_cache.get(key)
+    except CacheMiss:
+        pass
+
+    flags = 0 if case_sensitive else re.IGNORECASE
+    try:
+        compiled = re.compile(translate(pattern, regex_syntax), flags)
+    except re.error as ex:
+        raise UnsupportedRegex("Invalid regex %r: %s" % (pattern, ex))
+
+    _regex_cache.put(compiled, key)
+    return compiled
+
+
+class RegexSet(object):
+    r"""Tests a value against many regular expressions in one call.
+
+    The expressions are combined into a single Python regex made of one
+    optional lookahead per expression, each wrapped in a named group, so a
+    single ``match()`` reports every expression found anywhere in the
+    value, even when the matches overlap.  Expressions which cannot be
+    combined (because they use backreferences, named groups or inline
+    flags) are searched on their own.
+
+    .. code-block:: python
+
+        regexes = RegexSet()
+        regexes.add(r"[a-f0-9]{32}\.exe$", "random-name")
+        regexes.add(r"\\temp\\", "temp-dir", case_sensitive=False)
+        regexes.matches(r"C:\Temp\0cc175b9c0f1b6a831c399e269772661.exe")
+    """
+
+    # Python 2 refuses regexes with more than 100 groups.
+    MAX_GROUPS = 99
+
+    def __init__(self):
+        self._patterns = []
+        self._ids = set()
+        self._combined = None
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def __contains__(self, id_):
+        return id_ in self._ids
+
+    def add(self, pattern, id_, regex_syntax=None, case_sensitive=True):
+        """Add a regular expression, reported as `id_` when it matches.
+
+        Raises:
+            UnsupportedRegex: if the expression cannot be compiled.
+            ValueError: if an expression with the same id was added.
+        """
+        if id_ in self._ids:
+            raise ValueError("Pattern %s is already in the set" % id_)
+
+        compiled = compile_regex(pattern, regex_syntax, case_sensitive)
+        self._patterns.append((id_, compiled))
+        self._ids.add(id_)
+        self._combined = None
+        return id_
+
+    def add_property(self, prop, id_=None):
+        """Add the values of a ``FitsPattern`` property.
+
+        Each value is added with the id ``(id_, index)`` when the property
+        has several values, or `id_` when it has one.  `id_` defaults to the
+        id of the property.
+        """
+        if id_ is None:
+            id_ = prop.id_
+        values = prop.values if isinstance(prop.value, list) else [prop.value]
+        case_sensitive = prop.is_case_sensitive is not False
+
+        if len(values) == 1:
+            return [self.add(values[0], id_, prop.regex_syntax,
+                             case_sensitive)]
+        return [self.add(v, (id_, n), prop.regex_syntax, case_sensitive)
+                for n, v in enumerate(values)]
+
+    def remove(self, id_):
+        """Remove the expression `id_`.
+
+        Raises:
+            KeyError: if there is no such expression.
+        """
+        self._ids.remove(id_)
+        self._patterns = [x for x in self._patterns if x[0] != id_]
+        self._combined = None
+
+    def _combine(self):
+        combined = []
+        separate = []
+        chunk = []
+        groups = 0
+
+        def flush():
+            if chunk:
+                parts = ['(?=[\\s\\S]*?(?P<_%d>%s))?' % (n, compiled.pattern)
+                         for n, (_, compiled) in enumerate(chunk)]
+                regex = re.compile(''.join(parts), chunk[0][1].flags)
+                ids = dict(('_%d' % n, id_)
+                           for n, (id_, _) in enumerate(chunk))
+                combined.append((regex, ids))
+
+        for flags in sorted(set(c.flags for _, c in self._patterns)):
+            chunk = []
+            groups = 0
+            for id_, compiled in self._patterns:
+                if compiled.flags != flags:
+                    continue
+                if (compiled.groupindex or
+                        _inline_flags_pattern.search(compiled.pattern) or
+                        re.search(r'\\[1-9]|\(\?P=', compiled.pattern)):
+                    separate.append((id_, compiled))
+                    continue
+                if chunk and groups + compiled.groups + 1 > self.MAX_GROUPS:
+                    flush()
+                    chunk = []
+                    groups = 0
+                chunk.append((id_, compiled))
+                groups += compiled.groups + 1
+            flush()
+
+        self._combined = (combined, separate)
+
+    def matches(self, value):
+        """Return the ids of the expressions found in `value`.
+
+        Ids are returned in the order the expressions were added.
+        """
+        if self._combined is None:
+            self._combine()
+        combined, separate = self._combined
+
+        value = six.text_type(value)
+        found = set()
+        for regex, ids in combined:
+            groups = regex.match(value).groupdict()
+            for name, id_ in six.iteritems(ids):
+                if groups[name] is not None:
+                    found.add(id_)
+        for id_, compiled in separate:
+            if compiled.search(value):
+                found.add(id_)
+
+        return [id_ for id_, _ in self._patterns if id_ in found]
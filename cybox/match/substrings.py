@@ -0,0 +1,284 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+"""Match many ``Contains``, ``StartsWith`` and ``EndsWith`` patterns at once.
+
+:class:`SubstringIndex` puts the values of all the substring patterns on a
+field into one Aho-Corasick automaton, so each instance value is read once,
+however many patterns there are.  Case-insensitive patterns (with
+``is_case_sensitive`` set to False) go into a second automaton which reads
+the lower-cased value.
+"""
+
+from collections import deque
+
+from mixbox.vendor import six
+
+from cybox.common import BaseProperty, VocabString
+from cybox.core.observable import Observable
+from cybox.match.conditions import (APPLY_ALL, APPLY_ANY, CONTAINS,
+        ENDS_WITH, STARTS_WITH)
+
+_SUBSTRING_CONDITIONS = frozenset([CONTAINS, STARTS_WITH, ENDS_WITH])
+
+
+class Automaton(object):
+    """An Aho-Corasick automaton over strings.
+
+    Add words with :meth:`add`, then call :meth:`search`.  The automaton is
+    (re)built automatically when it is searched after words were added.
+    """
+
+    def __init__(self):
+        self._words = []
+        self._built = True
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+    def __len__(self):
+        return len(self._words)
+
+    def add(self, word, entry):
+        """Add `word`; :meth:`search` reports `entry` when it is found."""
+        if not word:
+            raise ValueError("Cannot add an empty word")
+        self._words.append((word, entry))
+        self._built = False
+
+    def remove(self, predicate):
+        """Remove the words whose entry satisfies `predicate`."""
+        words = [x for x in self._words if not predicate(x[1])]
+        if len(words) != len(self._words):
+            self._words = words
+            self._built = False
+
+    def _build(self):
+        goto = [{}]
+        out = [[]]
+
+        for word, entry in self._words:
+            state = 0
+            for char in word:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    out.append([])
+                state = next_state
+            out[state].append((len(word), entry))
+
+        fail = [0] * len(goto)
+        queue = deque(six.itervalues(goto[0]))
+        while queue:
+            state = queue.popleft()
+            for char, next_state in six.iteritems(goto[state]):
+                queue.append(next_state)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(char, 0)
+                fail[next_state] = f
+                out[next_state].extend(out[f])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(x) for x in out]
+        self._built = True
+
+    def search(self, text):
+        """Return ``(start, end, entry)`` for every word found in `text`."""
+        if not self._built:
+            self._build()
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found = []
+        state = 0
+
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                for length, entry in out[state]:
+                    found.append((end - length, end, entry))
+
+        return found
+
+
+def _field_property(value, field):
+    if isinstance(value, (BaseProperty, VocabString)):
+        return value
+    if field is None:
+        return None
+
+    if isinstance(value, Observable):
+        value = value.object_
+    if value is not None and getattr(value, 'properties', None) is not None:
+        value = value.properties
+    return getattr(value, field, None)
+
+
+class SubstringIndex(object):
+    """Finds the substring patterns matched by a value.
+
+    Patterns are :class:`cybox.common.BaseProperty` or
+    :class:`cybox.common.VocabString` objects with a ``Contains``,
+    ``StartsWith`` or ``EndsWith`` condition.  A pattern with several values
+    matches if any of them matches, or all of them for ``Contains`` with an
+    `apply_condition` of ``ALL``.
+
+    .. code-block:: python
+
+        index = SubstringIndex("command_line")
+        for pattern in process_patterns:
+            index.add(pattern)
+
+        index.matches(process.command_line)
+
+    Args:
+        field: The name of the ObjectProperties attribute holding the
+            patterned property.  When set, patterns and instances may be
+            given as ObjectProperties, Objects or Observables.
+    """
+
+    def __init__(self, field=None):
+        self.field = field
+        self._sensitive = Automaton()
+        self._insensitive = Automaton()
+        # id -> (condition, number of values required, insertion order)
+        self._patterns = {}
+        self._next = 0
+        # ids of patterns with an empty value, which match anything
+        self._empty = {}
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def __contains__(self, id_):
+        return id_ in self._patterns
+
+    def add(self, pattern, id_=None):
+        """Add a substring pattern and return its id.
+
+        Args:
+            pattern: The patterned property, or (if `field` is set) an
+                ObjectProperties, Object or Observable containing it.
+            id_: The id to report for the pattern.  Defaults to the id of
+                the pattern Observable, or the id of the property.
+
+        Raises:
+            ValueError: if the property has another condition, has no
+                value, or a pattern with the same id was already added.
+        """
+        prop = _field_property(pattern, self.field)
+        if prop is None or prop.value is None:
+            raise ValueError("No patterned property found")
+
+        condition = prop.condition
+        if condition not in _SUBSTRING_CONDITIONS:
+            raise ValueError("Condition %s is not a substring condition" %
+                             condition)
+
+        apply_condition = prop.apply_condition or APPLY_ANY
+        if apply_condition not in (APPLY_ANY, APPLY_ALL) or \
+                (apply_condition == APPLY_ALL and condition != CONTAINS):
+            raise ValueError("apply_condition %s is not supported with %s" %
+                             (apply_condition, condition))
+
+        if id_ is None:
+            if isinstance(pattern, Observable):
+                id_ = pattern.id_ or pattern.idref
+            else:
+                id_ = getattr(prop, 'id_', None)
+        if id_ is None:
+            raise ValueError("The pattern needs an id")
+        if id_ in self._patterns:
+            raise ValueError("Pattern %s is already in the index" % id_)
+
+        # VocabString has no `values`, so don't use BaseProperty.values.
+        values = prop.value
+        if values is None:
+            values = []
+        elif not isinstance(values, list):
+            values = [values]
+        values = [six.text_type(x) for x in values]
+        if prop.is_case_sensitive is False:
+            automaton = self._insensitive
+            values = [x.lower() for x in values]
+        else:
+            automaton = self._sensitive
+
+        required = len(values) if apply_condition == APPLY_ALL else 1
+        self._patterns[id_] = (condition, required, self._next)
+        self._next += 1
+
+        for position, value in enumerate(values):
+            if value:
+                automaton.add(value, (id_, position))
+            else:
+                self._empty.setdefault(id_, set()).add(position)
+
+        return id_
+
+    def remove(self, id_):
+        """Remove the pattern `id_`.
+
+        Raises:
+            KeyError: if there is no such pattern.
+        """
+        del self._patterns[id_]
+        self._empty.pop(id_, None)
+
+        def predicate(entry):
+            return entry[0] == id_
+        self._sensitive.remove(predicate)
+        self._insensitive.remove(predicate)
+
+    def _search(self, text, found):
+        for automaton, value in ((self._sensitive, text),
+                                 (self._insensitive, text.lower())):
+            if not len(automaton):
+                continue
+            # Lower-casing can change the length of some strings.
+            length = len(value)
+            for start, end, (id_, position) in automaton.search(value):
+                condition = self._patterns[id_][0]
+                if condition == STARTS_WITH and start != 0:
+                    continue
+                if condition == ENDS_WITH and end != length:
+                    continue
+                found.setdefault(id_, set()).add(position)
+
+    def matches(self, value):
+        """Return the ids of the patterns matched by `value`.
+
+        `value` is a string, a BaseProperty or VocabString (a list value
+        matches if any item does), or if `field` is set, an
+        ObjectProperties, Object or Observable.  Ids are returned in the
+        order the patterns were added.
+        """
+        prop = _field_property(value, self.field)
+        if prop is not None:
+            values = prop.value
+            if values is None:
+                return []
+            if not isinstance(values, list):
+                values = [values]
+        elif isinstance(value, six.string_types):
+            values = [value]
+        else:
+            return []
+
+        matched = set()
+        for text in values:
+            found = dict((k, set(v)) for k, v in six.iteritems(self._empty))
+            self._search(six.text_type(text), found)
+            for id_, positions in six.iteritems(found):
+                if len(positions) >= self._patterns[id_][1]:
+                    matched.add(id_)
+
+        return sorted(matched, key=lambda x: self._patterns[x][2])
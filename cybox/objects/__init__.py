@@ -1,6 +1,8 @@
 # Copyright (c) 2015, The MITRE Corporation. All rights reserved.
 # See LICENSE.txt for complete terms.
 
+from mixbox.vendor import six
+
 
 class UnknownObjectType(Exception):
     pass
@@ -10,6 +12,42 @@ def get_class_for_object_type(object_type):
     return _OBJ_META.get_class_for_object_type(object_type)
 
 
+def register_object_type(name, api_class, binding=None, namespace=None,
+                         dependencies=None):
+    """Register an Object type so it can be parsed from XML and dicts.
+
+    Arguments:
+    - name: the xsi:type name of the Object (e.g. "FooObjectType")
+    - api_class: the class that implements the Object, or its fully
+      qualified name as a string
+    - binding: the name of the module holding the binding class called
+      `name`, either a module in cybox.bindings (as for entries in
+      OBJ_LIST) or a fully qualified module name.  Without it, the type
+      can only be used from dicts and the Python API, not parsed from XML.
+    - namespace, dependencies: as for entries in OBJ_LIST
+    """
+    klass = None
+    if not isinstance(api_class, six.string_types):
+        klass = api_class
+        api_class = "%s.%s" % (klass.__module__, klass.__name__)
+
+    o = _ObjectType(name, api_class, binding, namespace, dependencies or [])
+    _OBJ_META.add_object(o, klass)
+
+    if binding:
+        import cybox.bindings.cybox_core as core_binding
+        core_binding._register_binding(name, binding)
+
+
+def prewarm_object_types():
+    """Import and cache the API class of every known Object type.
+
+    Long-running processes can call this once at startup, rather than
+    paying for each import the first time a type is seen.
+    """
+    _OBJ_META.prewarm()
+
+
 class _ObjectType(object):
 
     def __init__(self, name, api_class, binding, namespace, dependencies):
@@ -36,15 +74,33 @@ class _ObjectMetadata(object):
 
     def __init__(self, object_list):
         self._obj_dict = {}
+        # Memoized results of get_class_for_object_type()
+        self._class_dict = {}
 
         for obj in object_list:
             o = _ObjectType(*obj)
             self.add_object(o)
 
-    def add_object(self, object_type):
+    def add_object(self, object_type, api_class=None):
+        """Add (or replace) an ObjectType.
+
+        If `api_class` is given, it is used as the class for the type
+        without importing anything.
+        """
         # TODO: are there other ways we want to look up this data?
         self._obj_dict[object_type.name] = object_type
 
+        if api_class is not None:
+            self._class_dict[object_type.name] = api_class
+        else:
+            self._class_dict.pop(object_type.name, None)
+
+    def prewarm(self):
+        """Resolve the API class of every ObjectType that has one."""
+        for name, otype in list(self._obj_dict.items()):
+            if otype.api_class:
+                self.get_class_for_object_type(name)
+
     def lookup_object(self, object_name):
         return self._obj_dict.get(object_name)
 
@@ -63,6 +119,16 @@ class _ObjectMetadata(object):
         - ImportError, if the specified module is not available.
         - AttributeError, if the module does not contain the given class.
         """
+        try:
+            return self._class_dict[object_type]
+        except KeyError:
+            pass
+
+        klass = self._import_class(object_type)
+        self._class_dict[object_type] = klass
+        return klass
+
+    def _import_class(self, object_type):
         otype = self.lookup_object(object_type)
         if not otype:
             err = "%s is not a known ObjectType" % object_type
@@ -0,0 +1,46 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import subprocess
+import sys
+import unittest
+
+import cybox.bindings.cybox_core as core_binding
+
+
+class TestLazyObjectBindings(unittest.TestCase):
+
+    def test_not_imported_with_core(self):
+        code = ("import sys, cybox.core; "
+                "print('cybox.bindings.network_packet_object' in sys.modules)")
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(b"False", output.strip())
+
+    def test_get_class(self):
+        from cybox.bindings.address_object import AddressObjectType
+        klass = core_binding._get_class('AddressObjectType')
+        self.assertTrue(klass is AddressObjectType)
+        self.assertTrue(core_binding._get_class('ObjectType') is
+                        core_binding.ObjectType)
+
+    def test_unknown_class(self):
+        self.assertRaises(KeyError, core_binding._get_class, 'FooObjectType')
+
+    def test_attribute(self):
+        from cybox.bindings.address_object import AddressObjectType
+        self.assertTrue(core_binding.AddressObjectType is AddressObjectType)
+        self.assertTrue(getattr(core_binding, 'FooObjectType', None) is None)
+
+    def test_attribute_new_interpreter(self):
+        code = ("import cybox.bindings.cybox_core as c; "
+                "print(c.MutexObjectType.__name__)")
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(b"MutexObjectType", output.strip())
+
+    def test_all_object_bindings(self):
+        for name in core_binding._OBJECT_BINDINGS:
+            self.assertEqual(name, core_binding._get_class(name).__name__)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import unittest
+
+from cybox.common import Hash
+from cybox.core import Object, Observable
+from cybox.objects.address_object import Address
+from cybox.objects.file_object import File
+
+
+def _file(name, md5=None):
+    f = File()
+    f.file_name = name
+    if md5:
+        f.add_hash(Hash(md5, Hash.TYPE_MD5))
+    return f
+
+
+class TestObjectPropertiesFingerprint(unittest.TestCase):
+
+    def test_equal_content(self):
+        a = _file("foo.exe", "0123456789abcdef0123456789abcdef")
+        b = File.from_dict(a.to_dict())
+
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+        self.assertEqual(64, len(a.fingerprint()))
+
+    def test_field_order(self):
+        a = Address("1.2.3.4", Address.CAT_IPV4)
+        b = Address()
+        b.category = Address.CAT_IPV4
+        b.address_value = "1.2.3.4"
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+
+    def test_different_content(self):
+        a = _file("foo.exe")
+        b = _file("bar.exe")
+        c = Address("1.2.3.4", Address.CAT_IPV4)
+        self.assertNotEqual(a.fingerprint(), b.fingerprint())
+        self.assertNotEqual(a.fingerprint(), c.fingerprint())
+
+    def test_condition(self):
+        a = _file("foo.exe")
+        b = _file("foo.exe")
+        b.file_name.condition = "Equals"
+        self.assertNotEqual(a.fingerprint(), b.fingerprint())
+
+    def test_memo_invalidated(self):
+        f = _file("foo.exe")
+        first = f.fingerprint()
+        self.assertEqual(first, f.fingerprint())
+
+        f.file_name.value = "bar.exe"
+        self.assertEqual(_file("bar.exe").fingerprint(), f.fingerprint())
+
+        f.size_in_bytes = 10
+        self.assertNotEqual(_file("bar.exe").fingerprint(), f.fingerprint())
+
+        f.size_in_bytes = None
+        self.assertEqual(_file("bar.exe").fingerprint(), f.fingerprint())
+
+        f.file_name.condition = "Contains"
+        contains = _file("bar.exe")
+        contains.file_name.condition = "Contains"
+        self.assertEqual(contains.fingerprint(), f.fingerprint())
+
+        f.file_name.condition = None
+        f.add_hash(Hash("0123456789abcdef0123456789abcdef", Hash.TYPE_MD5))
+        self.assertEqual(
+            _file("bar.exe", "0123456789abcdef0123456789abcdef").fingerprint(),
+            f.fingerprint()
+        )
+
+    def test_dedupe(self):
+        props = [_file("foo.exe"), _file("bar.exe"), _file("foo.exe"),
+                 Address("1.2.3.4"), Address("1.2.3.4")]
+        unique = dict((x.fingerprint(), x) for x in props)
+        self.assertEqual(3, len(unique))
+
+
+class TestObjectFingerprint(unittest.TestCase):
+
+    def test_ignores_id(self):
+        a = Object(_file("foo.exe"))
+        b = Object(_file("foo.exe"))
+        self.assertNotEqual(a.id_, b.id_)
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+
+    def test_related_objects(self):
+        a = Object(_file("foo.exe"))
+        b = Object(_file("foo.exe"))
+        a.add_related(_file("bar.dll"), "Dropped")
+        self.assertNotEqual(a.fingerprint(), b.fingerprint())
+
+        b.add_related(_file("bar.dll"), "Dropped")
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+
+        a.add_related(_file("baz.dll"), "Dropped")
+        b.add_related(_file("baz.dll"), "Created")
+        self.assertNotEqual(a.fingerprint(), b.fingerprint())
+
+
+class TestObservableFingerprint(unittest.TestCase):
+
+    def test_ignores_id_and_sighting_count(self):
+        a = Observable(_file("foo.exe"))
+        b = Observable(_file("foo.exe"))
+        b.sighting_count = 5
+        self.assertNotEqual(a.id_, b.id_)
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+
+    def test_round_trip(self):
+        a = Observable(_file("foo.exe", "0123456789abcdef0123456789abcdef"))
+        a.title = "A file"
+        a.add_keyword("malware")
+        b = Observable.from_dict(a.to_dict())
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+
+    def test_content(self):
+        a = Observable(_file("foo.exe"))
+        b = Observable(_file("foo.exe"))
+        b.title = "A file"
+        self.assertNotEqual(a.fingerprint(), b.fingerprint())
+
+    def test_dedupe(self):
+        observables = [Observable(_file("foo.exe")),
+                       Observable(_file("bar.exe")),
+                       Observable(_file("foo.exe"))]
+        unique = dict((x.fingerprint(), x) for x in observables)
+        self.assertEqual(2, len(unique))
+
+
+if __name__ == "__main__":
+    unittest.main()
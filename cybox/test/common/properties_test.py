@@ -2,6 +2,7 @@
 # See LICENSE.txt for complete terms.
 
 import datetime
+import pickle
 import unittest
 
 from mixbox.vendor import six
@@ -185,6 +186,32 @@ class TestBaseProperty(unittest.TestCase):
         i = Integer([3, 4])
         self.assertEqual([3, 4], i.values)
 
+    def test_default_fields_not_stored(self):
+        s = String("test")
+        self.assertEqual(None, s.condition)
+        self.assertEqual(None, s.observed_encoding)
+        self.assertEqual(True, s.is_case_sensitive)
+        self.assertEqual(DEFAULT_DELIM, s.delimiter)
+        self.assertFalse('condition' in vars(s))
+
+        s2 = String.from_dict({'value': "test", 'condition': "Equals"})
+        self.assertEqual("Equals", s2.condition)
+        self.assertEqual(None, s2.bit_mask)
+        self.assertFalse('bit_mask' in vars(s2))
+
+        s3 = cybox.test.round_trip(s2)
+        self.assertEqual("Equals", s3.condition)
+        self.assertFalse('bit_mask' in vars(s3))
+
+    def test_pickle(self):
+        s = String(["a", "b"])
+        s.condition = "Equals"
+        s.apply_condition = "ALL"
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            s2 = pickle.loads(pickle.dumps(s, protocol))
+            self.assertEqual(s, s2)
+            self.assertEqual("ALL", s2.apply_condition)
+
 
 class TestEmptyNumerics(unittest.TestCase):
 
@@ -7,8 +7,9 @@ from mixbox import entities
 from mixbox.vendor.six import u
 
 from cybox.bindings import cybox_common as common_binding
-from cybox.common import HashName, VocabString, vocabs
-from cybox.common.vocabs import HashName as HashNameVocab
+from cybox.common import Hash, HashName, VocabString, vocabs
+from cybox.common.vocabs import HashName as HashNameVocab, ObjectRelationship
+from cybox.core import RelatedObject
 
 import cybox.test
 
@@ -149,5 +150,88 @@ class HashNameTests(unittest.TestCase):
         self.assertEqual(8, len(HashNameVocab._ALLOWED_VALUES))
 
 
+class TestVocabInterning(unittest.TestCase):
+
+    def setUp(self):
+        self.was_enabled = vocabs.set_vocab_interning(True)
+
+    def tearDown(self):
+        vocabs.set_vocab_interning(self.was_enabled)
+
+    def _hash(self, value="MD5"):
+        return Hash.from_dict({'type': {'value': value,
+                                        'xsi:type': HashNameVocab._XSI_TYPE},
+                               'simple_hash_value': "abc"})
+
+    def test_shared_from_dict(self):
+        h1, h2 = self._hash(), self._hash()
+        shared = h1._fields[Hash.type_]
+        self.assertTrue(shared._shared)
+        self.assertTrue(shared is h2._fields[Hash.type_])
+        self.assertFalse(shared is self._hash("SHA1")._fields[Hash.type_])
+
+    def test_shared_from_obj(self):
+        h1 = self._hash()
+        h2 = Hash.from_obj(h1.to_obj())
+        h3 = Hash.from_obj(h1.to_obj())
+        self.assertTrue(h2._fields[Hash.type_] is h3._fields[Hash.type_])
+
+    def test_shared_from_string(self):
+        mh1, mh2 = MultipleHash(), MultipleHash()
+        mh1.type_ = [HashNameVocab.TERM_MD5]
+        mh2.type_ = HashNameVocab.TERM_MD5
+        self.assertTrue(mh1._fields[MultipleHash.type_][0] is
+                        mh2._fields[MultipleHash.type_][0])
+
+    def test_shared_on_read(self):
+        h1, h2 = self._hash(), self._hash()
+        self.assertTrue(h1.type_ is h2.type_)
+        self.assertTrue(h1.type_._shared)
+        self.assertEqual("MD5", h1.type_.value)
+
+    def test_immutable(self):
+        h1, h2 = self._hash(), self._hash()
+        t1 = h1.type_
+        self.assertRaises(AttributeError, setattr, t1, 'condition', "Equals")
+        self.assertRaises(AttributeError, setattr, t1, 'value', "SHA1")
+        self.assertEqual(None, h2.type_.condition)
+        self.assertEqual("MD5", h2.type_.value)
+
+    def test_replace(self):
+        h1, h2 = self._hash(), self._hash()
+        h1.type_ = HashNameVocab("MD5")
+        h1.type_.condition = "Equals"
+
+        self.assertEqual("Equals", h1.type_.condition)
+        self.assertEqual(None, h2.type_.condition)
+        self.assertEqual(None, self._hash().type_.condition)
+
+    def test_relationship(self):
+        relationship = {'value': "Contains",
+                        'xsi:type': ObjectRelationship._XSI_TYPE}
+        r1 = RelatedObject.from_dict({'relationship': relationship})
+        r2 = RelatedObject.from_dict({'relationship': relationship})
+        self.assertTrue(r1.relationship is r2.relationship)
+        self.assertRaises(AttributeError, setattr, r1.relationship,
+                          'condition', "Equals")
+
+    def test_not_plain(self):
+        h1 = Hash.from_dict({'type': {'value': "MD5", 'condition': "Equals"}})
+        h2 = Hash.from_dict({'type': {'value': "MD5", 'condition': "Equals"}})
+        self.assertFalse(h1._fields[Hash.type_] is h2._fields[Hash.type_])
+
+    def test_unregistered(self):
+        v1 = VocabString.from_dict({'value': "foo", 'xsi:type': "x:Unknown"})
+        self.assertFalse(v1._shared)
+
+    def test_round_trip(self):
+        h = self._hash()
+        self.assertEqual(h.to_dict(), cybox.test.round_trip(h).to_dict())
+
+    def test_disabled(self):
+        vocabs.set_vocab_interning(False)
+        self.assertFalse(self._hash()._fields[Hash.type_]._shared)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import importlib
+import inspect
+import pkgutil
+import unittest
+
+from mixbox.vendor.six import BytesIO
+from mixbox.xml import get_etree_root
+
+import cybox.bindings.cybox_core as core_binding
+from cybox.common import ObjectProperties
+from cybox.core import Object, Observable, Observables, builder
+from cybox.objects.address_object import Address
+from cybox.test import EntityTestCase
+import cybox.test.objects
+
+
+def _object_fixtures():
+    """Yield an Observable for each ObjectProperties test fixture."""
+    for _, name, _ in pkgutil.iter_modules(cybox.test.objects.__path__):
+        module = importlib.import_module("cybox.test.objects." + name)
+        for _, klass in inspect.getmembers(module, inspect.isclass):
+            if not issubclass(klass, EntityTestCase):
+                continue
+            entity_class = getattr(klass, "klass", None)
+            if not (entity_class and issubclass(entity_class, ObjectProperties)):
+                continue
+            yield klass.__name__, Observable(entity_class.from_dict(klass._full_dict))
+
+
+def _binding_parse(xml):
+    return Observables.from_obj(core_binding.parse(BytesIO(xml)))
+
+
+class TestBuilder(unittest.TestCase):
+
+    def test_object_fixtures(self):
+        count = 0
+        for name, observable in _object_fixtures():
+            count += 1
+            xml = Observables([observable]).to_xml()
+            expected = _binding_parse(xml)
+
+            # Build twice, since child binding classes are learned the
+            # first time an element is seen.
+            for _ in range(2):
+                actual = builder.parse(BytesIO(xml))
+                self.assertEqual(expected.to_dict(), actual.to_dict(), name)
+                self.assertEqual(expected.to_xml(), actual.to_xml(), name)
+
+        self.assertTrue(count > 0)
+
+    def test_related_objects(self):
+        a = Address("10.0.0.1", Address.CAT_IPV4)
+        b = Address("10.0.0.2", Address.CAT_IPV4)
+        a.add_related(b, "Connected_To", inline=True)
+        o = Observable(a)
+        xml = Observables([o]).to_xml()
+
+        for _ in range(2):
+            actual = builder.parse(BytesIO(xml))
+            self.assertEqual(_binding_parse(xml).to_dict(), actual.to_dict())
+
+        related = actual[0].object_.related_objects[0]
+        self.assertEqual("10.0.0.2", related.properties.address_value.value)
+        self.assertEqual("Connected_To", related.relationship.value)
+
+    def test_build_element(self):
+        o = Object(Address("10.0.0.1", Address.CAT_IPV4))
+        root = get_etree_root(BytesIO(o.to_xml()))
+        actual = builder.build(root, Object)
+        self.assertEqual(o.to_dict(), actual.to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import unittest
+
+from mixbox.vendor.six import BytesIO
+
+from cybox.common import MeasureSource
+from cybox.core import (Object, Observable, ObservableComposition,
+        ObservableDeduplicator, Observables)
+from cybox.objects.address_object import Address
+from cybox.objects.file_object import File
+
+
+def _file(name):
+    f = File()
+    f.file_name = name
+    return f
+
+
+def _source(name):
+    source = MeasureSource()
+    source.name = name
+    return source
+
+
+class TestObservablesDedupe(unittest.TestCase):
+
+    def test_dedupe(self):
+        first = Observable(_file("foo.exe"))
+        observables = Observables([
+            first,
+            Observable(_file("bar.exe")),
+            Observable(_file("foo.exe")),
+            Observable(_file("foo.exe")),
+        ])
+
+        replaced = observables.dedupe()
+
+        self.assertEqual(2, len(observables))
+        self.assertTrue(observables[0] is first)
+        self.assertEqual(3, first.sighting_count)
+        self.assertEqual(None, observables[1].sighting_count)
+        # Two Observables and their two Objects.
+        self.assertEqual(4, len(replaced))
+        self.assertEqual(set([first.id_, first.object_.id_]),
+                         set(replaced.values()))
+
+    def test_sighting_count(self):
+        a = Observable(_file("foo.exe"))
+        a.sighting_count = 5
+        b = Observable(_file("foo.exe"))
+        c = Observable(_file("foo.exe"))
+        c.sighting_count = 10
+        observables = Observables([a, b, c])
+
+        observables.dedupe()
+        self.assertEqual(1, len(observables))
+        self.assertEqual(16, a.sighting_count)
+
+    def test_zero_sighting_count(self):
+        a = Observable(_file("foo.exe"))
+        a.sighting_count = 0
+        b = Observable(_file("foo.exe"))
+        c = Observable(_file("foo.exe"))
+        c.sighting_count = 0
+        observables = Observables([a, b, c])
+
+        observables.dedupe()
+        self.assertEqual(1, a.sighting_count)
+
+    def test_observable_source(self):
+        a = Observable(_file("foo.exe"))
+        a.observable_source = [_source("Sensor A")]
+        b = Observable(_file("foo.exe"))
+        b.observable_source = [_source("Sensor A"), _source("Sensor B")]
+        observables = Observables([a, b])
+
+        observables.dedupe()
+        self.assertEqual(1, len(observables))
+        self.assertEqual(["Sensor A", "Sensor B"],
+                         [x.name for x in a.observable_source])
+
+    def test_idrefs(self):
+        kept = Observable(_file("foo.exe"))
+        duplicate = Observable(_file("foo.exe"))
+
+        # A composition referring to the duplicate, before and after it.
+        before = Observable(ObservableComposition(
+            operator=ObservableComposition.OPERATOR_OR,
+            observables=[Observable(idref=duplicate.id_),
+                         Observable(Address("10.0.0.1"))]
+        ))
+        after = Observable(ObservableComposition(
+            operator=ObservableComposition.OPERATOR_AND,
+            observables=[Observable(idref=duplicate.id_),
+                         Observable(Address("10.0.0.2"))]
+        ))
+
+        dropper = _file("dropper.exe")
+        dropper.add_related(duplicate.object_.properties, "Created",
+                            inline=False)
+
+        observables = Observables([kept, before, duplicate, after,
+                                   Observable(dropper)])
+        observables.dedupe()
+
+        self.assertEqual(4, len(observables))
+        composed = [before.observable_composition.observables[0],
+                    after.observable_composition.observables[0]]
+        self.assertEqual([kept.id_, kept.id_], [x.idref for x in composed])
+        related = observables[3].object_.related_objects[0]
+        self.assertEqual(kept.object_.id_, related.idref)
+
+
+class TestObservableDeduplicator(unittest.TestCase):
+
+    def test_stream(self):
+        observables = Observables([Observable(_file("foo.exe")),
+                                   Observable(_file("bar.exe")),
+                                   Observable(_file("foo.exe"))])
+        xml = observables.to_xml()
+
+        deduper = ObservableDeduplicator()
+        for obs in Observables.iterparse(BytesIO(xml)):
+            deduper.add(obs)
+
+        self.assertEqual(2, len(deduper))
+        self.assertEqual(1, deduper.duplicates)
+        self.assertEqual(["foo.exe", "bar.exe"],
+                         [x.object_.properties.file_name.value
+                          for x in deduper])
+        self.assertEqual([2, None], [x.sighting_count for x in deduper])
+
+    def test_add_returns_kept(self):
+        deduper = ObservableDeduplicator()
+        a = Observable(_file("foo.exe"))
+        b = Observable(_file("foo.exe"))
+        self.assertTrue(deduper.add(a) is a)
+        self.assertTrue(deduper.add(b) is a)
+        self.assertEqual(a.id_, deduper.replaced[b.id_])
+
+    def test_object_observables(self):
+        deduper = ObservableDeduplicator()
+        deduper.add(Observable(Object(_file("foo.exe"))))
+        deduper.add(Observable(Object(_file("foo.exe"))))
+        deduper.add(Observable(Address("10.0.0.1")))
+        self.assertEqual(2, len(deduper.observables))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,7 @@
 import logging
 import unittest
 
+from mixbox import idgen
 from mixbox.vendor.six import u
 
 from cybox.common import MeasureSource, ObjectProperties, String, StructuredText
@@ -163,6 +164,40 @@ class TestObservable(EntityTestCase, unittest.TestCase):
         self.assertTrue(o.idref is not None)
         self.assertTrue(o.id_ is None)
 
+    def test_from_dict_id_idref(self):
+        o = Observable.from_dict({'id': "example:Observable-1"})
+        self.assertEqual("example:Observable-1", o.id_)
+        self.assertEqual(None, o.idref)
+
+        # As with the setters, an idref unsets the id.
+        o = Observable.from_dict({'id': "example:Observable-1",
+                                  'idref': "example:Observable-2"})
+        self.assertEqual(None, o.id_)
+        self.assertEqual("example:Observable-2", o.idref)
+
+    def test_parse_does_not_create_ids(self):
+        a = Address("10.0.0.1", Address.CAT_IPV4)
+        a.add_related(Address("10.0.0.2", Address.CAT_IPV4), "Connected_To")
+        o = Observable(a)
+        o_dict = o.to_dict()
+        o_obj = o.to_obj()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("An id was generated")
+
+        create_id = idgen.create_id
+        idgen.create_id = fail
+        try:
+            from_dict = Observable.from_dict(o_dict)
+            from_obj = Observable.from_obj(o_obj)
+        finally:
+            idgen.create_id = create_id
+
+        self.assertEqual(o_dict, from_dict.to_dict())
+        self.assertEqual(o_dict, from_obj.to_dict())
+        self.assertTrue(from_obj.object_.properties.parent is
+                        from_obj.object_)
+
 
     # https://github.com/CybOXProject/python-cybox/issues/239
     def test_observable_init(self):
@@ -0,0 +1,77 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import importlib
+import inspect
+import pkgutil
+import unittest
+
+from mixbox.vendor import six
+
+from cybox.core import Object, Observable, Observables, serializer
+from cybox.objects.address_object import Address
+from cybox.test import EntityTestCase
+import cybox.test
+import cybox.test.common
+import cybox.test.core
+import cybox.test.objects
+
+
+def _fixtures():
+    """Yield an entity for each EntityTestCase fixture in the test suite."""
+    packages = [cybox.test, cybox.test.common, cybox.test.core,
+                cybox.test.objects]
+    for package in packages:
+        for _, name, ispkg in pkgutil.iter_modules(package.__path__):
+            if ispkg:
+                continue
+            module = importlib.import_module(package.__name__ + "." + name)
+            for _, klass in inspect.getmembers(module, inspect.isclass):
+                if not issubclass(klass, EntityTestCase):
+                    continue
+                if not getattr(klass, "klass", None):
+                    continue
+                yield klass.__name__, klass.klass.from_dict(klass._full_dict)
+
+
+class TestSerializer(unittest.TestCase):
+
+    def test_fixtures(self):
+        count = 0
+        for name, entity in _fixtures():
+            count += 1
+            self.assertEqual(entity.to_xml(), serializer.to_xml(entity), name)
+            self.assertEqual(entity.to_xml(pretty=False),
+                             serializer.to_xml(entity, pretty=False), name)
+
+        self.assertTrue(count > 0)
+
+    def test_get_namespaces(self):
+        for name, entity in _fixtures():
+            self.assertEqual(entity._get_namespaces(),
+                             serializer.get_namespaces(entity), name)
+
+    def test_observables(self):
+        a = Address("10.0.0.1", Address.CAT_IPV4)
+        a.add_related(Address("10.0.0.2", Address.CAT_IPV4), "Connected_To",
+                      inline=True)
+        obs = Observables([Observable(a), Observable(Object())])
+
+        self.assertEqual(obs.to_xml(), serializer.to_xml(obs))
+        self.assertEqual(obs.to_xml(encoding=None),
+                         serializer.to_xml(obs, encoding=None))
+
+    def test_export(self):
+        a = Address("10.0.0.1", Address.CAT_IPV4)
+
+        expected = six.StringIO()
+        a.to_obj().export(expected.write, 2, "cybox:", name_="Properties")
+
+        actual = six.StringIO()
+        serializer.export(a, actual.write, 2, "cybox:", name_="Properties")
+
+        self.assertEqual(expected.getvalue(), actual.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
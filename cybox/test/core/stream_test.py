@@ -0,0 +1,184 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import unittest
+
+from mixbox.vendor.six import BytesIO
+
+import cybox.utils
+from cybox.common import MeasureSource
+from cybox.core import (Object, Observable, ObservableComposition,
+        Observables, ObservablesReader, ObservablesWriter)
+from cybox.objects.address_object import Address
+from cybox.objects.file_object import File
+
+
+def _make_observables():
+    f = File()
+    f.file_name = "example.txt"
+    obs = Observables([
+        Observable(f),
+        Observable(Address("10.0.0.1", Address.CAT_IPV4)),
+        Observable(ObservableComposition(
+            operator=ObservableComposition.OPERATOR_OR,
+            observables=[Observable(Address("10.0.0.2", Address.CAT_IPV4)),
+                         Observable(Address("10.0.0.3", Address.CAT_IPV4))]
+        )),
+    ])
+    source = MeasureSource()
+    source.name = "ExampleSensor"
+    obs.observable_package_source = source
+    return obs
+
+
+class TestObservablesReader(unittest.TestCase):
+
+    def setUp(self):
+        self.observables = _make_observables()
+        self.xml = self.observables.to_xml()
+
+    def test_iterparse(self):
+        reader = Observables.iterparse(BytesIO(self.xml))
+        self.assertTrue(isinstance(reader, ObservablesReader))
+
+        parsed = list(reader)
+        expected = [o.to_dict() for o in self.observables]
+        self.assertEqual(expected, [o.to_dict() for o in parsed])
+
+    def test_nested_observables_not_yielded(self):
+        parsed = list(Observables.iterparse(BytesIO(self.xml)))
+        self.assertEqual(3, len(parsed))
+        composition = parsed[2].observable_composition
+        self.assertEqual(2, len(composition.observables))
+
+    def test_package_source(self):
+        reader = Observables.iterparse(BytesIO(self.xml))
+        self.assertEqual(None, reader.observable_package_source)
+
+        first = next(iter(reader))
+        self.assertTrue(isinstance(first, Observable))
+        self.assertEqual("ExampleSensor",
+                         reader.observable_package_source.name)
+
+    def test_versions(self):
+        reader = Observables.iterparse(BytesIO(self.xml))
+        list(reader)
+        self.assertEqual("2", reader.major_version)
+        self.assertEqual("1", reader.minor_version)
+        self.assertEqual("0", reader.update_version)
+
+    def test_cache(self):
+        observables = Observables([Observable(Address("10.0.0.%d" % i))
+                                   for i in range(30)])
+        xml = observables.to_xml()
+
+        cybox.utils.cache_clear()
+        reader = ObservablesReader(BytesIO(xml),
+                                   cache=cybox.utils.LRUCache(max_items=10))
+        parsed = list(reader)
+
+        self.assertEqual(30, len(parsed))
+        self.assertEqual(0, cybox.utils.cache_count())
+        self.assertEqual(10, reader.cache.count())
+
+        # Recent Objects can still be looked up through the reader's cache.
+        with cybox.utils.cache_scope(reader.cache):
+            last = parsed[-1].object_
+            self.assertTrue(cybox.utils.cache_get(last.id_) is last)
+
+    def test_matches_full_parse(self):
+        full = Observables.from_obj(
+            Observables._binding.parse(BytesIO(self.xml)))
+        streamed = list(Observables.iterparse(BytesIO(self.xml)))
+        self.assertEqual([o.to_dict() for o in full],
+                         [o.to_dict() for o in streamed])
+
+
+class TestObservablesWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.observables = _make_observables()
+
+    def _write(self, **kwargs):
+        out = BytesIO()
+        writer = ObservablesWriter(
+            out,
+            observable_package_source=self.observables.observable_package_source,
+            **kwargs
+        )
+        with writer:
+            for o in self.observables:
+                writer.add(o)
+        self.assertEqual(len(self.observables), writer.count)
+        return out.getvalue()
+
+    def test_matches_to_xml(self):
+        namespaces = self.observables._get_namespaces()
+        xml = self._write(namespaces=namespaces)
+        self.assertEqual(self.observables.to_xml(), xml.strip())
+
+    def test_matches_to_xml_compact(self):
+        namespaces = self.observables._get_namespaces()
+        xml = self._write(namespaces=namespaces, pretty=False)
+        self.assertEqual(self.observables.to_xml(pretty=False), xml)
+
+    def test_default_namespaces(self):
+        xml = self._write()
+        self.assertTrue(b'xmlns:WinRegistryKeyObj=' in xml)
+
+        parsed = list(Observables.iterparse(BytesIO(xml)))
+        expected = [o.to_dict() for o in self.observables]
+        self.assertEqual(expected, [o.to_dict() for o in parsed])
+
+    def test_namespace_uris(self):
+        out = BytesIO()
+        writer = ObservablesWriter(
+            out,
+            namespaces=['http://cybox.mitre.org/objects#AddressObject-2',
+                        'http://cybox.mitre.org/common-2']
+        )
+        with writer:
+            writer.add(Address("10.0.0.1", Address.CAT_IPV4))
+        xml = out.getvalue()
+
+        self.assertTrue(b'xmlns:AddressObj=' in xml)
+        self.assertTrue(b'xmlns:WinRegistryKeyObj=' not in xml)
+        self.assertEqual(1, len(list(Observables.iterparse(BytesIO(xml)))))
+
+    def test_undeclared_namespace(self):
+        writer = ObservablesWriter(
+            BytesIO(),
+            namespaces=['http://cybox.mitre.org/objects#AddressObject-2']
+        )
+        with writer:
+            self.assertRaises(ValueError, writer.add, File())
+
+    def test_exception_leaves_document_open(self):
+        out = BytesIO()
+        try:
+            with ObservablesWriter(out) as writer:
+                writer.add(Address("10.0.0.1", Address.CAT_IPV4))
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+
+        self.assertTrue(b'</cybox:Observables>' not in out.getvalue())
+        self.assertRaises(ValueError, writer.add, Observable())
+
+    def test_add_object_properties(self):
+        out = BytesIO()
+        with ObservablesWriter(out) as writer:
+            writer.add(Address("10.0.0.1", Address.CAT_IPV4))
+
+        parsed = list(Observables.iterparse(BytesIO(out.getvalue())))
+        self.assertEqual(1, len(parsed))
+        self.assertEqual("10.0.0.1",
+                         parsed[0].object_.properties.address_value.value)
+
+    def test_not_open(self):
+        writer = ObservablesWriter(BytesIO())
+        self.assertRaises(ValueError, writer.add, Observable())
+
+
+if __name__ == "__main__":
+    unittest.main()
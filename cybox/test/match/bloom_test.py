@@ -0,0 +1,126 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mixbox.vendor.six import BytesIO
+
+from cybox.core import Observable, ObservableComposition
+from cybox.match import BloomFilter
+from cybox.match.bloom import indicator_keys
+from cybox.objects.address_object import Address
+from cybox.objects.domain_name_object import DomainName
+from cybox.objects.file_object import File
+from cybox.objects.uri_object import URI
+
+MD5 = "d41d8cd98f00b204e9800998ecf8427e"
+
+
+def _file(*hashes):
+    f = File()
+    for h in hashes:
+        f.add_hash(h)
+    return f
+
+
+def _domain(value):
+    d = DomainName()
+    d.value = value
+    return d
+
+
+class TestIndicatorKeys(unittest.TestCase):
+
+    def test_keys(self):
+        composition = ObservableComposition("OR", [
+            Observable(_file(MD5.upper())),
+            Observable(Address("10.0.0.1", Address.CAT_IPV4)),
+            Observable(URI("http://example.com/x")),
+            Observable(_domain("Example.COM.")),
+        ])
+        self.assertEqual(set([
+            u"hash:" + MD5,
+            u"address:10.0.0.1",
+            u"uri:http://example.com/x",
+            u"domain:example.com",
+        ]), set(indicator_keys(Observable(composition))))
+
+    def test_non_exact(self):
+        a = Address("10.", Address.CAT_IPV4)
+        a.address_value.condition = "StartsWith"
+        self.assertEqual([], list(indicator_keys(a)))
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.patterns = [Observable(_file(MD5)),
+                         Observable(Address("10.0.0.1", Address.CAT_IPV4))]
+        self.patterns.extend(Observable(_file("%032x" % n))
+                             for n in range(1000))
+        self.bloom = BloomFilter.from_patterns(self.patterns)
+
+    def test_sizing(self):
+        bloom = BloomFilter(1000, 0.01)
+        self.assertEqual(9586, bloom.bits)
+        self.assertEqual(7, bloom.hashes)
+        self.assertRaises(ValueError, BloomFilter, 0)
+        self.assertRaises(ValueError, BloomFilter, 10, 1.5)
+
+    def test_might_match(self):
+        self.assertEqual(1002, self.bloom.count)
+        self.assertTrue(self.bloom.might_match(_file("a" * 32, MD5)))
+        self.assertTrue(self.bloom.might_match(
+            Address("10.0.0.1", Address.CAT_IPV4)))
+        self.assertFalse(self.bloom.might_match(File()))
+
+    def test_false_positive_rate(self):
+        misses = ["%032x" % n for n in range(10000, 20000)]
+        false_positives = sum(1 for x in misses if u"hash:" + x in self.bloom)
+        self.assertTrue(false_positives < 300)
+
+    def _check_copy(self, copy):
+        self.assertEqual(self.bloom.bits, copy.bits)
+        self.assertEqual(self.bloom.hashes, copy.hashes)
+        self.assertEqual(self.bloom.count, copy.count)
+        for n in range(1000):
+            self.assertTrue(u"hash:%032x" % n in copy)
+
+    def test_write(self):
+        out = BytesIO()
+        self.bloom.write(out)
+        self.assertEqual(b'CYBF', out.getvalue()[:4])
+
+    def test_save_load(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tempdir, "filter.bloom")
+            self.bloom.save(path)
+
+            with BloomFilter.load(path) as mapped:
+                self._check_copy(mapped)
+                self.assertRaises(TypeError, mapped.add, u"x")
+
+            loaded = BloomFilter.load(path, use_mmap=False)
+            self._check_copy(loaded)
+            loaded.add(u"x")
+            self.assertTrue(u"x" in loaded)
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_load_invalid(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tempdir, "filter.bloom")
+            with open(path, 'wb') as f:
+                f.write(b'not a filter at all, but long enough')
+            self.assertRaises(ValueError, BloomFilter.load, path)
+        finally:
+            shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import array
+import unittest
+
+from cybox.core import Object, Observable
+from cybox.match import CIDRIndex
+from cybox.match.cidr import parse_network, pattern_networks
+from cybox.objects.address_object import Address
+
+
+def _address(value, category=Address.CAT_IPV4_NET, condition=None):
+    a = Address(value, category)
+    a.address_value.condition = condition
+    return a
+
+
+class TestParseNetwork(unittest.TestCase):
+
+    def test_ipv4(self):
+        self.assertEqual((4, 0x0A010203, 32), parse_network("10.1.2.3"))
+        self.assertEqual((4, 0x0A000000, 8), parse_network("10.1.2.3/8"))
+
+    def test_ipv6(self):
+        self.assertEqual((6, 1, 128), parse_network("::1"))
+        self.assertEqual((6, 0x20010db8 << 96, 32),
+                         parse_network("2001:db8::1/32"))
+        self.assertEqual((6, 0, 128), parse_network("::"))
+        self.assertEqual((6, 1 << 112, 128), parse_network("1::"))
+        self.assertEqual((6, 0x00010002000300040005000600070008, 128),
+                         parse_network("1:2:3:4:5:6:7:8"))
+        self.assertEqual((6, 0xFFFF0A000001, 128),
+                         parse_network("::FFFF:10.0.0.1"))
+
+    def test_invalid(self):
+        for value in ("10.1.2", "10.1.2.256", "10.0.0.0/33", "example.com",
+                      "::1/129", "10.0.0.0/x", "1:2:3:4:5:6:7", "1::2::3",
+                      "1:2:3:4:5:6:7:8:9", "12345::", "g::", ":1::",
+                      "::10.0.0.256"):
+            self.assertRaises(ValueError, parse_network, value)
+
+
+class TestPatternNetworks(unittest.TestCase):
+
+    def test_equals(self):
+        networks = pattern_networks(Observable(_address("10.0.0.0/8")))
+        self.assertEqual([(4, 0x0A000000, 8)], networks)
+
+        pattern = _address(["10.0.0.1", "::1"], Address.CAT_IPV4, "Equals")
+        self.assertEqual([(4, 0x0A000001, 32), (6, 1, 128)],
+                         pattern_networks(pattern))
+
+    def test_range(self):
+        pattern = _address(["10.0.0.1", "10.0.0.10"], Address.CAT_IPV4,
+                           "InclusiveBetween")
+        self.assertEqual([(4, 0x0A000001, 32), (4, 0x0A000002, 31),
+                          (4, 0x0A000004, 30), (4, 0x0A000008, 31),
+                          (4, 0x0A00000A, 32)],
+                         pattern_networks(pattern))
+
+    def test_unsupported(self):
+        self.assertRaises(ValueError, pattern_networks,
+                          _address("10.", Address.CAT_IPV4, "StartsWith"))
+        self.assertRaises(ValueError, pattern_networks,
+                          Address("a@example.com", Address.CAT_EMAIL))
+        self.assertRaises(ValueError, pattern_networks,
+                          _address(["10.0.0.1", "::1"], Address.CAT_IPV4,
+                                   "InclusiveBetween"))
+
+
+class TestCIDRIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CIDRIndex()
+        self.index.add(_address("10.0.0.0/8"), id_="ten")
+        self.index.add(_address("10.1.0.0/16"), id_="ten-one")
+        self.index.add(_address("10.1.2.3", Address.CAT_IPV4), id_="host")
+        self.index.add(_address("2001:db8::/32", Address.CAT_IPV6_NET),
+                       id_="doc")
+
+    def test_matches(self):
+        self.assertEqual(["ten", "ten-one", "host"],
+                         self.index.matches("10.1.2.3"))
+        self.assertEqual(["ten"], self.index.matches("10.2.0.1"))
+        self.assertEqual([], self.index.matches("192.168.0.1"))
+        self.assertEqual(["doc"], self.index.matches("2001:db8::5"))
+
+    def test_matches_block(self):
+        self.assertEqual(["ten", "ten-one"],
+                         self.index.matches("10.1.0.0/24"))
+        self.assertEqual([], self.index.matches("10.0.0.0/7"))
+
+    def test_longest_match(self):
+        self.assertEqual(["host"], self.index.longest_match("10.1.2.3"))
+        self.assertEqual(["ten-one"], self.index.longest_match(
+            Address("10.1.9.9", Address.CAT_IPV4)))
+        self.assertEqual([], self.index.longest_match("::1"))
+
+    def test_shared_network(self):
+        self.index.add(_address("10.0.0.0/8"), id_="ten-again")
+        self.assertEqual(["ten", "ten-again"],
+                         self.index.longest_match("10.200.0.1"))
+
+    def test_default_id(self):
+        pattern = Observable(_address("172.16.0.0/12"))
+        self.assertEqual(pattern.id_, self.index.add(pattern))
+        self.assertTrue(pattern.id_ in self.index)
+        self.assertRaises(ValueError, self.index.add, pattern)
+
+    def test_object_id(self):
+        obj = Object(_address("172.16.0.0/12"))
+        self.assertEqual(obj.id_, self.index.add(obj))
+
+        address = _address("192.168.0.0/16")
+        obj = Object(address)
+        self.assertEqual(obj.id_, self.index.add(address))
+
+    def test_no_id(self):
+        self.assertRaises(ValueError, self.index.add,
+                          _address("172.16.0.0/12"))
+        self.assertEqual(4, len(self.index))
+
+    def test_remove(self):
+        self.index.remove("ten-one")
+        self.index.remove("host")
+        self.assertEqual(["ten"], self.index.matches("10.1.2.3"))
+        self.assertEqual(2, len(self.index))
+
+        self.index.remove("ten")
+        self.assertEqual([None, None, None], self.index._roots[4])
+        self.assertRaises(KeyError, self.index.remove, "ten")
+
+    def test_lookup_many(self):
+        addresses = ["10.1.2.3", "bogus", "192.168.1.1", "10.1.2.3",
+                     Address("10.9.9.9", Address.CAT_IPV4)]
+        self.assertEqual([["host"], [], [], ["host"], ["ten"]],
+                         self.index.lookup_many(addresses, longest=True))
+
+        first, _, _, repeated, _ = self.index.lookup_many(addresses)
+        self.assertEqual(first, repeated)
+        self.assertFalse(first is repeated)
+
+        packed = array.array('L', [0x0A010203, 0x0A020000, 0xC0A80101])
+        self.assertEqual([["ten", "ten-one", "host"], ["ten"], []],
+                         self.index.lookup_many(packed))
+
+        self.assertEqual([["doc"]],
+                         self.index.lookup_many([0x20010db8 << 96], version=6))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import datetime
+import unittest
+
+from cybox.common import DateTime, HashName, HexBinary, Integer, String
+from cybox.match.conditions import compile_condition, condition_cost
+
+
+def _pattern(klass, value, condition=None, **kwargs):
+    prop = klass(value)
+    prop.condition = condition
+    for name, val in kwargs.items():
+        setattr(prop, name, val)
+    return compile_condition(prop)
+
+
+class TestStringConditions(unittest.TestCase):
+
+    def test_equals(self):
+        test = _pattern(String, "abc", "Equals")
+        self.assertTrue(test("abc"))
+        self.assertFalse(test("ABC"))
+        self.assertFalse(test("abcd"))
+
+    def test_no_condition_is_equals(self):
+        test = _pattern(String, "abc")
+        self.assertTrue(test("abc"))
+        self.assertFalse(test("abd"))
+
+    def test_does_not_equal(self):
+        test = _pattern(String, "abc", "DoesNotEqual")
+        self.assertFalse(test("abc"))
+        self.assertTrue(test("abd"))
+
+    def test_contains(self):
+        test = _pattern(String, "evil", "Contains")
+        self.assertTrue(test("very evil.exe"))
+        self.assertFalse(test("very EVIL.exe"))
+
+        test = _pattern(String, "evil", "DoesNotContain")
+        self.assertFalse(test("very evil.exe"))
+        self.assertTrue(test("good.exe"))
+
+    def test_starts_ends_with(self):
+        starts = _pattern(String, "C:\\Windows", "StartsWith")
+        ends = _pattern(String, ".exe", "EndsWith")
+        self.assertTrue(starts("C:\\Windows\\a.exe"))
+        self.assertFalse(starts("D:\\Windows\\a.exe"))
+        self.assertTrue(ends("C:\\Windows\\a.exe"))
+        self.assertFalse(ends("C:\\Windows\\a.dll"))
+
+    def test_case_insensitive(self):
+        test = _pattern(String, "Evil", "Contains", is_case_sensitive=False)
+        self.assertTrue(test("VERY EVIL"))
+
+        test = _pattern(String, "Evil", "Equals", is_case_sensitive=False)
+        self.assertTrue(test("eViL"))
+        self.assertFalse(test("eViLs"))
+
+    def test_fits_pattern(self):
+        test = _pattern(String, r"^[a-f0-9]{4}\.(exe|dll)$", "FitsPattern")
+        self.assertTrue(test("12ab.dll"))
+        self.assertFalse(test("12AB.dll"))
+        self.assertFalse(test("12ab.txt"))
+
+        # Case insensitivity must not change the meaning of the regex.
+        test = _pattern(String, r"\D+\d", "FitsPattern",
+                        is_case_sensitive=False)
+        self.assertTrue(test("ABC1"))
+        self.assertFalse(test("123"))
+
+    def test_vocab_string(self):
+        test = _pattern(HashName, "MD5", "Equals")
+        self.assertTrue(test("MD5"))
+        self.assertFalse(test("SHA1"))
+
+    def test_unknown_condition(self):
+        self.assertRaises(ValueError, _pattern, String, "a", "Resembles")
+
+    def test_no_value(self):
+        self.assertRaises(ValueError, _pattern, String, None, "Equals")
+
+
+class TestListValues(unittest.TestCase):
+
+    def test_apply_any(self):
+        test = _pattern(String, ["a.exe", "b.exe"], "Equals")
+        self.assertTrue(test("b.exe"))
+        self.assertFalse(test("c.exe"))
+
+        test = _pattern(String, ["a", "b"], "Contains", apply_condition="ANY")
+        self.assertTrue(test("xbx"))
+        self.assertFalse(test("xcx"))
+
+    def test_apply_all(self):
+        test = _pattern(String, ["a", "b"], "Contains", apply_condition="ALL")
+        self.assertTrue(test("ab"))
+        self.assertFalse(test("a"))
+
+    def test_apply_none(self):
+        test = _pattern(String, ["a.exe", "b.exe"], "Equals",
+                        apply_condition="NONE")
+        self.assertFalse(test("a.exe"))
+        self.assertTrue(test("c.exe"))
+
+        test = _pattern(String, ["a"], "Contains", apply_condition="NONE")
+        self.assertFalse(test("cat"))
+        self.assertTrue(test("dog"))
+
+    def test_case_insensitive_set(self):
+        test = _pattern(String, ["A.EXE", "B.EXE"], "Equals",
+                        is_case_sensitive=False)
+        self.assertTrue(test("a.exe"))
+
+
+class TestOrderedConditions(unittest.TestCase):
+
+    def test_integer_comparisons(self):
+        self.assertTrue(_pattern(Integer, 10, "GreaterThan")(11))
+        self.assertFalse(_pattern(Integer, 10, "GreaterThan")(10))
+        self.assertTrue(_pattern(Integer, 10, "GreaterThanOrEqual")(10))
+        self.assertTrue(_pattern(Integer, 10, "LessThan")(9))
+        self.assertFalse(_pattern(Integer, 10, "LessThan")(10))
+        self.assertTrue(_pattern(Integer, 10, "LessThanOrEqual")(10))
+
+    def test_numeric_strings(self):
+        test = _pattern(Integer, 10, "GreaterThan")
+        self.assertTrue(test("11"))
+        self.assertFalse(test("nan-ish"))
+
+    def test_between(self):
+        inclusive = _pattern(Integer, [20, 10], "InclusiveBetween")
+        exclusive = _pattern(Integer, [10, 20], "ExclusiveBetween")
+        self.assertTrue(inclusive(10))
+        self.assertTrue(inclusive(20))
+        self.assertFalse(inclusive(21))
+        self.assertFalse(exclusive(10))
+        self.assertTrue(exclusive(15))
+
+    def test_between_needs_two_values(self):
+        self.assertRaises(ValueError, _pattern, Integer, [1, 2, 3],
+                          "InclusiveBetween")
+
+    def test_datetime(self):
+        test = _pattern(DateTime, "2015-01-01T00:00:00", "GreaterThan")
+        self.assertTrue(test(datetime.datetime(2015, 6, 1)))
+        self.assertFalse(test(datetime.datetime(2014, 6, 1)))
+        # Not comparable with a naive datetime.
+        self.assertFalse(test("yesterday"))
+
+    def test_ip_addresses(self):
+        test = _pattern(String, "10.0.0.9", "GreaterThan")
+        # As strings, "10.0.0.10" < "10.0.0.9".
+        self.assertTrue(test("10.0.0.10"))
+        self.assertFalse(test("10.0.0.9"))
+        self.assertFalse(test("9.0.0.0"))
+        self.assertFalse(test("not an address"))
+        self.assertFalse(test("ffff::1"))
+
+    def test_ip_address_range(self):
+        test = _pattern(String, ["10.0.0.2", "10.0.0.10"], "InclusiveBetween")
+        self.assertTrue(test("10.0.0.2"))
+        self.assertTrue(test("10.0.0.9"))
+        self.assertTrue(test("10.0.0.10"))
+        self.assertFalse(test("10.0.0.11"))
+        self.assertFalse(test("10.0.0.100"))
+
+        test = _pattern(String, ["2001:db8::2", "2001:db8::a"],
+                        "ExclusiveBetween")
+        self.assertTrue(test("2001:db8::9"))
+        self.assertFalse(test("2001:db8::a"))
+        self.assertFalse(test("10.0.0.5"))
+
+    def test_mixed_ip_versions(self):
+        self.assertRaises(ValueError, _pattern, String,
+                          ["10.0.0.1", "2001:db8::1"], "InclusiveBetween")
+
+
+class TestHexBinaryConditions(unittest.TestCase):
+
+    def test_equals(self):
+        test = _pattern(HexBinary, "0123456789ABCDEF", "Equals")
+        self.assertTrue(test("0123456789abcdef"))
+        self.assertTrue(test("0123456789ABCDEF"))
+        self.assertFalse(test("0123456789abcdee"))
+
+    def test_case_sensitive_ignored(self):
+        test = _pattern(HexBinary, ["abcdef", "012345"], "Equals",
+                        is_case_sensitive=True)
+        self.assertTrue(test("ABCDEF"))
+
+    def test_string_conditions(self):
+        self.assertTrue(_pattern(HexBinary, "CDEF", "EndsWith")("abcdef"))
+        self.assertTrue(_pattern(HexBinary, "bc", "Contains")("ABCD"))
+        self.assertTrue(_pattern(HexBinary, "^AB", "FitsPattern")("abcd"))
+
+
+class TestBitwiseConditions(unittest.TestCase):
+
+    def test_bitwise_and(self):
+        test = _pattern(Integer, 4, "BitwiseAnd")
+        self.assertTrue(test(5))
+        self.assertFalse(test(3))
+
+    def test_bitwise_and_mask(self):
+        test = _pattern(HexBinary, "0x04", "BitwiseAnd", bit_mask="0C")
+        self.assertTrue(test(0x05))
+        self.assertFalse(test(0x0C))
+
+    def test_bitwise_or_mask(self):
+        test = _pattern(Integer, 0x0F, "BitwiseOr", bit_mask="0x0C")
+        self.assertTrue(test(0x03))
+        self.assertFalse(test(0x01))
+
+    def test_non_integer(self):
+        self.assertFalse(_pattern(Integer, 4, "BitwiseAnd")("abc!"))
+        self.assertRaises(ValueError, _pattern, String, "xyz!", "BitwiseAnd")
+
+
+class TestConditionCost(unittest.TestCase):
+
+    def _cost(self, value, condition=None, **kwargs):
+        prop = String(value)
+        prop.condition = condition
+        for name, val in kwargs.items():
+            setattr(prop, name, val)
+        return condition_cost(prop)
+
+    def test_order(self):
+        costs = [self._cost("a", c) for c in
+                 ("Equals", "StartsWith", "Contains", "FitsPattern")]
+        self.assertEqual(sorted(costs), costs)
+        self.assertEqual(len(set(costs)), len(costs))
+        self.assertEqual(self._cost("a"), self._cost("a", "Equals"))
+
+    def test_list_values(self):
+        # Equals on a list is a set lookup.
+        self.assertEqual(self._cost("a"), self._cost(["a", "b", "c"]))
+        self.assertTrue(self._cost(["a", "b"], "Contains") >
+                        self._cost("a", "Contains"))
+
+    def test_apply_none(self):
+        negated = self._cost(["a", "b"], "Equals", apply_condition="NONE")
+        self.assertTrue(negated > self._cost(["a", "b"], "Equals"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import unittest
+
+from cybox.core import Observable
+from cybox.match import DomainIndex, split_url
+from cybox.match.domains import _url_cache, instance_host, pattern_domains
+from cybox.objects.domain_name_object import DomainName
+from cybox.objects.hostname_object import Hostname
+from cybox.objects.uri_object import URI
+
+
+def _domain(value, condition=None):
+    d = DomainName()
+    d.value = value
+    d.value.condition = condition
+    return d
+
+
+def _uri(value, type_=URI.TYPE_URL):
+    return URI(value, type_)
+
+
+class TestSplitURL(unittest.TestCase):
+
+    def test_parts(self):
+        parts = split_url("HTTP://user@WWW.Example.COM:8080/a/b?q=1#top")
+        self.assertEqual("http", parts.scheme)
+        self.assertEqual("www.example.com", parts.host)
+        self.assertEqual(8080, parts.port)
+        self.assertEqual("/a/b", parts.path)
+        self.assertEqual("q=1", parts.query)
+        self.assertEqual("top", parts.fragment)
+
+    def test_no_scheme(self):
+        parts = split_url("example.com/index.html")
+        self.assertEqual("example.com", parts.host)
+        self.assertEqual("/index.html", parts.path)
+
+    def test_cached(self):
+        url = "http://cached.example.com/"
+        first = split_url(url)
+        hits = _url_cache.hits
+        self.assertTrue(split_url(url) is first)
+        self.assertEqual(hits + 1, _url_cache.hits)
+
+
+class TestInstanceHost(unittest.TestCase):
+
+    def test_objects(self):
+        self.assertEqual("example.com",
+                         instance_host(_domain("Example.com.")))
+        h = Hostname()
+        h.hostname_value = "WWW.example.com"
+        self.assertEqual("www.example.com", instance_host(Observable(h)))
+        self.assertEqual("example.com",
+                         instance_host(_uri("http://example.com/x")))
+        self.assertEqual("example.com",
+                         instance_host(_uri("example.com", URI.TYPE_DOMAIN)))
+
+    def test_strings(self):
+        self.assertEqual("example.com", instance_host("EXAMPLE.com"))
+        self.assertEqual("example.com",
+                         instance_host("https://example.com/path"))
+        self.assertEqual(None, instance_host(""))
+        self.assertEqual(None, instance_host(42))
+
+
+class TestPatternDomains(unittest.TestCase):
+
+    def test_kinds(self):
+        self.assertEqual([(["com", "example"], "exact")],
+                         pattern_domains(_domain("example.com")))
+        self.assertEqual([(["com", "example"], "suffix")],
+                         pattern_domains(_domain("example.com", "EndsWith")))
+        self.assertEqual([(["com", "example"], "subdomains")],
+                         pattern_domains(_domain(".example.com", "EndsWith")))
+        self.assertEqual([(["com", "example"], "subdomains")],
+                         pattern_domains(_domain("*.example.com")))
+
+    def test_unsupported(self):
+        self.assertRaises(ValueError, pattern_domains,
+                          _domain("example", "Contains"))
+        self.assertRaises(ValueError, pattern_domains,
+                          _uri("http://example.com/"))
+
+
+class TestDomainIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = DomainIndex()
+        self.index.add(_domain("example.com", "EndsWith"), id_="suffix")
+        self.index.add(_domain("www.example.com"), id_="exact")
+        self.index.add(_domain("*.evil.net"), id_="sub")
+        h = Hostname()
+        h.hostname_value = "mail.example.com"
+        self.index.add(h, id_="host")
+
+    def test_matches(self):
+        self.assertEqual(["suffix"], self.index.matches("example.com"))
+        self.assertEqual(["suffix", "exact"],
+                         self.index.matches("WWW.example.com"))
+        self.assertEqual(["suffix"], self.index.matches("a.www.example.com"))
+        self.assertEqual(["suffix", "host"],
+                         self.index.matches("mail.example.com."))
+        self.assertEqual([], self.index.matches("badexample.com"))
+
+    def test_subdomains(self):
+        self.assertEqual([], self.index.matches("evil.net"))
+        self.assertEqual(["sub"], self.index.matches("x.evil.net"))
+        self.assertEqual(["sub"], self.index.matches("x.y.evil.net"))
+
+    def test_instances(self):
+        self.assertEqual(["suffix", "exact"], self.index.matches(
+            _uri("http://www.example.com/login.php")))
+        self.assertEqual(["sub"], self.index.matches(
+            Observable(_domain("a.evil.net"))))
+        self.assertEqual([], self.index.matches(_uri("urn:isbn:123",
+                                                     URI.TYPE_GENERAL)))
+
+    def test_list_value(self):
+        pattern = _domain(["a.org", "b.org"], "Equals")
+        id_ = self.index.add(Observable(pattern))
+        self.assertEqual([id_], self.index.matches("b.org"))
+        self.assertRaises(ValueError, self.index.add, pattern, id_)
+
+    def test_remove(self):
+        self.index.remove("exact")
+        self.assertEqual(["suffix"], self.index.matches("www.example.com"))
+
+        for id_ in ("suffix", "sub", "host"):
+            self.index.remove(id_)
+        self.assertEqual(0, len(self.index))
+        self.assertEqual([{}, None, None, None], self.index._root)
+        self.assertRaises(KeyError, self.index.remove, "sub")
+
+    def test_lookup_many(self):
+        results = self.index.lookup_many(
+            ["www.example.com", "http://www.example.com/", "other.org",
+             _domain("x.evil.net")])
+        self.assertEqual([["suffix", "exact"], ["suffix", "exact"], [],
+                          ["sub"]], results)
+
+        first, repeated = self.index.lookup_many(["www.example.com"] * 2)
+        self.assertEqual(first, repeated)
+        self.assertFalse(first is repeated)
+
+
+if __name__ == "__main__":
+    unittest.main()
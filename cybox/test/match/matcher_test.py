@@ -0,0 +1,260 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import unittest
+
+from cybox.core import (Action, Actions, AssociatedObject, AssociatedObjects,
+        Event, Object, Observable, ObservableComposition, Observables)
+from cybox.match import (PatternMatcher, compile_pattern, compile_patterns,
+        match_patterns)
+from cybox.match.matcher import _SharedNode
+from cybox.objects.address_object import Address
+from cybox.objects.file_object import File
+from cybox.objects.win_file_object import WinFile
+
+MD5 = "d41d8cd98f00b204e9800998ecf8427e"
+SHA1 = "da39a3ee5e6b4b0d3255bfef95601890afd80709"
+
+
+def _file(name=None, hashes=(), klass=File):
+    f = klass()
+    if name is not None:
+        f.file_name = name
+    for h in hashes:
+        f.add_hash(h)
+    return f
+
+
+def _address(value, condition=None):
+    a = Address(value, Address.CAT_IPV4)
+    a.address_value.condition = condition
+    return a
+
+
+class TestObjectPatterns(unittest.TestCase):
+
+    def test_fields(self):
+        pattern = _file("evil.exe")
+        pattern.file_name.condition = "EndsWith"
+        pattern.file_name.is_case_sensitive = False
+        matcher = compile_pattern(Observable(pattern))
+
+        self.assertTrue(isinstance(matcher, PatternMatcher))
+        self.assertTrue(matcher.match(Observable(_file("C:\\EVIL.EXE"))))
+        self.assertFalse(matcher.match(Observable(_file("good.exe"))))
+        # The field is not set on the instance.
+        self.assertFalse(matcher.match(Observable(_file(hashes=[MD5]))))
+
+    def test_object_type(self):
+        matcher = compile_pattern(_file("a.exe"))
+        self.assertTrue(matcher.match(_file("a.exe", klass=WinFile)))
+        self.assertFalse(matcher.match(_address("10.0.0.1")))
+
+        matcher = compile_pattern(_file("a.exe", klass=WinFile))
+        self.assertFalse(matcher.match(_file("a.exe")))
+
+    def test_plain_fields(self):
+        matcher = compile_pattern(_address("10.0.0.1"))
+        self.assertTrue(matcher.match(_address("10.0.0.1")))
+
+        other = Address("10.0.0.1", Address.CAT_IPV6)
+        self.assertFalse(matcher.match(other))
+
+    def test_hash_list(self):
+        matcher = compile_pattern(_file(hashes=[MD5]))
+        self.assertTrue(matcher.match(_file("x", hashes=[SHA1, MD5])))
+        self.assertFalse(matcher.match(_file("x", hashes=[SHA1])))
+
+        matcher = compile_pattern(_file(hashes=[MD5, SHA1]))
+        self.assertFalse(matcher.match(_file("x", hashes=[MD5])))
+        self.assertTrue(matcher.match(_file("x", hashes=[SHA1, MD5])))
+
+    def test_list_value(self):
+        pattern = _address(["10.0.0.1", "10.0.0.2"], "Equals")
+        matcher = compile_pattern(pattern)
+        self.assertTrue(matcher.match(_address("10.0.0.2")))
+        self.assertFalse(matcher.match(_address("10.0.0.3")))
+
+    def test_related_objects(self):
+        pattern = _file("a.exe")
+        pattern.parent.add_related(_address("10.0.0.1"), "Connected_To")
+        matcher = compile_pattern(pattern)
+
+        instance = _file("a.exe")
+        self.assertFalse(matcher.match(instance))
+
+        instance.parent.add_related(_address("10.0.0.2"), "Connected_To")
+        self.assertFalse(matcher.match(instance))
+
+        instance.parent.add_related(_address("10.0.0.1"), "Created")
+        self.assertFalse(matcher.match(instance))
+
+        instance.parent.add_related(_address("10.0.0.1"), "Connected_To")
+        self.assertTrue(matcher.match(instance))
+
+    def test_event(self):
+        def event(name):
+            action = Action()
+            action.name = "Create File"
+            action.associated_objects = AssociatedObjects(
+                [AssociatedObject(_file(name))])
+            e = Event()
+            e.actions = Actions([action])
+            return e
+
+        matcher = compile_pattern(event("a.exe"))
+        self.assertTrue(matcher.match(Observable(event("a.exe"))))
+        self.assertFalse(matcher.match(Observable(event("b.exe"))))
+
+    def test_empty_pattern(self):
+        self.assertRaises(ValueError, compile_pattern, Observable())
+        self.assertRaises(ValueError, compile_pattern, Object())
+
+
+class TestCompositionPatterns(unittest.TestCase):
+
+    def setUp(self):
+        self.children = [Observable(_file("a.exe")),
+                         Observable(_address("10.0.0.1"))]
+
+    def _matcher(self, operator):
+        composition = ObservableComposition(operator, self.children)
+        return compile_pattern(Observable(composition))
+
+    def test_or(self):
+        matcher = self._matcher("OR")
+        self.assertTrue(matcher.match(_file("a.exe")))
+        self.assertTrue(matcher.match(_address("10.0.0.1")))
+        self.assertFalse(matcher.match(_file("b.exe")))
+
+    def test_and(self):
+        matcher = self._matcher("AND")
+        self.assertFalse(matcher.match(_file("a.exe")))
+
+        instances = Observables([Observable(_file("a.exe")),
+                                 Observable(_address("10.0.0.1"))])
+        self.assertTrue(matcher.match(instances))
+
+        # An instance composition is flattened into its Observables.
+        composition = ObservableComposition("AND", list(instances))
+        self.assertTrue(matcher.match(Observable(composition)))
+
+    def test_nested(self):
+        inner = ObservableComposition("OR", [Observable(_file("b.exe")),
+                                             Observable(_file("c.exe"))])
+        composition = ObservableComposition(
+            "AND", [Observable(_address("10.0.0.1")), Observable(inner)])
+        matcher = compile_pattern(composition)
+
+        self.assertTrue(matcher.match([_address("10.0.0.1"), _file("c.exe")]))
+        self.assertFalse(matcher.match([_address("10.0.0.1"), _file("a.exe")]))
+
+    def test_idref(self):
+        target = Observable(_file("a.exe"))
+        composition = ObservableComposition(
+            "OR", [Observable(idref=target.id_)])
+
+        self.assertRaises(ValueError, compile_pattern, composition)
+
+        matcher = compile_pattern(composition, {target.id_: target}.get)
+        self.assertTrue(matcher.match(_file("a.exe")))
+
+    def test_idref_cycle(self):
+        a = Observable(ObservableComposition("OR", [Observable(_file("a.exe"))]))
+        b = Observable(ObservableComposition("OR", [Observable(idref=a.id_)]))
+        a.observable_composition.add(Observable(idref=b.id_))
+        resolve = {a.id_: a, b.id_: b}.get
+
+        self.assertRaises(ValueError, compile_pattern, a, resolve)
+        self.assertRaises(ValueError, compile_patterns, [a, b])
+
+        # The same Observable referred to twice is not a cycle.
+        target = Observable(_file("b.exe"))
+        composition = ObservableComposition(
+            "AND", [Observable(idref=target.id_), Observable(idref=target.id_)])
+        matcher = compile_pattern(composition, {target.id_: target}.get)
+        self.assertTrue(matcher.match(_file("b.exe")))
+
+    def test_filter(self):
+        matcher = compile_pattern(_file("a.exe"))
+        instances = [Observable(_file(x)) for x in ("a.exe", "b.exe", "a.exe")]
+        self.assertEqual([instances[0], instances[2]],
+                         list(matcher.filter(instances)))
+
+    def test_id(self):
+        pattern = Observable(_file("a.exe"))
+        self.assertEqual(pattern.id_, compile_pattern(pattern).id_)
+
+    def test_cost_order(self):
+        contains = _file("evil")
+        contains.file_name.condition = "Contains"
+        children = [Observable(contains), Observable(_file("a.exe"))]
+        matcher = compile_pattern(ObservableComposition("OR", children))
+
+        root = matcher._root
+        self.assertEqual(sorted(x.cost for x in root.children),
+                         [x.cost for x in root.children])
+        self.assertTrue(root.children[0].cost < root.children[1].cost)
+        self.assertTrue(matcher.match(_file("evil.exe")))
+        self.assertTrue(matcher.match(_file("a.exe")))
+
+
+class _CountingNode(object):
+
+    def __init__(self, node):
+        self.node = node
+        self.cost = node.cost
+        self.calls = 0
+
+    def match(self, observables, memo):
+        self.calls += 1
+        return self.node.match(observables, memo)
+
+
+class TestSharedPatterns(unittest.TestCase):
+
+    def setUp(self):
+        self.common = Observable(_file("a.exe"))
+        self.patterns = [
+            Observable(ObservableComposition(
+                "AND", [Observable(idref=self.common.id_),
+                        Observable(_address(x))]))
+            for x in ("10.0.0.1", "10.0.0.2")
+        ]
+
+    def _shared_node(self, matcher):
+        # The pattern itself has an id, so its root is shared too.
+        for child in matcher._root.node.children:
+            if isinstance(child, _SharedNode):
+                return child
+
+    def test_shared_node(self):
+        matchers = compile_patterns([self.common] + self.patterns)
+        shared = self._shared_node(matchers[1])
+        self.assertTrue(shared is not None)
+        self.assertTrue(shared is self._shared_node(matchers[2]))
+        self.assertTrue(shared is matchers[0]._root)
+
+    def test_evaluated_once(self):
+        matchers = compile_patterns(self.patterns,
+                                    {self.common.id_: self.common}.get)
+        shared = self._shared_node(matchers[0])
+        counter = shared.node = _CountingNode(shared.node)
+
+        instance = [_file("a.exe"), _address("10.0.0.2")]
+        self.assertEqual([matchers[1]], match_patterns(matchers, instance))
+        self.assertEqual(1, counter.calls)
+
+        # A new instance is evaluated again.
+        self.assertEqual([], match_patterns(matchers, _file("a.exe")))
+        self.assertEqual(2, counter.calls)
+
+    def test_match_patterns_ids(self):
+        matchers = compile_patterns([self.common] + self.patterns)
+        instance = [_file("a.exe"), _address("10.0.0.1")]
+        self.assertEqual([self.common.id_, self.patterns[0].id_],
+                         [x.id_ for x in match_patterns(matchers, instance)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import unittest
+
+from cybox.core import Observable, ObservableComposition
+from cybox.match import PatternIndex
+from cybox.objects.address_object import Address
+from cybox.objects.file_object import File
+from cybox.objects.mutex_object import Mutex
+from cybox.objects.win_file_object import WinFile
+
+MD5 = "d41d8cd98f00b204e9800998ecf8427e"
+SHA1 = "da39a3ee5e6b4b0d3255bfef95601890afd80709"
+
+
+def _file(name=None, hashes=(), klass=File):
+    f = klass()
+    if name is not None:
+        f.file_name = name
+    for h in hashes:
+        f.add_hash(h)
+    return f
+
+
+def _address(value):
+    return Address(value, Address.CAT_IPV4)
+
+
+def _mutex(name, condition=None):
+    m = Mutex()
+    m.name = name
+    m.name.condition = condition
+    return m
+
+
+class TestPatternIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = PatternIndex()
+        self.hash_id = self.index.add(Observable(_file(hashes=[MD5])))
+        self.ip_id = self.index.add(Observable(_address("10.0.0.1")))
+        self.mutex_id = self.index.add(_mutex("Global\\evil", "Contains"),
+                                       id_="mutex")
+
+    def test_add(self):
+        self.assertEqual(3, len(self.index))
+        self.assertTrue(self.hash_id in self.index)
+        self.assertEqual("mutex", self.mutex_id)
+        self.assertRaises(ValueError, self.index.add, _address("10.0.0.2"),
+                          id_="mutex")
+
+    def test_lookup(self):
+        instance = _file("a.exe", hashes=[SHA1, MD5], klass=WinFile)
+        self.assertEqual([self.hash_id], self.index.lookup(instance))
+        self.assertEqual([self.ip_id],
+                         self.index.lookup(Observable(_address("10.0.0.1"))))
+        self.assertEqual([], self.index.lookup(_address("10.0.0.2")))
+        self.assertEqual(["mutex"],
+                         self.index.lookup(_mutex("Global\\evil123")))
+
+    def test_candidates(self):
+        # Only the unindexed Contains pattern is a candidate.
+        self.assertEqual(set(["mutex"]),
+                         self.index.candidates(_address("10.0.0.2")))
+        self.assertEqual(set(["mutex", self.ip_id]),
+                         self.index.candidates(_address("10.0.0.1")))
+
+    def test_case_insensitive(self):
+        pattern = _mutex("Global\\Evil", "Equals")
+        pattern.name.is_case_sensitive = False
+        id_ = self.index.add(pattern)
+
+        found = self.index.lookup(_mutex("GLOBAL\\EVIL"))
+        self.assertEqual([id_], found)
+
+        found = self.index.lookup(_mutex("Global\\evil"))
+        self.assertEqual(["mutex", id_], found)
+
+    def test_hash_case(self):
+        found = self.index.lookup(_file(hashes=[MD5.upper()]))
+        self.assertEqual([self.hash_id], found)
+
+    def test_list_value(self):
+        pattern = _address(["10.0.0.5", "10.0.0.6"])
+        pattern.address_value.condition = "Equals"
+        id_ = self.index.add(pattern)
+
+        self.assertEqual([id_], self.index.lookup(_address("10.0.0.6")))
+
+    def test_composition(self):
+        either = ObservableComposition("OR", [Observable(_address("10.1.1.1")),
+                                              Observable(_file("x.exe"))])
+        either_id = self.index.add(either, id_="either")
+        both = ObservableComposition("AND", [Observable(_address("10.1.1.1")),
+                                             Observable(_file("x.exe"))])
+        self.index.add(both, id_="both")
+
+        self.assertEqual(["either"], self.index.lookup(_file("x.exe")))
+        self.assertEqual(["either", "both"],
+                         self.index.lookup([_file("x.exe"),
+                                            _address("10.1.1.1")]))
+
+        self.assertTrue(either_id not in self.index.candidates(_mutex("a")))
+
+    def test_remove(self):
+        keys = self.index.key_count
+        self.index.remove(self.hash_id)
+        self.index.remove("mutex")
+
+        self.assertEqual(1, len(self.index))
+        self.assertEqual(keys - 1, self.index.key_count)
+        self.assertEqual([], self.index.lookup(_file(hashes=[MD5])))
+        self.assertEqual(set(), self.index.candidates(_mutex("Global\\evil")))
+        self.assertRaises(KeyError, self.index.remove, "mutex")
+
+    def test_replace(self):
+        # Replace a pattern with a different one under the same id.
+        pattern = Observable(_address("10.0.0.5"))
+        pattern.id_ = "example:Observable-1"
+        self.index.add(pattern)
+        self.index.remove("example:Observable-1")
+
+        pattern = Observable(_address("10.0.0.6"))
+        pattern.id_ = "example:Observable-1"
+        self.index.add(pattern)
+
+        self.assertEqual([], self.index.lookup(_address("10.0.0.5")))
+        self.assertEqual(["example:Observable-1"],
+                         self.index.lookup(_address("10.0.0.6")))
+
+        self.index.remove("example:Observable-1")
+        self.assertFalse("example:Observable-1" in self.index._shared)
+
+    def test_memory_usage(self):
+        before = self.index.memory_usage()
+        for i in range(100):
+            self.index.add(_address("192.168.0.%d" % i), id_=i)
+        self.assertTrue(self.index.memory_usage() > before)
+
+        for i in range(100):
+            self.index.remove(i)
+        self.assertEqual(2, self.index.key_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import unittest
+
+from cybox.common import String
+from cybox.match import RegexSet, UnsupportedRegex, compile_regex
+from cybox.match.conditions import compile_condition
+from cybox.match.regex import _regex_cache, translate
+
+
+class TestTranslate(unittest.TestCase):
+
+    def test_python(self):
+        self.assertEqual(r"a\Z", translate(r"a\Z"))
+        self.assertEqual(r"a\Z", translate(r"a\Z", "Python"))
+
+    def test_pcre(self):
+        self.assertEqual(r"(?P<y>\d{4})-(?P=y)",
+                         translate(r"(?<y>\d{4})-\k<y>", "PCRE"))
+        self.assertEqual(r"(?<=a)b(?<!c)", translate(r"(?<=a)b(?<!c)", "pcre"))
+        self.assertEqual(r"a\.b+c\Z", translate(r"\Qa.b\E+c\z", "PCRE"))
+        self.assertEqual(r"a(?=\n?\Z)", translate(r"a\Z", "PCRE"))
+
+    def test_posix(self):
+        self.assertEqual(r"[a-zA-Z0-9_]+[^0-9]",
+                         translate(r"[[:word:]]+[^[:digit:]]", "POSIX"))
+        self.assertEqual(r"[a\\]", translate(r"[a\]", "POSIX"))
+
+    def test_xsd(self):
+        self.assertEqual(r"^(?:[a-z]{3}\^\$)\Z",
+                         translate(r"[a-z]{3}^$", "XML Schema"))
+
+    def test_unsupported(self):
+        for pattern, syntax in [(r"a++", "PCRE"),
+                                (r"(?>a)", "PCRE"),
+                                (r"(?R)", "PCRE"),
+                                (r"\p{L}", "PCRE"),
+                                (r"\i\c*", "XSD"),
+                                (r"[a-z-[aeiou]]", "XSD"),
+                                (r"[[:foo:]]", "POSIX"),
+                                (r"[abc", "POSIX"),
+                                (r"a", "ECMAScript")]:
+            self.assertRaises(UnsupportedRegex, translate, pattern, syntax)
+
+
+class TestCompileRegex(unittest.TestCase):
+
+    def test_cache(self):
+        first = compile_regex(r"ab+c", "PCRE")
+        hits = _regex_cache.hits
+        self.assertTrue(compile_regex(r"ab+c", "PCRE") is first)
+        self.assertEqual(hits + 1, _regex_cache.hits)
+
+        other = compile_regex(r"ab+c", "PCRE", case_sensitive=False)
+        self.assertFalse(other is first)
+        self.assertTrue(other.search("ABBC"))
+
+    def test_invalid(self):
+        self.assertRaises(UnsupportedRegex, compile_regex, r"a(b")
+        self.assertTrue(issubclass(UnsupportedRegex, ValueError))
+
+    def test_fits_pattern_syntax(self):
+        prop = String(r"[0-9]{3}")
+        prop.condition = "FitsPattern"
+        self.assertTrue(compile_condition(prop)("a123b"))
+
+        prop.regex_syntax = "XML Schema"
+        test = compile_condition(prop)
+        self.assertFalse(test("a123b"))
+        self.assertTrue(test("123"))
+
+        prop.regex_syntax = "Unknown"
+        self.assertRaises(ValueError, compile_condition, prop)
+
+
+class TestRegexSet(unittest.TestCase):
+
+    def setUp(self):
+        self.regexes = RegexSet()
+        self.regexes.add(r"[a-f0-9]{32}\.exe$", "random")
+        self.regexes.add(r"\\temp\\", "temp", case_sensitive=False)
+        self.regexes.add(r"(ab)\1", "backref")
+        self.regexes.add(r"^C:", "drive")
+
+    def test_matches(self):
+        value = "C:\\Temp\\0cc175b9c0f1b6a831c399e269772661.exe"
+        self.assertEqual(["random", "temp", "drive"],
+                         self.regexes.matches(value))
+        self.assertEqual(["backref"], self.regexes.matches("xababx"))
+        self.assertEqual([], self.regexes.matches("D:\\C:"))
+
+    def test_overlapping(self):
+        regexes = RegexSet()
+        regexes.add("abc", 1)
+        regexes.add("bcd", 2)
+        regexes.add("b", 3)
+        self.assertEqual([1, 2, 3], regexes.matches("abcd"))
+
+    def test_many(self):
+        regexes = RegexSet()
+        for n in range(250):
+            regexes.add(r"x(%d)y" % n, n)
+        self.assertEqual([7, 149], regexes.matches("x7y x149y"))
+
+    def test_add_property(self):
+        prop = String(["^a", "b$"])
+        prop.condition = "FitsPattern"
+        prop.is_case_sensitive = False
+        ids = self.regexes.add_property(prop, "prop")
+        self.assertEqual([("prop", 0), ("prop", 1)], ids)
+        self.assertEqual([("prop", 1)], self.regexes.matches("xB"))
+
+    def test_remove(self):
+        self.regexes.remove("temp")
+        self.assertEqual(3, len(self.regexes))
+        self.assertFalse("temp" in self.regexes)
+        self.assertEqual([], self.regexes.matches("\\temp\\"))
+        self.assertRaises(KeyError, self.regexes.remove, "temp")
+        self.assertRaises(ValueError, self.regexes.add, "x", "drive")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import unittest
+
+from mixbox.vendor.six import u
+
+from cybox.common import String
+from cybox.common.vocabs import HashName
+from cybox.core import Observable
+from cybox.match import SubstringIndex
+from cybox.match.substrings import Automaton
+from cybox.objects.process_object import Process
+
+
+def _string(value, condition="Contains", **kwargs):
+    s = String(value)
+    s.condition = condition
+    for name, val in kwargs.items():
+        setattr(s, name, val)
+    return s
+
+
+class TestAutomaton(unittest.TestCase):
+
+    def test_search(self):
+        automaton = Automaton()
+        for word in ("he", "she", "his", "hers"):
+            automaton.add(word, word)
+
+        found = sorted(automaton.search("ushers"))
+        self.assertEqual([(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")], found)
+
+    def test_rebuild(self):
+        automaton = Automaton()
+        automaton.add("abc", 1)
+        self.assertEqual([(0, 3, 1)], automaton.search("abcd"))
+
+        automaton.add("bcd", 2)
+        self.assertEqual([(0, 3, 1), (1, 4, 2)], automaton.search("abcd"))
+
+        automaton.remove(lambda entry: entry == 1)
+        self.assertEqual([(1, 4, 2)], automaton.search("abcd"))
+        self.assertEqual(1, len(automaton))
+
+    def test_empty_word(self):
+        self.assertRaises(ValueError, Automaton().add, "", 1)
+
+
+class TestSubstringIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SubstringIndex()
+        self.index.add(_string("powershell"), "ps")
+        self.index.add(_string("cmd.exe", "StartsWith"), "cmd")
+        self.index.add(_string(".tmp", "EndsWith"), "tmp")
+        self.index.add(_string("-ENC", is_case_sensitive=False), "enc")
+
+    def test_matches(self):
+        self.assertEqual(["ps", "enc"],
+                         self.index.matches("powershell.exe -enc AAAA"))
+        self.assertEqual(["cmd"], self.index.matches("cmd.exe /c dir"))
+        self.assertEqual([], self.index.matches("run cmd.exe"))
+        self.assertEqual(["tmp"], self.index.matches("C:\\x.tmp"))
+        self.assertEqual([], self.index.matches("C:\\x.tmp.exe"))
+        self.assertEqual([], self.index.matches("PowerShell"))
+
+    def test_case_insensitive(self):
+        self.assertEqual(["enc"], self.index.matches("x -Enc y"))
+
+    def test_list_values(self):
+        self.index.add(_string(["mimikatz", "sekurlsa"]), "any")
+        self.index.add(_string(["privilege", "debug"],
+                               apply_condition="ALL"), "all")
+
+        self.assertEqual(["any"], self.index.matches("sekurlsa::logonpasswords"))
+        self.assertEqual([], self.index.matches("privilege::elevate"))
+        self.assertEqual(["all"], self.index.matches("privilege::debug"))
+
+    def test_property_values(self):
+        self.assertEqual(["ps", "cmd"], self.index.matches(
+            String(["cmd.exe /c", "powershell"])))
+        self.assertEqual([], self.index.matches(String()))
+        self.assertEqual([], self.index.matches(42))
+
+    def test_unsupported(self):
+        self.assertRaises(ValueError, self.index.add, _string("x", "Equals"),
+                          "eq")
+        self.assertRaises(ValueError, self.index.add,
+                          _string("x", "StartsWith", apply_condition="ALL"),
+                          "all")
+        self.assertRaises(ValueError, self.index.add, _string("x"), "ps")
+        self.assertRaises(ValueError, self.index.add, _string("x"))
+
+    def test_vocab_pattern(self):
+        name = HashName("SHA256")
+        name.condition = "Contains"
+        self.index.add(name, "sha")
+        self.assertEqual(["sha"], self.index.matches(HashName("SHA256")))
+        self.assertEqual(["sha"], self.index.matches("HMAC-SHA256"))
+        self.assertEqual([], self.index.matches(HashName("MD5")))
+
+    def test_ends_with_lowered_length(self):
+        # u"\u0130" (I with a dot above) is two characters when lower-cased.
+        self.index.add(_string("tail", "EndsWith", is_case_sensitive=False),
+                       "tail")
+        self.assertEqual(["tail"], self.index.matches(u("\u0130 TAIL")))
+
+    def test_empty_value(self):
+        self.index.add(_string(""), "empty")
+        self.assertEqual(["empty"], self.index.matches("anything"))
+
+    def test_remove(self):
+        self.index.remove("ps")
+        self.index.remove("enc")
+        self.assertEqual([], self.index.matches("powershell -enc"))
+        self.assertEqual(2, len(self.index))
+        self.assertRaises(KeyError, self.index.remove, "ps")
+
+
+class TestFieldIndex(unittest.TestCase):
+
+    def test_field(self):
+        index = SubstringIndex("image_info")
+        self.assertRaises(ValueError, index.add, Process())
+
+        index = SubstringIndex("name")
+        p = Process()
+        p.name = _string("svc", "Contains")
+        pattern = Observable(p)
+        self.assertEqual(pattern.id_, index.add(pattern))
+
+        instance = Process()
+        instance.name = "svchost.exe"
+        self.assertEqual([pattern.id_], index.matches(instance))
+        self.assertEqual([pattern.id_], index.matches(Observable(instance)))
+        self.assertEqual([], index.matches(Process()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,17 @@
 
 import unittest
 
-from cybox.objects import _ObjectMetadata, UnknownObjectType
+from mixbox.vendor.six import BytesIO
+
+import cybox.bindings.cybox_core as core_binding
+import cybox.bindings.uri_object as uri_binding
+from cybox.core import Observable, Observables
+from cybox.core.builder import parse
+import cybox.objects
+from cybox.objects import (_ObjectMetadata, _ObjectType, UnknownObjectType,
+        get_class_for_object_type, register_object_type)
+from cybox.objects.address_object import Address
+from cybox.objects.uri_object import URI
 
 
 class ObjectTypeTest(unittest.TestCase):
@@ -36,6 +46,79 @@ class ObjectTypeTest(unittest.TestCase):
                           self.meta.get_class_for_object_type,
                           "!!BadClassName")
 
+    def test_class_is_memoized(self):
+        meta = _ObjectMetadata([
+            ("AddressObjectType", 'cybox.objects.address_object.Address',
+             None, None, None),
+        ])
+        self.assertEqual(Address,
+                         meta.get_class_for_object_type("AddressObjectType"))
+        self.assertEqual({"AddressObjectType": Address}, meta._class_dict)
+
+        # Replacing the ObjectType forgets the memoized class.
+        meta.add_object(_ObjectType("AddressObjectType",
+                                    'cybox.objects.uri_object.URI',
+                                    None, None, None))
+        self.assertEqual(URI,
+                         meta.get_class_for_object_type("AddressObjectType"))
+
+    def test_prewarm(self):
+        meta = _ObjectMetadata([
+            ("AddressObjectType", 'cybox.objects.address_object.Address',
+             None, None, None),
+            ("URIObjectType", 'cybox.objects.uri_object.URI',
+             None, None, None),
+            ("!!MissingAPIClass", None, None, None, None),
+        ])
+        meta.prewarm()
+        self.assertEqual({"AddressObjectType": Address, "URIObjectType": URI},
+                         meta._class_dict)
+
+
+class ExtensionObjectType(uri_binding.URIObjectType):
+    """A binding class for RegisterObjectTypeTest.test_parse."""
+
+
+class RegisterObjectTypeTest(unittest.TestCase):
+
+    def tearDown(self):
+        for name in ("!!ExtensionObjectType", "ExtensionObjectType"):
+            cybox.objects._OBJ_META._obj_dict.pop(name, None)
+            cybox.objects._OBJ_META._class_dict.pop(name, None)
+            core_binding._OBJECT_BINDINGS.pop(name, None)
+            core_binding._get_class.__globals__.pop(name, None)
+
+    def test_register_class(self):
+        register_object_type("!!ExtensionObjectType", URI)
+        self.assertEqual(URI,
+                         get_class_for_object_type("!!ExtensionObjectType"))
+
+        otype = cybox.objects._OBJ_META.lookup_object("!!ExtensionObjectType")
+        self.assertEqual('cybox.objects.uri_object.URI', otype.api_class)
+
+    def test_register_name(self):
+        register_object_type("!!ExtensionObjectType",
+                             'cybox.objects.address_object.Address')
+        self.assertEqual(Address,
+                         get_class_for_object_type("!!ExtensionObjectType"))
+
+    def test_parse(self):
+        register_object_type("ExtensionObjectType", URI, binding=__name__,
+                             namespace=URI._namespace)
+
+        uri = URI("http://example.com/", URI.TYPE_URL)
+        xml = Observables([Observable(uri)]).to_xml()
+        xml = xml.replace(b"URIObjectType", b"ExtensionObjectType")
+
+        self.assertTrue(core_binding._get_class("ExtensionObjectType") is
+                        ExtensionObjectType)
+        binding = core_binding.parseString(xml.decode('utf-8'))
+        for observables in (parse(BytesIO(xml)),
+                            Observables.from_obj(binding)):
+            props = observables[0].object_.properties
+            self.assertTrue(isinstance(props, URI))
+            self.assertEqual("http://example.com/", props.value.value)
+
 
 if __name__ == "__main__":
     unittest.main()
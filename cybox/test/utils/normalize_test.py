@@ -2,13 +2,26 @@
 # See LICENSE.txt for complete terms.
 
 
+import re
+import socket
 import unittest
 
-from cybox.utils.normalize import normalize_object_properties
+from cybox.common import String
+from cybox.core import (Action, Actions, AssociatedObject, AssociatedObjects,
+        Event, Observable, ObservableComposition, Observables)
+from cybox.objects.address_object import Address, EmailAddress
+from cybox.objects.domain_name_object import DomainName
+from cybox.objects.email_message_object import EmailMessage
+from cybox.objects.uri_object import URI
+from cybox.objects.win_file_object import WinFile
+from cybox.utils.normalize import (_get_compiled_mapping, _resolved_rules,
+        _rules, _single_char_prefix, file_path_normalization_mapping,
+        get_normalization_rules, normalize_object_properties,
+        normalize_observables, perform_replacement,
+        register_normalization_rule, reset_compiled_mappings)
 from cybox.objects.file_object import File
 from cybox.objects.win_registry_key_object import WinRegistryKey, RegistryValues, RegistryValue
 from cybox.objects.process_object import Process, ImageInfo
-from cybox.objects.mutex_object import Mutex
 
 class TestNormalization(unittest.TestCase):
 
@@ -60,5 +73,233 @@ class TestNormalization(unittest.TestCase):
 
         self.assertEqual(process_obj.image_info.path.value, normalized_file_path_string)
 
+
+class TestPerformReplacement(unittest.TestCase):
+
+    def _replace(self, value, mapping_list=file_path_normalization_mapping):
+        s = String(value)
+        perform_replacement(s, mapping_list)
+        return s.value
+
+    def test_last_matching_entry_wins(self):
+        # %temp% appears first in the value, but the C:\Windows\System32
+        # entry comes later in the mapping list.
+        value = "%temp%;C:\\Windows\\System32\\x.dll"
+        self.assertEqual("%temp%;CSIDL_SYSTEM\\x.dll", self._replace(value))
+
+    def test_all_occurrences_replaced(self):
+        value = "%windir%\\a;%WINDIR%\\b"
+        self.assertEqual("CSIDL_WINDOWS\\a;CSIDL_WINDOWS\\b",
+                         self._replace(value))
+
+    def test_anchored(self):
+        self.assertEqual("%SystemDrive%", self._replace("D:\\"))
+        self.assertEqual("x D:\\", self._replace("x D:\\"))
+
+    def test_no_match(self):
+        self.assertEqual("\\\\server\\share", self._replace("\\\\server\\share"))
+
+    def test_mapping_without_prefix(self):
+        mapping = [{'regex': re.compile('a*b'), 'replacement': 'X'},
+                   {'regex': re.compile('(?:c|d)e'), 'replacement': 'Y'}]
+        self.assertEqual("zzXz", self._replace("zzaabz", mapping))
+        self.assertEqual("zYab", self._replace("zdeab", mapping))
+
+    def test_changed_mapping(self):
+        mapping = [{'regex': re.compile('foo'), 'replacement': 'bar'}]
+        self.assertEqual("bar", self._replace("foo", mapping))
+        mapping.append({'regex': re.compile('o+'), 'replacement': '0'})
+        self.assertEqual("f0", self._replace("foo", mapping))
+        mapping.pop()
+        self.assertEqual("bar", self._replace("foo", mapping))
+
+        # Entries changed in place are only noticed after a reset.
+        mapping[0]['replacement'] = 'baz'
+        self.assertEqual("bar", self._replace("foo", mapping))
+        reset_compiled_mappings(mapping)
+        self.assertEqual("baz", self._replace("foo", mapping))
+
+    def test_search_string(self):
+        mapping = [{'search_string': 'foo', 'replacement': 'bar'},
+                   {'regex': re.compile('xyz'), 'replacement': 'abc'}]
+        self.assertEqual("bar-baz", self._replace("foo-baz", mapping))
+
+    def test_single_char_prefix(self):
+        self.assertEqual("%sy", _single_char_prefix("%system%"))
+        self.assertEqual("^\\w:", _single_char_prefix("^\\w:\\\\{0,2}$"))
+        self.assertEqual("[\\w][:]\\\\",
+                         _single_char_prefix("[\\w][:]\\\\windows"))
+        self.assertEqual("", _single_char_prefix("a*b"))
+        self.assertEqual("", _single_char_prefix("ab|cd"))
+        self.assertEqual("", _single_char_prefix("\\bword"))
+
+
+def _file(path):
+    f = File()
+    f.file_path = path
+    return f
+
+
+class TestNormalizeObservables(unittest.TestCase):
+
+    def _observables(self):
+        f1 = _file("%WinDir%\\a.dll")
+        f1.add_related(_file("C:\\Windows\\System32\\b.dll"),
+                       "Contains", inline=True)
+
+        action = Action()
+        action.associated_objects = AssociatedObjects(
+            [AssociatedObject(_file("%temp%\\c.tmp"))])
+        event = Event()
+        event.actions = Actions([action])
+
+        composition = ObservableComposition(
+            ObservableComposition.OPERATOR_AND,
+            [Observable(_file("%WinDir%\\a.dll")),
+             Observable(_file("D:\\data\\d.txt"))])
+
+        return Observables([Observable(f1), Observable(event),
+                            Observable(composition)])
+
+    def _paths(self, observables):
+        return [
+            observables[0].object_.properties.file_path.value,
+            observables[0].object_.related_objects[0].properties.file_path.value,
+            observables[1].event.actions[0].associated_objects[0].properties.file_path.value,
+            observables[2].observable_composition.observables[0].object_.properties.file_path.value,
+            observables[2].observable_composition.observables[1].object_.properties.file_path.value,
+        ]
+
+    def test_normalize_observables(self):
+        observables = self._observables()
+        self.assertEqual(4, normalize_observables(observables))
+        self.assertEqual(["CSIDL_WINDOWS\\a.dll", "CSIDL_SYSTEM\\b.dll",
+                          "TEMP\\c.tmp", "CSIDL_WINDOWS\\a.dll",
+                          "D:\\data\\d.txt"],
+                         self._paths(observables))
+
+        # Everything is already normalized.
+        self.assertEqual(0, normalize_observables(observables))
+
+    def test_workers(self):
+        expected = self._observables()
+        normalize_observables(expected)
+
+        observables = self._observables()
+        self.assertEqual(4, normalize_observables(observables, workers=2,
+                                                  chunk_size=2))
+        self.assertEqual(self._paths(expected), self._paths(observables))
+
+    def test_memoized(self):
+        compiled = _get_compiled_mapping(file_path_normalization_mapping)
+        compiled.memo.clear()
+        hits = compiled.memo.hits
+
+        normalize_observables([Observable(_file("%WinDir%\\x.dll"))
+                               for _ in range(3)])
+        self.assertEqual(2, compiled.memo.hits - hits)
+
+    def test_object_properties_count(self):
+        self.assertEqual(1, normalize_object_properties(_file("%temp%\\x")))
+        self.assertEqual(0, normalize_object_properties(_file("D:\\x")))
+
+
+class TestNormalizationRules(unittest.TestCase):
+
+    def _address(self, value, category):
+        a = Address(value, category)
+        normalize_object_properties(a)
+        return a.address_value.value
+
+    def _uri(self, value, type_=URI.TYPE_URL):
+        u = URI(value, type_)
+        normalize_object_properties(u)
+        return u.value.value
+
+    def test_ipv4(self):
+        self.assertEqual("10.0.0.1", self._address("010.000.0.01", Address.CAT_IPV4))
+        self.assertEqual("10.0.0.0/8", self._address("10.0.0.000/08", Address.CAT_IPV4_NET))
+        self.assertEqual("300.0.0.1", self._address("300.0.0.1", Address.CAT_IPV4))
+        self.assertEqual("10.0.0", self._address("10.0.0", Address.CAT_IPV4))
+
+    def test_ipv6(self):
+        self.assertEqual("2001:db8::1",
+                         self._address("2001:0DB8:0000:0000:0000:0000:0000:0001", Address.CAT_IPV6))
+        self.assertEqual("2001:db8::/32",
+                         self._address("2001:DB8:0::/32", Address.CAT_IPV6_NET))
+        self.assertEqual("not-an-address",
+                         self._address("not-an-address", Address.CAT_IPV6))
+
+    def test_ipv6_without_inet_pton(self):
+        # As on Python 2 for Windows.
+        inet_pton = socket.inet_pton
+        del socket.inet_pton
+        try:
+            self.assertEqual("2001:DB8::1",
+                             self._address("2001:DB8::1", Address.CAT_IPV6))
+        finally:
+            socket.inet_pton = inet_pton
+
+    def test_other_categories_unchanged(self):
+        self.assertEqual("00:1A:2B:3C:4D:5E",
+                         self._address("00:1A:2B:3C:4D:5E", Address.CAT_MAC))
+
+    def test_email(self):
+        e = EmailAddress("John.Smith@Example.COM")
+        self.assertEqual(1, normalize_object_properties(e))
+        self.assertEqual("John.Smith@example.com", e.address_value.value)
+
+        m = EmailMessage()
+        m.from_ = "Alice@Example.com"
+        m.to = ["Bob@EXAMPLE.org", "carol@example.org"]
+        self.assertEqual(2, normalize_object_properties(m))
+        self.assertEqual("Alice@example.com", m.from_.address_value.value)
+        self.assertEqual("Bob@example.org", m.to[0].address_value.value)
+
+    def test_uri(self):
+        self.assertEqual("http://www.example.com/Index.html?A=B",
+                         self._uri("HTTP://WWW.Example.com:80/Index.html?A=B"))
+        self.assertEqual("https://User@example.com:8443",
+                         self._uri("https://User@EXAMPLE.com:8443"))
+        self.assertEqual("https://[2001:db8::1]/",
+                         self._uri("https://[2001:DB8::1]:443/"))
+        self.assertEqual("http://example.com/",
+                         self._uri("http://example.com:/"))
+        self.assertEqual("urn:isbn:0451450523",
+                         self._uri("urn:isbn:0451450523", URI.TYPE_GENERAL))
+        self.assertEqual("example.com",
+                         self._uri("Example.COM.", URI.TYPE_DOMAIN))
+
+    def test_domain_name(self):
+        d = DomainName()
+        d.value = "WWW.Example.com."
+        normalize_object_properties(d)
+        self.assertEqual("www.example.com", d.value.value)
+
+    def test_subclass_rules(self):
+        f = WinFile()
+        f.file_path = "%WinDir%\\a.dll"
+        self.assertEqual(1, normalize_object_properties(f))
+        self.assertEqual("CSIDL_WINDOWS\\a.dll", f.file_path.value)
+
+    def test_register_rule(self):
+        def upper(value, owner):
+            return value.upper()
+
+        rule = register_normalization_rule(File, 'file_name', function=upper)
+        try:
+            self.assertTrue(rule in get_normalization_rules(WinFile))
+            f = WinFile()
+            f.file_name = "abc.txt"
+            self.assertEqual(1, normalize_object_properties(f))
+            self.assertEqual("ABC.TXT", f.file_name.value)
+        finally:
+            _rules[File].remove(rule)
+            _resolved_rules.clear()
+
+    def test_rule_arguments(self):
+        self.assertRaises(ValueError, register_normalization_rule, File, 'file_name')
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,15 @@
 # Copyright (c) 2015, The MITRE Corporation. All rights reserved.
 # See LICENSE.txt for complete terms.
 
+import os
+import shutil
+import tempfile
+import threading
 import unittest
 
 from cybox.common import DEFAULT_DELIM as DELIM
+from cybox.core import Object, RelatedObject
+from cybox.objects.address_object import Address
 import cybox.utils
 
 
@@ -60,5 +66,253 @@ class TestDictCache(unittest.TestCase):
         d.clear()
         self.assertEqual(0, d.count())
 
+class TestLRUCache(unittest.TestCase):
+
+    def test_max_items(self):
+        evicted = []
+        c = cybox.utils.LRUCache(max_items=2,
+                                 on_evict=lambda k, v: evicted.append((k, v)))
+        c.put("a", "id1")
+        c.put("b", "id2")
+        c.get("id1")
+        c.put("c", "id3")
+
+        self.assertEqual(2, c.count())
+        self.assertEqual([("id2", "b")], evicted)
+        self.assertEqual("a", c.get("id1"))
+        self.assertRaises(cybox.utils.CacheMiss, c.get, "id2")
+        self.assertEqual(1, c.evictions)
+
+    def test_max_bytes(self):
+        c = cybox.utils.LRUCache(max_bytes=25, sizeof=len)
+        c.put("x" * 10, "id1")
+        c.put("x" * 10, "id2")
+        self.assertEqual(20, c.size)
+
+        c.put("x" * 10, "id3")
+        self.assertEqual(2, c.count())
+        self.assertEqual(20, c.size)
+        self.assertRaises(cybox.utils.CacheMiss, c.get, "id1")
+
+        # The newest item is kept even if it is too large on its own.
+        c.put("x" * 100, "id4")
+        self.assertEqual(1, c.count())
+        self.assertEqual(100, c.size)
+
+    def test_replace(self):
+        c = cybox.utils.LRUCache(max_bytes=100, sizeof=len)
+        c.put("x" * 10, "id1")
+        c.put("x" * 20, "id1")
+        self.assertEqual(1, c.count())
+        self.assertEqual(20, c.size)
+        self.assertEqual(0, c.evictions)
+
+    def test_stats(self):
+        c = cybox.utils.LRUCache(max_items=10)
+        c.put("a", "id1")
+        c.get("id1")
+        c.get("id1")
+        self.assertRaises(cybox.utils.CacheMiss, c.get, "id2")
+
+        stats = c.stats()
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(0, stats['evictions'])
+        self.assertEqual(1, stats['count'])
+
+        c.clear()
+        self.assertEqual(0, c.count())
+        self.assertEqual(2, c.hits)
+
+    def test_generated_ids(self):
+        c = cybox.utils.LRUCache()
+        self.assertEqual(0, c.put("a"))
+        self.assertEqual(1, c.put("b"))
+
+    def test_approximate_size(self):
+        small = cybox.utils.approximate_size(["a"])
+        large = cybox.utils.approximate_size(["a", "b" * 1000])
+        self.assertTrue(large > small + 1000)
+
+    def test_set_cache(self):
+        c = cybox.utils.LRUCache(max_items=1)
+        old = cybox.utils.set_cache(c)
+        try:
+            cybox.utils.cache_put("a", "id1")
+            cybox.utils.cache_put("b", "id2")
+            self.assertEqual(1, cybox.utils.cache_count())
+            self.assertEqual("b", cybox.utils.cache_get("id2"))
+        finally:
+            cybox.utils.set_cache(old)
+
+
+class TestCacheScope(unittest.TestCase):
+
+    def setUp(self):
+        cybox.utils.cache_clear()
+
+    def tearDown(self):
+        cybox.utils.cache_clear()
+
+    def test_scope(self):
+        cybox.utils.cache_put("global", "id1")
+
+        with cybox.utils.cache_scope() as cache:
+            self.assertEqual(0, cybox.utils.cache_count())
+            cybox.utils.cache_put("scoped", "id1")
+            self.assertEqual("scoped", cybox.utils.cache_get("id1"))
+            self.assertEqual("scoped", cache.get("id1"))
+
+        self.assertEqual("global", cybox.utils.cache_get("id1"))
+        self.assertEqual(1, cybox.utils.cache_count())
+
+    def test_nested(self):
+        outer_cache = cybox.utils.LRUCache()
+        with cybox.utils.cache_scope(outer_cache) as outer:
+            self.assertTrue(outer is outer_cache)
+            cybox.utils.cache_put("outer", "id1")
+            with cybox.utils.cache_scope():
+                self.assertRaises(cybox.utils.CacheMiss,
+                                  cybox.utils.cache_get, "id1")
+            self.assertEqual("outer", cybox.utils.cache_get("id1"))
+
+        self.assertEqual(0, cybox.utils.cache_count())
+
+    def test_threads(self):
+        results = {}
+        ready = threading.Barrier(2) if hasattr(threading, 'Barrier') else None
+
+        def parse(name):
+            with cybox.utils.cache_scope():
+                cybox.utils.cache_put(name, "id1")
+                if ready:
+                    ready.wait()
+                results[name] = cybox.utils.cache_get("id1")
+
+        threads = [threading.Thread(target=parse, args=(n,))
+                   for n in ("a", "b")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual({"a": "a", "b": "b"}, results)
+        self.assertEqual(0, cybox.utils.cache_count())
+
+
+class TestSQLiteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, "cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _object(self):
+        o = Object(Address("10.0.0.1", Address.CAT_IPV4))
+        o.id_ = "example:Object-1"
+        return o
+
+    def test_persistence(self):
+        o = self._object()
+        with cybox.utils.SQLiteCache(self.path) as c:
+            c.put(o)
+            c.put(["a", 1], "id2")
+
+        with cybox.utils.SQLiteCache(self.path) as c:
+            self.assertEqual(2, c.count())
+            loaded = c.get(o.id_)
+            self.assertTrue(isinstance(loaded, Object))
+            self.assertEqual(o.to_dict(), loaded.to_dict())
+            self.assertEqual(["a", 1], c.get("id2"))
+            self.assertRaises(cybox.utils.CacheMiss, c.get, "id3")
+
+    def test_batched_writes(self):
+        c = cybox.utils.SQLiteCache(batch_size=2, front_size=1)
+        c.put("a", "id1")
+        self.assertEqual(1, len(c._pending))
+        c.put("b", "id2")
+        self.assertEqual(0, len(c._pending))
+        c.put("c", "id3")
+
+        self.assertEqual("a", c.get("id1"))
+        self.assertEqual("c", c.get("id3"))
+        self.assertEqual(3, c.count())
+
+        c.clear()
+        self.assertEqual(0, c.count())
+        self.assertRaises(cybox.utils.CacheMiss, c.get, "id1")
+        c.close()
+
+    def test_generated_ids(self):
+        c = cybox.utils.SQLiteCache(batch_size=1)
+        c.put("a", 0)
+        self.assertEqual(1, c.put("b"))
+        c.close()
+
+    def test_loading_does_not_repopulate(self):
+        c = cybox.utils.SQLiteCache(batch_size=1, front_size=1)
+        o = self._object()
+        c.put(o)
+        c.put("b", "id2")
+
+        with cybox.utils.cache_scope(c):
+            self.assertEqual(o.to_dict(), c.get(o.id_).to_dict())
+        self.assertEqual(2, c.count())
+        c.close()
+
+    def test_related_object(self):
+        o = self._object()
+        c = cybox.utils.SQLiteCache(self.path)
+        c.put(o)
+        c.close()
+
+        related = RelatedObject()
+        related.id_ = None
+        related.idref = o.id_
+        with cybox.utils.cache_scope(cybox.utils.SQLiteCache(self.path)):
+            props = related.get_properties()
+        self.assertEqual("10.0.0.1", props.address_value.value)
+
+    def test_threads(self):
+        c = cybox.utils.SQLiteCache(self.path, batch_size=10, front_size=5)
+        errors = []
+
+        def work(n):
+            try:
+                for i in range(50):
+                    c.put("value%d-%d" % (n, i), "id%d-%d" % (n, i))
+                for i in range(50):
+                    self.assertEqual("value%d-%d" % (n, i),
+                                     c.get("id%d-%d" % (n, i)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(n,))
+                   for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(200, c.count())
+        c.close()
+
+    def test_closed(self):
+        c = cybox.utils.SQLiteCache()
+        c.put("a", "id1")
+        c.close()
+        c.close()
+
+        self.assertRaises(ValueError, c.get, "id1")
+        self.assertRaises(ValueError, c.put, "b", "id2")
+        self.assertRaises(ValueError, c.put, "b")
+        self.assertRaises(ValueError, c.count)
+        self.assertRaises(ValueError, c.flush)
+        self.assertRaises(ValueError, c.clear)
+
+
 if __name__ == "__main__":
     unittest.main()
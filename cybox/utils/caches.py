@@ -1,6 +1,25 @@
 # Copyright (c) 2015, The MITRE Corporation. All rights reserved.
 # See LICENSE.txt for complete terms.
 
+import contextlib
+import json
+import sys
+import threading
+
+from mixbox.vendor import six
+
+try:
+    import contextvars
+except ImportError:
+    # Python < 3.7
+    contextvars = None
+
+__all__ = [
+    'CacheMiss', 'Cache', 'DictCache', 'LRUCache', 'SQLiteCache',
+    'approximate_size', 'set_cache', 'cache_scope', 'cache_put', 'cache_get', 'cache_count',
+    'cache_clear',
+]
+
 
 class CacheMiss(Exception):
     """Item was not found in a cache."""
@@ -82,26 +101,498 @@ class DictCache(Cache):
         # No need to reset _next_id
 
 
+def approximate_size(value):
+    """Return the approximate memory used by `value`, in bytes.
+
+    This follows instance attributes (including slots) and the items of
+    lists, tuples, sets and dicts, counting each object once. Classes,
+    modules and functions are not counted.
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+
+        if isinstance(obj, (six.class_types, type(sys))) or callable(obj):
+            continue
+
+        total += sys.getsizeof(obj)
+
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, dict):
+            stack.extend(six.iterkeys(obj))
+            stack.extend(six.itervalues(obj))
+
+        if hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+        for klass in type(obj).__mro__:
+            for name in klass.__dict__.get('__slots__', ()):
+                if hasattr(obj, name):
+                    stack.append(getattr(obj, name))
+
+    return total
+
+
+class _LinkedDict(object):
+    """A dict which remembers the order its keys were added in.
+
+    This is the part of ``collections.OrderedDict`` the caches need, which
+    Python 2.6 does not have.  Setting an existing key keeps its position.
+    """
+
+    def __init__(self):
+        # Each link is [previous link, next link, key, value]; the root
+        # link is both ends of the ring.
+        self._root = root = []
+        root[:] = [root, root, None, None]
+        self._links = {}
+
+    def __len__(self):
+        return len(self._links)
+
+    def __contains__(self, key):
+        return key in self._links
+
+    def __getitem__(self, key):
+        return self._links[key][3]
+
+    def __setitem__(self, key, value):
+        link = self._links.get(key)
+        if link is not None:
+            link[3] = value
+            return
+        root = self._root
+        last = root[0]
+        last[1] = root[0] = self._links[key] = [last, root, key, value]
+
+    def pop(self, key, *default):
+        try:
+            link = self._links.pop(key)
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        previous, next_ = link[0], link[1]
+        previous[1] = next_
+        next_[0] = previous
+        return link[3]
+
+    def first_key(self):
+        """Return the oldest key.  Raises KeyError if there is none."""
+        link = self._root[1]
+        if link is self._root:
+            raise KeyError("first_key(): dictionary is empty")
+        return link[2]
+
+    def iteritems(self):
+        root = self._root
+        link = root[1]
+        while link is not root:
+            yield link[2], link[3]
+            link = link[1]
+
+    def clear(self):
+        self._root[:] = [self._root, self._root, None, None]
+        self._links.clear()
+
+
+class LRUCache(Cache):
+    """A Cache which holds a bounded number of items.
+
+    When the cache is full, the least recently used items are evicted.
+    Both :meth:`get` and :meth:`put` count as a use.
+
+    Arguments:
+    - max_items: the maximum number of items to keep, or None for no limit
+    - max_bytes: the maximum approximate size of all items, or None for no
+      limit. Item sizes are computed once, when the item is saved.
+    - on_evict: a function called as ``on_evict(id_, value)`` whenever an
+      item is evicted to make room for another
+    - sizeof: the function used to compute item sizes for `max_bytes`
+      (default: :func:`approximate_size`)
+
+    The `hits`, `misses` and `evictions` attributes count calls to
+    :meth:`get` which found an item, calls which did not, and evicted items.
+    """
+
+    def __init__(self, max_items=None, max_bytes=None, on_evict=None,
+                 sizeof=approximate_size):
+        if max_items is not None and max_items < 1:
+            raise ValueError("max_items must be at least 1")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.sizeof = sizeof
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.__inner = _LinkedDict()
+        self.__sizes = {}
+        self._bytes = 0
+        self._next_id = 0
+
+    def _generate_id(self):
+        while self._next_id in self.__inner:
+            self._next_id += 1
+        return self._next_id
+
+    def _save(self, value, id_):
+        self._remove(id_)
+
+        if self.max_bytes is not None:
+            size = self.sizeof(value)
+            self.__sizes[id_] = size
+            self._bytes += size
+
+        self.__inner[id_] = value
+        self._evict()
+        return id_
+
+    def _remove(self, id_):
+        value = self.__inner.pop(id_, None)
+        self._bytes -= self.__sizes.pop(id_, 0)
+        return value
+
+    def _evict(self):
+        # The most recently saved item is kept even if it alone exceeds
+        # max_bytes.
+        while len(self.__inner) > 1 and (
+                (self.max_items is not None and
+                 len(self.__inner) > self.max_items) or
+                (self.max_bytes is not None and
+                 self._bytes > self.max_bytes)):
+            id_ = self.__inner.first_key()
+            value = self._remove(id_)
+            self.evictions += 1
+            if self.on_evict:
+                self.on_evict(id_, value)
+
+    def get(self, id_):
+        try:
+            value = self.__inner.pop(id_)
+        except KeyError:
+            self.misses += 1
+            raise CacheMiss
+
+        # Move the item to the most recently used end.
+        self.__inner[id_] = value
+        self.hits += 1
+        return value
+
+    def count(self):
+        return len(self.__inner)
+
+    @property
+    def size(self):
+        """The approximate size of all items, if `max_bytes` is set."""
+        return self._bytes
+
+    def stats(self):
+        """Return a dict of the cache's counters and current size."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'count': self.count(),
+            'bytes': self._bytes,
+        }
+
+    def clear(self):
+        """Clear all items from the cache.
+
+        The on_evict function is not called and the counters are not reset.
+        """
+        self.__inner = _LinkedDict()
+        self.__sizes = {}
+        self._bytes = 0
+
+
+class SQLiteCache(Cache):
+    """A Cache which stores its items in an SQLite database.
+
+    Objects stay available across documents and processes without being
+    kept in memory. Items are stored when they are evicted from a small
+    in-memory write buffer, in batches of `batch_size`, and are loaded back
+    when they are requested with :meth:`get`. Recently used items are also
+    kept in a front :class:`LRUCache` of `front_size` items.
+
+    Entities are stored as the JSON form of their ``to_dict()`` and loaded
+    with the ``from_dict()`` method of their class. Other values are stored
+    with :mod:`pickle`. Since items are serialized when they are written,
+    changes made to an item after that point are not saved.
+
+    Arguments:
+    - path: the database file. Defaults to an in-memory database.
+    - batch_size: the number of items buffered before they are written.
+    - front_size: the number of recently used items kept in memory.
+
+    Call :meth:`flush` or :meth:`close` to write any buffered items. The
+    cache can be shared between threads; its methods hold a lock while they
+    use the database. Using the cache after :meth:`close` raises a
+    ValueError.
+    """
+
+    def __init__(self, path=':memory:', batch_size=1000, front_size=1000):
+        # Imported here to keep it out of the import time of cybox.utils.
+        import sqlite3
+
+        self.path = path
+        self.batch_size = batch_size
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cybox_cache "
+            "(id PRIMARY KEY, kind TEXT, class TEXT, data BLOB)"
+        )
+        self._conn.commit()
+
+        self._lock = threading.RLock()
+        self._binary = sqlite3.Binary
+        self._pending = _LinkedDict()
+        self._front = LRUCache(max_items=front_size)
+        self._next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _check_open(self):
+        if self._conn is None:
+            raise ValueError("SQLiteCache %s is closed" % self.path)
+
+    def _contains(self, id_):
+        if id_ in self._pending:
+            return True
+        cursor = self._conn.execute(
+            "SELECT 1 FROM cybox_cache WHERE id = ?", (id_,))
+        return cursor.fetchone() is not None
+
+    def _generate_id(self):
+        with self._lock:
+            self._check_open()
+            while self._contains(self._next_id):
+                self._next_id += 1
+            return self._next_id
+
+    def _save(self, value, id_):
+        with self._lock:
+            self._check_open()
+            self._pending[id_] = value
+            self._front.put(value, id_)
+
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+        return id_
+
+    def flush(self):
+        """Write all buffered items to the database."""
+        with self._lock:
+            self._check_open()
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+
+        rows = [(id_,) + self._serialize(value)
+                for id_, value in self._pending.iteritems()]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO cybox_cache (id, kind, class, data) "
+            "VALUES (?, ?, ?, ?)", rows)
+        self._conn.commit()
+        self._pending.clear()
+
+    def get(self, id_):
+        with self._lock:
+            self._check_open()
+            try:
+                return self._front.get(id_)
+            except CacheMiss:
+                pass
+
+            if id_ in self._pending:
+                value = self._pending[id_]
+            else:
+                row = self._conn.execute(
+                    "SELECT kind, class, data FROM cybox_cache WHERE id = ?",
+                    (id_,)).fetchone()
+                if row is None:
+                    raise CacheMiss
+                value = _deserialize(*row)
+
+            self._front.put(value, id_)
+            return value
+
+    def count(self):
+        with self._lock:
+            self._check_open()
+            self._flush()
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cybox_cache").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._check_open()
+            self._pending.clear()
+            self._front.clear()
+            self._conn.execute("DELETE FROM cybox_cache")
+            self._conn.commit()
+
+    def _serialize(self, value):
+        """Return a (kind, class, data) tuple for storing `value`."""
+        if hasattr(value, 'to_dict') and hasattr(value, 'from_dict'):
+            klass = type(value)
+            class_name = "%s.%s" % (klass.__module__, klass.__name__)
+            return ('json', class_name, json.dumps(value.to_dict()))
+
+        data = six.moves.cPickle.dumps(value, 2)
+        return ('pickle', None, self._binary(data))
+
+    def close(self):
+        """Write any buffered items and close the database.
+
+        Closing a closed cache does nothing.
+        """
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush()
+            self._conn.close()
+            self._conn = None
+
+
+def _deserialize(kind, class_name, data):
+    if kind == 'pickle':
+        return six.moves.cPickle.loads(bytes(data))
+
+    module_name, _, name = class_name.rpartition('.')
+    module = __import__(module_name, fromlist=[name])
+    klass = getattr(module, name)
+
+    # from_dict() may put the object (and the objects it contains) back in
+    # the current cache, which is not wanted here.
+    with cache_scope():
+        return klass.from_dict(json.loads(data))
+
+
 # Singleton instance within this module. It is lazily instantiated, so simply
 # importing the utils module will not create the object.
 __cache = None
 
 
+# The cache of the innermost cache_scope() in the current context, if any.
+if contextvars:
+    _scoped_cache = contextvars.ContextVar('cybox_scoped_cache', default=None)
+
+    def _get_scoped_cache():
+        return _scoped_cache.get()
+
+    def _push_scoped_cache(cache):
+        return _scoped_cache.set(cache)
+
+    def _pop_scoped_cache(token):
+        _scoped_cache.reset(token)
+
+else:
+    _local = threading.local()
+
+    def _get_scoped_cache():
+        stack = getattr(_local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def _push_scoped_cache(cache):
+        if not hasattr(_local, 'stack'):
+            _local.stack = []
+        _local.stack.append(cache)
+
+    def _pop_scoped_cache(token):
+        _local.stack.pop()
+
+
+@contextlib.contextmanager
+def cache_scope(cache=None):
+    """Use a separate object cache inside a ``with`` block.
+
+    Within the block, the global cache functions (and therefore parsing)
+    use `cache` instead of the module's global cache. Scopes are local to
+    the current thread, or to the current asyncio task on Python 3.7+, so
+    several documents can be parsed in parallel without their objects being
+    mixed. Scopes can be nested.
+
+    The cache is simply dropped when the block ends, which frees all the
+    objects it holds, unless the caller keeps a reference to it.
+
+    Arguments:
+    - cache: the Cache to use. Defaults to a new :class:`DictCache`.
+
+    Yields the cache::
+
+        with cybox.utils.cache_scope() as cache:
+            observables = Observables.from_obj(parse(...))
+    """
+    if cache is None:
+        cache = DictCache()
+
+    token = _push_scoped_cache(cache)
+    try:
+        yield cache
+    finally:
+        _pop_scoped_cache(token)
+
+
 def _get_cache():
-    """Return the `cybox.utils` module's global cache object.
+    """Return the cache object currently used by the `cybox.utils` module.
 
     Only under rare circumstances should this function be called by external
     code. More likely, external code should initialize its own Cache object.
 
-    The implicit, built-in global cache is used when parsing XML or JSON
+    The implicit, built-in cache is used when parsing XML or JSON
     representations and dealing with internal references within a document.
+    This is the cache of the innermost :func:`cache_scope`, or else the
+    global cache.
     """
+    scoped = _get_scoped_cache()
+    if scoped is not None:
+        return scoped
+
     global __cache
-    if not __cache:
+    if __cache is None:
         __cache = DictCache()
     return __cache
 
 
+def set_cache(cache):
+    """Replace the `cybox.utils` module's global cache object.
+
+    This does not affect code running inside a :func:`cache_scope`.
+
+    For example, to bound the memory used by a long-running process::
+
+        cybox.utils.set_cache(cybox.utils.LRUCache(max_items=100000))
+
+    Passing None restores the default (unbounded) :class:`DictCache` the next
+    time the cache is used. Returns the previous cache object, if any.
+    """
+    global __cache
+    old_cache = __cache
+    __cache = cache
+    return old_cache
+
+
 def cache_put(value, id_=None):
     """Save a value in the global cache"""
     new_id = _get_cache().put(value, id_)
@@ -4,11 +4,25 @@
 # Copyright (c) 2015, The MITRE Corporation. All rights reserved.
 # See LICENSE.txt for complete terms.
 
+import multiprocessing
 import re
+import socket
+
+from mixbox.vendor import six
+
+from cybox.core import Event, Object, Observable, ObservableComposition
+from cybox.objects.address_object import Address
+from cybox.objects.domain_name_object import DomainName
+from cybox.objects.email_message_object import EmailMessage
 from cybox.objects.file_object import File
+from cybox.objects.hostname_object import Hostname
 from cybox.objects.win_registry_key_object import WinRegistryKey
 from cybox.objects.process_object import Process
-from cybox.objects.mutex_object import Mutex
+from cybox.objects.uri_object import URI
+from cybox.utils.caches import CacheMiss, LRUCache
+
+# The number of normalized values remembered for each mapping list
+MEMO_SIZE = 10000
 
 # Normalization-related mappings
 
@@ -72,62 +86,596 @@ registry_hive_normalization_mapping = [{'regex' : re.compile('^hklm$',flags=re.I
 
 # Normalization-related methods
 
+def _single_char_prefix(pattern, max_atoms=3):
+    """Return the leading atoms of `pattern` which each match one character.
+
+    Any match of `pattern` starts with a match of the returned prefix. Only
+    literal characters, escapes and character sets are taken, optionally
+    after a leading ``^``, and an atom followed by a quantifier is not taken.
+    Returns an empty string if there is no such prefix (or the pattern has
+    a top-level alternation, which makes any prefix meaningless).
+    """
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 1
+        elif c == '[':
+            i = _set_end(pattern, i) - 1
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            return ''
+        i += 1
+
+    prefix = '^' if pattern.startswith('^') else ''
+    i = len(prefix)
+    atoms = 0
+    while i < len(pattern) and atoms < max_atoms:
+        c = pattern[i]
+        if c == '\\':
+            if i + 1 >= len(pattern):
+                break
+            e = pattern[i + 1]
+            # Other alphanumeric escapes are anchors, references or
+            # multi-character escapes.
+            if e.isalnum() and e not in 'wWdDsS':
+                break
+            end = i + 2
+        elif c == '[':
+            end = _set_end(pattern, i)
+        elif c in '.^$*+?{}()|':
+            break
+        else:
+            end = i + 1
+
+        if end < len(pattern) and pattern[end] in '*+?{':
+            break
+        prefix += pattern[i:end]
+        atoms += 1
+        i = end
+
+    return prefix if atoms else ''
+
+
+def _set_end(pattern, start):
+    """Return the index after the character set starting at `start`."""
+    i = start + 1
+    if i < len(pattern) and pattern[i] == '^':
+        i += 1
+    if i < len(pattern) and pattern[i] == ']':
+        i += 1
+    while i < len(pattern) and pattern[i] != ']':
+        if pattern[i] == '\\':
+            i += 1
+        i += 1
+    return i + 1
+
+
+class _CompiledMapping(object):
+    """A replacement mapping list compiled for a single scan of a value.
+
+    perform_replacement() applies every matching entry of a mapping list to
+    the original value, so the last matching entry determines the result.
+
+    The regexes are combined, in reverse order, into one alternation, so
+    that at any position the first alternative which matches is the last
+    matching entry.  The alternation is only tried at the positions found
+    by a trigger pattern made of the fixed leading characters of each
+    regex (e.g. ``%`` or a drive letter).  The entry with the highest index
+    over all positions is the one whose substitution is run.
+    """
+
+    def __init__(self, mapping_list):
+        # Kept so that the id() of the list is not reused, and to notice
+        # entries being added or removed.
+        self.mapping_list = mapping_list
+        self.size = len(mapping_list)
+        self.regexes = [d['regex'] for d in mapping_list]
+        self.replacements = [d['replacement'] for d in mapping_list]
+        # Results of replace(), by original value
+        self.memo = LRUCache(max_items=MEMO_SIZE)
+
+        flags = self.regexes[0].flags
+        patterns = [r.pattern for r in reversed(self.regexes)]
+        alternatives = "|".join("(%s)" % p for p in patterns)
+
+        prefixes = [_single_char_prefix(p) for p in patterns]
+        if all(prefixes) and not flags & re.VERBOSE:
+            unique = sorted(set(prefixes))
+            self.trigger = re.compile("(?=%s)" % "|".join(unique), flags)
+            self.scanner = re.compile(alternatives, flags)
+        else:
+            self.trigger = None
+            self.scanner = re.compile("(?=%s)" % alternatives, flags)
+
+    @staticmethod
+    def supports(mapping_list):
+        """Return whether `mapping_list` can be compiled."""
+        if not mapping_list:
+            return False
+        flags = set()
+        for mapping_dict in mapping_list:
+            if 'search_string' in mapping_dict or 'regex' not in mapping_dict:
+                return False
+            regex = mapping_dict['regex']
+            if regex.groups:
+                # Would shift the numbering of the combined groups.
+                return False
+            flags.add(regex.flags)
+        return len(flags) == 1
+
+    def replace(self, value):
+        """Return the replaced value, or None if no entry matches."""
+        # Group numbers count from the end of the mapping list.
+        best = None
+
+        if self.trigger is None:
+            for match in self.scanner.finditer(value):
+                if best is None or match.lastindex < best:
+                    best = match.lastindex
+        else:
+            match_at = self.scanner.match
+            for candidate in self.trigger.finditer(value):
+                match = match_at(value, candidate.start())
+                if match is None:
+                    continue
+                if best is None or match.lastindex < best:
+                    best = match.lastindex
+                    if best == 1:
+                        break
+
+        if best is None:
+            return None
+
+        i = len(self.regexes) - best
+        return self.regexes[i].sub(self.replacements[i], value)
+
+    def replace_memoized(self, value):
+        """Like replace(), but remember the results for string values."""
+        if not isinstance(value, six.string_types):
+            return self.replace(value)
+
+        try:
+            return self.memo.get(value)
+        except CacheMiss:
+            pass
+
+        replaced = self.replace(value)
+        self.memo.put(replaced, value)
+        return replaced
+
+
+# Compiled mapping lists, by id() of the list.
+_compiled_mappings = {}
+
+
+def reset_compiled_mappings(mapping_list=None):
+    """Forget the compiled form (and memo) of `mapping_list`, or of every
+    mapping list if it is None.
+
+    A mapping list is recompiled when entries are added to or removed from
+    it, or when it is passed to :func:`register_normalization_rule`.  Call
+    this after changing its entries in any other way.
+    """
+    if mapping_list is None:
+        _compiled_mappings.clear()
+    else:
+        _compiled_mappings.pop(id(mapping_list), None)
+
+
+def _get_compiled_mapping(mapping_list):
+    compiled = _compiled_mappings.get(id(mapping_list))
+    if compiled is not None and compiled.size == len(mapping_list):
+        return compiled
+
+    if not _CompiledMapping.supports(mapping_list):
+        return None
+
+    compiled = _CompiledMapping(mapping_list)
+    _compiled_mappings[id(mapping_list)] = compiled
+    return compiled
+
+
 def perform_replacement(entity, mapping_list):
-    '''Perform a replacement on the value of an entity using a replacement mapping, if applicable.'''
+    '''Perform a replacement on the value of an entity using a replacement mapping, if applicable.
+
+       Returns True if the value of the entity was changed.'''
     # Make sure the entity has a value to begin with
     if not entity.value:
-        return
+        return False
     entity_value = entity.value
+    # Lists of regexes are applied in a single scan of the value
+    compiled = _get_compiled_mapping(mapping_list)
+    if compiled is not None:
+        replaced = compiled.replace_memoized(entity_value)
+        if replaced is None or replaced == entity_value:
+            return False
+        entity.value = replaced
+        return True
     # Attempt the replacement
     for mapping_dict in mapping_list:
         # Do the direct replacement, if applicable
-        if 'search_string' in mapping_dict.keys():
+        if 'search_string' in mapping_dict:
             search_string = mapping_dict['search_string']
             replacement = mapping_dict['replacement']
             if search_string in entity_value:
                 entity.value = entity_value.replace(search_string, replacement)
         # Do the regex replacement, if applicable
-        if 'regex' in mapping_dict.keys():
+        if 'regex' in mapping_dict:
             compiled_regex = mapping_dict['regex']
             replacement = mapping_dict['replacement']
             if compiled_regex.search(entity_value):
                 entity.value = compiled_regex.sub(replacement, entity_value)
+    return entity.value != entity_value
+
+# Normalization functions for NormalizationRules
+
+_ipv4_pattern = re.compile(r'^([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})$')
+
+def _normalize_ipv4(value):
+    match = _ipv4_pattern.match(value)
+    if not match:
+        return value
+    numbers = [int(p) for p in match.groups()]
+    if any(n > 255 for n in numbers):
+        return value
+    return '.'.join(str(n) for n in numbers)
+
+def _normalize_ipv6(value):
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, value)
+    except AttributeError:
+        # Python 2 on Windows has no inet_pton() or inet_ntop().
+        return value
+    except (socket.error, ValueError, UnicodeError):
+        return value
+    return type(value)(socket.inet_ntop(socket.AF_INET6, packed))
+
+_prefix_length_pattern = re.compile(r'^[0-9]{1,3}$')
+
+def _with_prefix_length(normalize_address):
+    def normalize(value):
+        address, sep, prefix_length = value.partition('/')
+        if sep and not _prefix_length_pattern.match(prefix_length):
+            return value
+        address = normalize_address(address.strip())
+        if sep:
+            return '%s/%d' % (address, int(prefix_length))
+        return address
+    return normalize
+
+def _normalize_email(value):
+    value = value.strip()
+    local_part, sep, domain = value.rpartition('@')
+    if not sep:
+        return value
+    # The local part is case-sensitive; the domain is not.
+    return local_part + '@' + domain.lower()
+
+def _normalize_domain(value):
+    value = value.strip().lower()
+    if value.endswith('.') and len(value) > 1:
+        value = value[:-1]
+    return value
+
+_address_normalizers = {
+    Address.CAT_IPV4: _with_prefix_length(_normalize_ipv4),
+    Address.CAT_IPV4_NET: _with_prefix_length(_normalize_ipv4),
+    Address.CAT_IPV4_NETMASK: _normalize_ipv4,
+    Address.CAT_IPV6: _with_prefix_length(_normalize_ipv6),
+    Address.CAT_IPV6_NET: _with_prefix_length(_normalize_ipv6),
+    Address.CAT_IPV6_NETMASK: _normalize_ipv6,
+    Address.CAT_EMAIL: _normalize_email,
+}
+
+def normalize_address(value, address):
+    '''Return the canonical form of an address value of an Address.
+
+       IPv4 addresses lose leading zeros, IPv6 addresses are written in the
+       compressed lowercase form of RFC 5952, and the domain of e-mail
+       addresses is lowercased. Values which cannot be parsed are returned
+       unchanged.'''
+    normalize = _address_normalizers.get(address.category)
+    if normalize is None:
+        return value
+    return normalize(value)
+
+_uri_pattern = re.compile(r'^([A-Za-z][A-Za-z0-9+.\-]*)://([^/?#]*)(.*)$', re.DOTALL)
+
+# Ports which are dropped from URIs of these schemes
+_default_ports = {'http': '80', 'https': '443', 'ftp': '21', 'ws': '80', 'wss': '443'}
+
+def normalize_uri(value, uri):
+    '''Return the canonical form of the value of a URI.
+
+       The scheme and host of URLs are lowercased and a default (or empty)
+       port is removed. Domain names are lowercased and lose a trailing
+       dot.'''
+    if uri.type_ == URI.TYPE_DOMAIN:
+        return _normalize_domain(value)
+
+    match = _uri_pattern.match(value)
+    if not match:
+        return value
+    scheme, authority, rest = match.groups()
+    scheme = scheme.lower()
+
+    userinfo, at, hostport = authority.rpartition('@')
+    if hostport.startswith('['):
+        end = hostport.find(']') + 1
+        host, port = hostport[:end], hostport[end:]
+    else:
+        host, colon, port = hostport.partition(':')
+        port = colon + port
+    if port in (':', ':' + _default_ports.get(scheme, '')):
+        port = ''
+
+    return '%s://%s%s%s%s%s' % (scheme, userinfo, at, host.lower(), port, rest)
+
+def normalize_domain_name(value, owner):
+    '''Return the lowercased value of a domain or host name, without a
+       trailing dot.'''
+    return _normalize_domain(value)
+
+# Normalization rule registry
+
+class NormalizationRule(object):
+    '''A normalization of one field of a class of ObjectProperties.
+
+       `field_path` is a dotted path of attribute names leading from the
+       ObjectProperties to a property, e.g. "image_info.path". Lists along
+       the path are expanded.
+
+       The value of the property is normalized either with a replacement
+       `mapping_list` (see perform_replacement()), or by a `function` called
+       as function(value, owner), where `owner` is the entity that holds the
+       property. The function returns the normalized value.'''
+
+    def __init__(self, field_path, mapping_list=None, function=None):
+        if (mapping_list is None) == (function is None):
+            raise ValueError("exactly one of mapping_list and function is required")
+        self.field_path = field_path
+        self.path = field_path.split('.')
+        self.mapping_list = mapping_list
+        self.function = function
+
+    def fields(self, object_properties):
+        '''Yield (owner, property) pairs for the fields this rule applies to.'''
+        owners = [object_properties]
+        for name in self.path[:-1]:
+            owners = [x for owner in owners
+                        for x in _expand(getattr(owner, name, None))]
+        for owner in owners:
+            for prop in _expand(getattr(owner, self.path[-1], None)):
+                yield owner, prop
+
+    def apply(self, entity, owner):
+        '''Normalize the property `entity`. Returns True if it was changed.'''
+        if self.mapping_list is not None:
+            return perform_replacement(entity, self.mapping_list)
+
+        value = entity.value
+        if not value:
+            return False
+        if isinstance(value, list):
+            normalized = [self._call(x, owner) for x in value]
+        else:
+            normalized = self._call(value, owner)
+        if normalized == value:
+            return False
+        entity.value = normalized
+        return True
+
+    def _call(self, value, owner):
+        if not isinstance(value, six.string_types):
+            return value
+        return self.function(value, owner)
+
+def _expand(value):
+    if not value:
+        return []
+    if isinstance(value, list) or (hasattr(value, '__iter__') and
+                                   hasattr(value, '_contained_type')):
+        return [x for x in value if x]
+    return [value]
+
+# Rules registered for each class
+_rules = {}
+# Rules which apply to each class, including those registered for its bases
+_resolved_rules = {}
+
+def register_normalization_rule(klass, field_path, mapping_list=None, function=None):
+    '''Register a NormalizationRule for instances of `klass` and its
+       subclasses. Returns the rule.'''
+    rule = NormalizationRule(field_path, mapping_list, function)
+    _rules.setdefault(klass, []).append(rule)
+    _resolved_rules.clear()
+    if mapping_list is not None:
+        reset_compiled_mappings(mapping_list)
+    return rule
+
+def get_normalization_rules(klass):
+    '''Return the NormalizationRules that apply to instances of `klass`.'''
+    try:
+        return _resolved_rules[klass]
+    except KeyError:
+        pass
+    rules = []
+    for base in reversed(klass.__mro__):
+        rules.extend(_rules.get(base, []))
+    _resolved_rules[klass] = rules
+    return rules
+
+register_normalization_rule(File, 'file_path', file_path_normalization_mapping)
+register_normalization_rule(WinRegistryKey, 'values.data', file_path_normalization_mapping)
+register_normalization_rule(WinRegistryKey, 'hive', registry_hive_normalization_mapping)
+register_normalization_rule(Process, 'image_info.path', file_path_normalization_mapping)
+register_normalization_rule(Address, 'address_value', function=normalize_address)
+register_normalization_rule(URI, 'value', function=normalize_uri)
+register_normalization_rule(DomainName, 'value', function=normalize_domain_name)
+register_normalization_rule(Hostname, 'hostname_value', function=normalize_domain_name)
+for _field in ('from_', 'sender', 'reply_to', 'to', 'cc', 'bcc', 'x_originating_ip'):
+    register_normalization_rule(EmailMessage, 'header.%s.address_value' % _field,
+                                function=normalize_address)
+del _field
+
+def _normalizable_fields(object_properties):
+    '''Yield (entity, owner, rule) tuples for the fields of an
+       ObjectProperties instance which are normalized by
+       normalize_object_properties().'''
+    for rule in get_normalization_rules(type(object_properties)):
+        for owner, entity in rule.fields(object_properties):
+            yield entity, owner, rule
 
 def normalize_object_properties(object_properties):
     '''Normalize the field values of certain ObjectProperties instances.
 
-       Currently supports: File Objects
-                             --File_Path field. Normalized for common Windows
-                                                paths/environment variables.
-                           Windows Registry Key Objects
-                             --Registry Value/Data field. Normalized for common
-                                                          Windows paths/environment
-                                                          variables.
-                             --Hive field. Normalized for full representation
-                                           from abbreviated form.
-                                           E.g., HKLM -> HKEY_LOCAL_MACHINE.
-                           Process Objects
-                             --Image_Info/Path field. Normalized for common
-                                                      Windows paths/environment
-                                                      variables. '''
-
-    # Normalize file object properties/subclasses
-    if isinstance(object_properties, File):
-        # Normalize any windows-related file paths
-        if object_properties.file_path:
-            perform_replacement(object_properties.file_path, file_path_normalization_mapping)
-    # Normalize windows registry key object properties
-    elif isinstance(object_properties, WinRegistryKey):
-        # Normalize any windows-related file paths in a registry key value
-        if object_properties.values:
-            for registry_value in object_properties.values:
-                if registry_value.data:
-                    perform_replacement(registry_value.data, file_path_normalization_mapping)
-        # Normalize any short-hand hive values
-        if object_properties.hive:
-            perform_replacement(object_properties.hive, registry_hive_normalization_mapping)
-    # Normalize process object properties/subclasses
-    elif isinstance(object_properties, Process):
-        # Normalize any windows-related file paths in the process image path
-        if object_properties.image_info and object_properties.image_info.path:
-            perform_replacement(object_properties.image_info.path, file_path_normalization_mapping)
+       The fields are normalized by the rules registered with
+       register_normalization_rule() for the class of `object_properties`
+       or its base classes. The default rules cover:
+
+         File Objects
+           --File_Path field. Normalized for common Windows
+                              paths/environment variables.
+         Windows Registry Key Objects
+           --Registry Value/Data field. Normalized for common Windows
+                                        paths/environment variables.
+           --Hive field. Normalized for full representation from
+                         abbreviated form. E.g., HKLM -> HKEY_LOCAL_MACHINE.
+         Process Objects
+           --Image_Info/Path field. Normalized for common Windows
+                                    paths/environment variables.
+         Address Objects
+           --Address_Value field. Canonical IPv4/IPv6 form, lowercased
+                                  e-mail domain.
+         URI Objects
+           --Value field. Lowercased scheme and host, default port
+                          removed.
+         Domain Name and Hostname Objects
+           --Value/Hostname_Value field. Lowercased, no trailing dot.
+         Email Message Objects
+           --Addresses in the header, as for Address Objects.
+
+       Returns the number of fields that were changed. '''
+    changed = 0
+    for entity, owner, rule in _normalizable_fields(object_properties):
+        if rule.apply(entity, owner):
+            changed += 1
+    return changed
+
+def _iter_object_properties(observables):
+    '''Yield the ObjectProperties of every Object in `observables`, including
+       those in Observable Compositions, Events and related Objects.'''
+    if isinstance(observables, (Observable, Object, Event,
+                                ObservableComposition)):
+        stack = [observables]
+    else:
+        stack = list(observables)
+    stack.reverse()
+    seen = set()
+
+    while stack:
+        item = stack.pop()
+        if item is None or id(item) in seen:
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, Observable):
+            stack.extend([item.observable_composition, item.event,
+                          item.object_])
+        elif isinstance(item, ObservableComposition):
+            stack.extend(reversed(item.observables))
+        elif isinstance(item, Object):
+            stack.extend(reversed(item.related_objects or []))
+            if item.properties is not None:
+                yield item.properties
+        elif isinstance(item, Event):
+            stack.extend(reversed(item.event or []))
+            for action in reversed(item.actions or []):
+                stack.extend(reversed(action.associated_objects or []))
+
+def _replace_chunk(args):
+    '''Return the replaced values for a list of values. Run in worker
+       processes by normalize_observables().'''
+    mapping_list, values = args
+    compiled = _get_compiled_mapping(mapping_list)
+    return [compiled.replace_memoized(v) for v in values]
+
+def _replace_in_pool(fields, workers, chunk_size):
+    '''Compute the replaced values of `fields` in a pool of processes.
+       Returns a dict of {(id(mapping_list), value): replaced_value}.'''
+    values = {}
+    mappings = {}
+    for entity, owner, rule in fields:
+        mapping_list = rule.mapping_list
+        value = entity.value
+        if mapping_list is None or not value or not isinstance(value, six.string_types):
+            continue
+        if _get_compiled_mapping(mapping_list) is None:
+            continue
+        mappings[id(mapping_list)] = mapping_list
+        values.setdefault(id(mapping_list), set()).add(value)
+
+    tasks = []
+    keys = []
+    for mapping_id, unique_values in six.iteritems(values):
+        unique_values = sorted(unique_values)
+        for i in range(0, len(unique_values), chunk_size):
+            chunk = unique_values[i:i + chunk_size]
+            tasks.append((mappings[mapping_id], chunk))
+            keys.append((mapping_id, chunk))
+
+    results = {}
+    if not tasks:
+        return results
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        for (mapping_id, chunk), replaced in zip(keys, pool.map(_replace_chunk, tasks)):
+            for value, replaced_value in zip(chunk, replaced):
+                results[(mapping_id, value)] = replaced_value
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+def normalize_observables(observables, workers=None, chunk_size=1000):
+    '''Normalize the ObjectProperties of all Objects in a collection.
+
+       `observables` may be an Observables instance, any iterable of
+       Observables, or a single Observable. Objects in Observable
+       Compositions, in Event Actions and related Objects are included. Each
+       Object is normalized as by normalize_object_properties().
+
+       Normalized values are remembered (up to MEMO_SIZE per mapping list),
+       so values which occur many times are only normalized once.
+
+       If `workers` is greater than 1, the distinct values are normalized in
+       a pool of that many processes, in chunks of `chunk_size` values. This
+       only pays off for very large inputs.
+
+       Returns the number of fields that were changed. '''
+    fields = []
+    for object_properties in _iter_object_properties(observables):
+        fields.extend(_normalizable_fields(object_properties))
+
+    precomputed = {}
+    if workers and workers > 1:
+        precomputed = _replace_in_pool(fields, workers, chunk_size)
+
+    changed = 0
+    for entity, owner, rule in fields:
+        value = entity.value
+        key = (id(rule.mapping_list), value)
+        if precomputed and isinstance(value, six.string_types) and key in precomputed:
+            replaced = precomputed[key]
+            if replaced is not None and replaced != value:
+                entity.value = replaced
+                changed += 1
+        elif rule.apply(entity, owner):
+            changed += 1
+    return changed